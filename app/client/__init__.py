@@ -0,0 +1,34 @@
+from typing import TYPE_CHECKING
+
+from app.utils.lazy import LazyProxy
+
+if TYPE_CHECKING:
+    from app.client.channels import ChannelName, ChannelPool
+    from app.client.tinkoff_client import TinkoffClient
+
+__all__ = ["ChannelName", "ChannelPool", "TinkoffClient", "client"]
+
+
+def get_client() -> "TinkoffClient":
+    from app.context import context
+
+    return context.client
+
+
+# The client is created on the first use, see app.context
+client: "TinkoffClient" = LazyProxy(get_client)  # type: ignore
+
+# The tinkoff library and grpc are imported only when these classes are used
+_LAZY_IMPORTS = {
+    "ChannelName": "app.client.channels",
+    "ChannelPool": "app.client.channels",
+    "TinkoffClient": "app.client.tinkoff_client",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        import importlib
+
+        return getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
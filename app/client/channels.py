@@ -0,0 +1,137 @@
+import logging
+from enum import Enum
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import grpc
+from tinkoff.invest.async_services import AsyncServices
+from tinkoff.invest.constants import INVEST_GRPC_API
+
+logger = logging.getLogger(__name__)
+
+# Candles history and big instrument lists can be larger than the default limit of 4 MB
+MAX_RECEIVE_MESSAGE_LENGTH = 32 * 1024 * 1024
+
+
+class ChannelName(str, Enum):
+    """
+    Channels of the pool. Requests are routed by the service they belong to, so that
+    the order placement never waits behind bulk history downloads.
+    """
+
+    DEFAULT = "default"
+    ORDERS = "orders"
+    MARKET_DATA = "market_data"
+    HISTORY = "history"
+
+
+def get_channel_options(keepalive_time: int, keepalive_timeout: int) -> Sequence[Tuple[str, int]]:
+    """
+    :param keepalive_time: interval in seconds of keepalive pings. 0 disables the pings
+    :param keepalive_timeout: time in seconds to wait for a ping acknowledgement
+    :return: grpc channel options
+    """
+    options = [("grpc.max_receive_message_length", MAX_RECEIVE_MESSAGE_LENGTH)]
+    if keepalive_time > 0:
+        options += [
+            ("grpc.keepalive_time_ms", keepalive_time * 1000),
+            ("grpc.keepalive_timeout_ms", keepalive_timeout * 1000),
+            # Idle channels are kept alive too. Orders channel is idle most of the time
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+        ]
+    return options
+
+
+class ChannelPool:
+    """
+    Pool of named grpc.aio channels with tinkoff services on top of each of them.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        app_name: Optional[str] = None,
+        target: Optional[str] = None,
+        insecure: bool = False,
+        options: Sequence[Tuple[str, int]] = (),
+        names: Iterable[ChannelName] = tuple(ChannelName),
+    ):
+        """
+        :param token: Tinkoff token
+        :param app_name: application name sent with every request
+        :param target: grpc API address. By default, the production address is used
+        :param insecure: use plaintext channels instead of TLS
+        :param options: grpc channel options
+        :param names: channels to open
+        """
+        self.token = token
+        self.app_name = app_name
+        self.target = target or INVEST_GRPC_API
+        self.insecure = insecure
+        self.options = list(options)
+        self.names = list(names)
+        self._channels: Dict[ChannelName, grpc.aio.Channel] = {}
+        self._services: Dict[ChannelName, AsyncServices] = {}
+
+    def _create_channel(self) -> grpc.aio.Channel:
+        if self.insecure:
+            return grpc.aio.insecure_channel(self.target, options=self.options)
+        return grpc.aio.secure_channel(
+            self.target, grpc.ssl_channel_credentials(), options=self.options
+        )
+
+    def _open(self, name: ChannelName) -> None:
+        channel = self._create_channel()
+        self._channels[name] = channel
+        self._services[name] = AsyncServices(channel, token=self.token, app_name=self.app_name)
+
+    def open(self) -> None:
+        """
+        Opens all the channels. Connections are established on the first request.
+        """
+        for name in self.names:
+            if name not in self._channels:
+                self._open(name)
+
+    def services(self, name: ChannelName) -> AsyncServices:
+        """
+        :param name: channel name. Unknown names fall back to the default channel
+        :return: services working over the channel
+        """
+        if name not in self._services:
+            name = ChannelName.DEFAULT
+        return self._services[name]
+
+    def channel(self, name: ChannelName) -> grpc.aio.Channel:
+        if name not in self._channels:
+            name = ChannelName.DEFAULT
+        return self._channels[name]
+
+    async def reconnect(self, name: ChannelName, services: Optional[AsyncServices] = None) -> None:
+        """
+        Replaces the channel with a new one. Other channels and the state of the callers
+        are not affected, the next request to the services of the channel uses the new one.
+
+        :param name: channel name
+        :param services: services the failed request was made with. If the channel has already
+            been replaced by a concurrent request, it's not reconnected again
+        """
+        if name not in self._channels:
+            name = ChannelName.DEFAULT
+        if services is not None and self._services.get(name) is not services:
+            return
+        old_channel = self._channels.get(name)
+        self._open(name)
+        logger.warning("Channel %s is reconnected", name.value)
+        if old_channel is not None:
+            await old_channel.close()
+
+    async def aclose(self) -> None:
+        """
+        Closes all the channels. Active calls are cancelled.
+        """
+        channels = list(self._channels.values())
+        self._channels.clear()
+        self._services.clear()
+        for channel in channels:
+            await channel.close()
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import random
+import time
+from collections import Counter, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from grpc import StatusCode
+from tinkoff.invest import AioRequestError
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Codes of the errors which are worth repeating a request after
+RETRYABLE_CODES = frozenset(
+    (StatusCode.UNAVAILABLE, StatusCode.DEADLINE_EXCEEDED, StatusCode.RESOURCE_EXHAUSTED)
+)
+
+
+class RequestPolicy:
+    """
+    How a client method is called: deadline, retries and hedging.
+    """
+
+    __slots__ = ("deadline", "retries", "hedge")
+
+    def __init__(self, deadline: float, retries: int = 0, hedge: bool = False):
+        """
+        :param deadline: max time in seconds for one attempt
+        :param retries: number of repeated attempts after retryable errors.
+            Only requests which are safe to repeat may have retries
+        :param hedge: send a duplicate request if the first one is slower than usual
+            and take whichever returns first. Only for reads
+        """
+        self.deadline = deadline
+        self.retries = retries
+        self.hedge = hedge
+
+
+def get_default_policies() -> Dict[str, RequestPolicy]:
+    read = dict(deadline=settings.request_deadline, retries=settings.request_retries)
+    return {
+        "get_last_prices": RequestPolicy(**read, hedge=settings.hedged_requests),
+        "get_trading_status": RequestPolicy(**read, hedge=settings.hedged_requests),
+        "get_portfolio": RequestPolicy(**read, hedge=settings.hedged_requests),
+        "get_order_state": RequestPolicy(**read),
+        "get_orders": RequestPolicy(**read),
+        "get_accounts": RequestPolicy(**read),
+        "get_instrument": RequestPolicy(**read),
+        # Repeated post order requests have the same order_id, the broker doesn't post it twice
+        "post_order": RequestPolicy(
+            deadline=settings.post_order_deadline, retries=settings.request_retries
+        ),
+    }
+
+
+class LatencyTracker:
+    """
+    Latencies of the last successful requests of one method.
+    """
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.latencies: Deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        :return: the percentile of the latencies or None if there are too few samples
+        """
+        if len(self.latencies) < self.min_samples:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[int(percent / 100 * (len(latencies) - 1))]
+
+
+class ClientMetrics:
+    """
+    Counters of the client requests by method.
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.errors = Counter()
+        self.retries = Counter()
+        self.deadlines_exceeded = Counter()
+        self.hedges = Counter()
+        self.hedges_won = Counter()
+
+    def as_dict(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "calls": dict(self.calls),
+            "errors": dict(self.errors),
+            "retries": dict(self.retries),
+            "deadlines_exceeded": dict(self.deadlines_exceeded),
+            "hedges": dict(self.hedges),
+            "hedges_won": dict(self.hedges_won),
+        }
+
+
+def get_retry_delay(attempt: int) -> float:
+    """
+    Exponential backoff with jitter, so that strategies don't retry all at once.
+
+    :param attempt: number of the failed attempt starting from 0
+    """
+    delay = min(settings.request_retry_backoff * 2**attempt, settings.request_retry_max_backoff)
+    return random.uniform(delay / 2, delay)
+
+
+class RequestExecutor:
+    """
+    Executes client requests according to their policies.
+    """
+
+    def __init__(self, policies: Dict[str, RequestPolicy]):
+        self.policies = policies
+        self.metrics = ClientMetrics()
+        self.latencies: Dict[str, LatencyTracker] = {}
+
+    def _get_latency_tracker(self, method: str) -> LatencyTracker:
+        if method not in self.latencies:
+            self.latencies[method] = LatencyTracker()
+        return self.latencies[method]
+
+    async def _timed(self, method: str, call: Callable[[], Awaitable[T]]) -> T:
+        started_at = time.perf_counter()
+        result = await call()
+        self._get_latency_tracker(method).add(time.perf_counter() - started_at)
+        return result
+
+    async def _hedged(self, method: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Sends a duplicate request if the first one takes longer than p95 of the method latency.
+        """
+        delay = self._get_latency_tracker(method).percentile(95)
+        if delay is None:
+            return await self._timed(method, call)
+        first = asyncio.ensure_future(self._timed(method, call))
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(delay, settings.hedge_min_delay)
+            )
+            if done:
+                return first.result()
+            self.metrics.hedges[method] += 1
+            hedge = asyncio.ensure_future(self._timed(method, call))
+            pending.add(hedge)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    if first not in succeeded:
+                        self.metrics.hedges_won[method] += 1
+                    return succeeded[0].result()
+                if not pending:
+                    # Both requests failed
+                    return done.pop().result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, method: str, policy: RequestPolicy, call: Callable[[], Awaitable[T]]):
+        if policy.hedge:
+            request = self._hedged(method, call)
+        else:
+            request = self._timed(method, call)
+        try:
+            return await asyncio.wait_for(request, timeout=policy.deadline)
+        except asyncio.TimeoutError:
+            self.metrics.deadlines_exceeded[method] += 1
+            raise AioRequestError(
+                StatusCode.DEADLINE_EXCEEDED,
+                f"Deadline of {policy.deadline}s exceeded for {method}",
+                None,
+            )
+
+    async def execute(self, method: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        :param method: client method name to choose the policy
+        :param call: function making the request. Called once per attempt or hedge
+        """
+        policy = self.policies.get(method)
+        self.metrics.calls[method] += 1
+        if policy is None:
+            return await call()
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(method, policy, call)
+            except AioRequestError as are:
+                if are.code not in RETRYABLE_CODES or attempt >= policy.retries:
+                    self.metrics.errors[method] += 1
+                    raise
+                delay = get_retry_delay(attempt)
+                logger.debug(
+                    "Retrying %s in %.2fs after %s",
+                    method,
+                    delay,
+                    are.code,
+                    extra={"phase": "request", "rate_limit": True},
+                )
+                self.metrics.retries[method] += 1
+                attempt += 1
+                await asyncio.sleep(delay)
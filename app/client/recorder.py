@@ -0,0 +1,262 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from tinkoff.invest import AioRequestError, HistoricCandle, MarketDataRequest, MarketDataResponse
+
+from app.client.serialization import to_jsonable
+
+logger = logging.getLogger(__name__)
+
+CandleValues = Tuple[int, int, int, int, int, int, int, int, int, int, bool]
+
+
+def candle_to_values(candle: HistoricCandle) -> CandleValues:
+    """
+    Compact candle representation: time, open, high, low, close as units and nano, volume
+    and is_complete.
+    """
+    return (
+        int(candle.time.timestamp()),
+        candle.open.units,
+        candle.open.nano,
+        candle.high.units,
+        candle.high.nano,
+        candle.low.units,
+        candle.low.nano,
+        candle.close.units,
+        candle.close.nano,
+        candle.volume,
+        candle.is_complete,
+    )
+
+
+def get_log_path(directory: str, day: str) -> str:
+    return os.path.join(directory, f"session-{day}.jsonl.gz")
+
+
+class SessionRecorder:
+    """
+    Append-only log of the client requests and responses.
+
+    Events are json lines in gzip files rotated per day (UTC). Lines are serialized in the event
+    loop and written by a background thread in batches, every batch is a separate gzip member
+    appended to the file, so the file stays readable if the bot is killed.
+    """
+
+    def __init__(self, directory: str, flush_interval: float = 5.0, max_batch: int = 1000):
+        """
+        :param directory: directory for the log files
+        :param flush_interval: max time in seconds an event waits to be written
+        :param max_batch: max number of events written at once
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.day: Optional[str] = None
+        # Time of the first and the last written candle by figi. Candles in between are written
+        # to the current file already, only the last one can change while its minute lasts
+        self._candles: Dict[str, Tuple[int, CandleValues]] = {}
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._write_loop, name="session-recorder", daemon=True
+        )
+        os.makedirs(directory, exist_ok=True)
+        self._thread.start()
+
+    def _rotate(self, timestamp: float) -> str:
+        day = datetime.fromtimestamp(timestamp, tz=timezone.utc).date().isoformat()
+        if day != self.day:
+            # Every file is self-contained, candles are written again after the rotation
+            self.day = day
+            self._candles = {}
+        return day
+
+    def record(self, event: Dict[str, Any]) -> None:
+        """
+        :param event: event with "t" key containing the event timestamp
+        """
+        day = self._rotate(event["t"])
+        try:
+            line = json.dumps(to_jsonable(event), separators=(",", ":"))
+        except (TypeError, ValueError) as e:
+            logger.error("Failed to record %s. %s", event.get("m"), e)
+            return
+        self._queue.put((day, line))
+
+    def get_new_candles(
+        self, figi: str, candles: List[HistoricCandle], timestamp: float
+    ) -> List[CandleValues]:
+        """
+        :param figi: instrument figi
+        :param candles: candles returned by the client
+        :param timestamp: timestamp of the event
+        :return: candles which are not written to the current file yet or changed since then
+        """
+        self._rotate(timestamp)
+        first_time, last_values = self._candles.get(figi, (None, None))
+        new_candles = []
+        for candle in candles:
+            values = candle_to_values(candle)
+            if (
+                last_values is None
+                or values[0] < first_time
+                or values[0] > last_values[0]
+                or (values[0] == last_values[0] and values != last_values)
+            ):
+                new_candles.append(values)
+        if new_candles:
+            if first_time is None or new_candles[0][0] < first_time:
+                first_time = new_candles[0][0]
+            if last_values is None or new_candles[-1][0] >= last_values[0]:
+                last_values = new_candles[-1]
+            self._candles[figi] = first_time, last_values
+        return new_candles
+
+    def _write(self, batch: List[Tuple[str, str]]) -> None:
+        for day, lines in groupby(batch, key=lambda item: item[0]):
+            try:
+                with gzip.open(get_log_path(self.directory, day), "at") as file:
+                    file.writelines(line + "\n" for _, line in lines)
+            except OSError as e:
+                logger.error("Failed to write the session log. %s", e)
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._write(batch)
+                    return
+                batch.append(item)
+            self._write(batch)
+
+    def close(self) -> None:
+        """
+        Writes the remaining events and stops the writer thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+class RecordingClient:
+    """
+    Client wrapper recording every request and response to the session log.
+    Other attributes are taken from the wrapped client.
+    """
+
+    def __init__(self, client, recorder: SessionRecorder):
+        self.client = client
+        self.recorder = recorder
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    async def _record_call(
+        self, method: str, kwargs: Dict[str, Any], call: Callable[..., Awaitable[Any]]
+    ) -> Any:
+        started_at = time.time()
+        started_at_perf = time.perf_counter()
+        event = {"t": started_at, "m": method, "k": kwargs}
+        try:
+            response = await call(**kwargs)
+        except AioRequestError as are:
+            event["d"] = time.perf_counter() - started_at_perf
+            event["e"] = {"code": are.code.name, "details": are.details}
+            self.recorder.record(event)
+            raise
+        event["d"] = time.perf_counter() - started_at_perf
+        event["r"] = response
+        self.recorder.record(event)
+        return response
+
+    async def get_orders(self, **kwargs):
+        return await self._record_call("get_orders", kwargs, self.client.get_orders)
+
+    async def get_portfolio(self, **kwargs):
+        return await self._record_call("get_portfolio", kwargs, self.client.get_portfolio)
+
+    async def get_accounts(self):
+        return await self._record_call("get_accounts", {}, self.client.get_accounts)
+
+    async def get_last_prices(self, **kwargs):
+        return await self._record_call("get_last_prices", kwargs, self.client.get_last_prices)
+
+    async def post_order(self, **kwargs):
+        return await self._record_call("post_order", kwargs, self.client.post_order)
+
+    async def get_order_state(self, **kwargs):
+        return await self._record_call("get_order_state", kwargs, self.client.get_order_state)
+
+    async def get_trading_status(self, **kwargs):
+        return await self._record_call("get_trading_status", kwargs, self.client.get_trading_status)
+
+    async def get_instrument(self, **kwargs):
+        return await self._record_call("get_instrument", kwargs, self.client.get_instrument)
+
+    async def get_all_candles(self, **kwargs):
+        """
+        Candles are recorded once per file, events only contain new and changed candles
+        and the number of the returned candles.
+        """
+        started_at = time.time()
+        started_at_perf = time.perf_counter()
+        candles = []
+        async for candle in self.client.get_all_candles(**kwargs):
+            candles.append(candle)
+            yield candle
+        self.recorder.record(
+            {
+                "t": started_at,
+                "d": time.perf_counter() - started_at_perf,
+                "m": "get_all_candles",
+                "k": kwargs,
+                "n": len(candles),
+                "c": self.recorder.get_new_candles(kwargs.get("figi"), candles, started_at),
+            }
+        )
+
+    async def _record_stream(
+        self, requests: AsyncIterable[MarketDataRequest]
+    ) -> AsyncIterator[MarketDataResponse]:
+        async for response in self.client.market_data_stream(requests):
+            self.recorder.record({"t": time.time(), "m": "market_data_stream", "r": response})
+            yield response
+
+    def market_data_stream(
+        self, requests: AsyncIterable[MarketDataRequest]
+    ) -> AsyncIterator[MarketDataResponse]:
+        return self._record_stream(requests)
+
+    async def aclose(self):
+        await self.client.aclose()
+        self.recorder.close()
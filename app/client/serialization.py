@@ -0,0 +1,67 @@
+import dataclasses
+from datetime import datetime
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict, List, Union, get_args, get_origin, get_type_hints
+
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Converts tinkoff.invest dataclasses to json compatible values.
+    Enums are stored as numbers and datetimes as ISO strings.
+    """
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {
+            field.name: to_jsonable(getattr(value, field.name))
+            for field in dataclasses.fields(value)
+        }
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    return value
+
+
+@lru_cache(maxsize=None)
+def _get_field_types(cls: type) -> Dict[str, Any]:
+    return get_type_hints(cls)
+
+
+def from_jsonable(value_type: Any, value: Any) -> Any:
+    """
+    Restores a value converted with to_jsonable.
+
+    :param value_type: type of the value, e.g. a tinkoff.invest dataclass or List[HistoricCandle]
+    :param value: json compatible value
+    :return: restored value
+    """
+    if value is None:
+        return None
+    origin = get_origin(value_type)
+    if origin is Union:
+        value_type = next(arg for arg in get_args(value_type) if arg is not type(None))
+        return from_jsonable(value_type, value)
+    if origin in (list, List):
+        (item_type,) = get_args(value_type) or (Any,)
+        return [from_jsonable(item_type, item) for item in value]
+    if origin in (dict, Dict):
+        _, item_type = get_args(value_type) or (Any, Any)
+        return {key: from_jsonable(item_type, item) for key, item in value.items()}
+    if dataclasses.is_dataclass(value_type):
+        field_types = _get_field_types(value_type)
+        return value_type(
+            **{
+                name: from_jsonable(field_types.get(name, Any), item)
+                for name, item in value.items()
+                if name in field_types
+            }
+        )
+    if isinstance(value_type, type) and issubclass(value_type, Enum):
+        return value_type(value)
+    if value_type is datetime:
+        return datetime.fromisoformat(value)
+    return value
@@ -0,0 +1,215 @@
+import logging
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from grpc import StatusCode
+from tinkoff.invest import (
+    AioRequestError,
+    Client,
+    PostOrderResponse,
+    GetLastPricesResponse,
+    OrderState,
+    GetTradingStatusResponse,
+    InstrumentResponse,
+    MarketDataRequest,
+    MarketDataResponse,
+)
+from tinkoff.invest.async_services import AsyncServices
+from tinkoff.invest.caching.market_data_cache.cache_settings import MarketDataCacheSettings
+from tinkoff.invest.services import MarketDataCache, Services
+
+from app.client.channels import ChannelName, ChannelPool, get_channel_options
+from app.client.policies import ClientMetrics, RequestExecutor, get_default_policies
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TinkoffClient:
+    """
+    Wrapper for tinkoff.invest services.
+    Takes responsibility for choosing correct function to call basing on sandbox mode flag
+    and for routing the requests to the channels of the pool.
+    """
+
+    def __init__(self, token: str, sandbox: bool = False):
+        self.token = token
+        self.sandbox = sandbox
+        self.pool: Optional[ChannelPool] = None
+        self.sync_client_manager: Optional[Client] = None
+        self.sync_client: Optional[Services] = None
+        self.market_data_cache: Optional[MarketDataCache] = None
+        self.executor = RequestExecutor(get_default_policies())
+
+    @property
+    def metrics(self) -> ClientMetrics:
+        """
+        Counters of the requests, retries and hedges.
+        """
+        return self.executor.metrics
+
+    async def ainit(self):
+        self.pool = ChannelPool(
+            token=self.token,
+            app_name=settings.app_name,
+            target=settings.grpc_target,
+            insecure=settings.grpc_insecure,
+            options=get_channel_options(
+                keepalive_time=settings.grpc_keepalive_time,
+                keepalive_timeout=settings.grpc_keepalive_timeout,
+            ),
+        )
+        self.pool.open()
+        if settings.use_candle_history_cache:
+            self.sync_client_manager = Client(
+                token=self.token, app_name=settings.app_name, target=settings.grpc_target
+            )
+            self.sync_client = self.sync_client_manager.__enter__()
+            self.market_data_cache = MarketDataCache(
+                settings=MarketDataCacheSettings(base_cache_dir=Path("market_data_cache")),
+                services=self.sync_client,
+            )
+
+    async def aclose(self):
+        """
+        Closes all the channels including the channel of the candles history cache.
+        """
+        logger.info("Client requests: %s", self.metrics.as_dict())
+        if self.pool is not None:
+            await self.pool.aclose()
+        if self.sync_client_manager is not None:
+            self.sync_client_manager.__exit__(None, None, None)
+            self.sync_client_manager = None
+            self.sync_client = None
+
+    @property
+    def client(self) -> AsyncServices:
+        """
+        Services of the default channel.
+        """
+        return self.pool.services(ChannelName.DEFAULT)
+
+    async def _call(self, channel: ChannelName, call: Callable[[AsyncServices], Awaitable[T]]) -> T:
+        """
+        Makes the call over the channel. If the channel is unavailable, it's reconnected
+        before the error is raised, so that the retry goes over the new channel.
+
+        :param channel: channel to use
+        :param call: function making the request with the given services
+        """
+        services = self.pool.services(channel)
+        try:
+            return await call(services)
+        except AioRequestError as are:
+            if are.code == StatusCode.UNAVAILABLE:
+                await self.pool.reconnect(channel, services=services)
+            raise
+
+    async def _request(
+        self, method: str, channel: ChannelName, call: Callable[[AsyncServices], Awaitable[T]]
+    ) -> T:
+        """
+        Makes the call over the channel according to the deadline, retry and hedging policy
+        of the method.
+
+        :param method: client method name
+        :param channel: channel to use
+        :param call: function making the request with the given services
+        """
+        return await self.executor.execute(method, lambda: self._call(channel, call))
+
+    async def get_orders(self, **kwargs):
+        if self.sandbox:
+            return await self._request(
+                "get_orders",
+                ChannelName.ORDERS,
+                lambda services: services.sandbox.get_sandbox_orders(**kwargs),
+            )
+        return await self._request(
+            "get_orders", ChannelName.ORDERS, lambda services: services.orders.get_orders(**kwargs)
+        )
+
+    async def get_portfolio(self, **kwargs):
+        if self.sandbox:
+            return await self._request(
+                "get_portfolio",
+                ChannelName.DEFAULT,
+                lambda services: services.sandbox.get_sandbox_portfolio(**kwargs),
+            )
+        return await self._request(
+            "get_portfolio",
+            ChannelName.DEFAULT,
+            lambda services: services.operations.get_portfolio(**kwargs),
+        )
+
+    async def get_accounts(self):
+        if self.sandbox:
+            return await self._request(
+                "get_accounts",
+                ChannelName.DEFAULT,
+                lambda services: services.sandbox.get_sandbox_accounts(),
+            )
+        return await self._request(
+            "get_accounts", ChannelName.DEFAULT, lambda services: services.users.get_accounts()
+        )
+
+    async def get_all_candles(self, **kwargs):
+        if settings.use_candle_history_cache:
+            for candle in self.market_data_cache.get_all_candles(**kwargs):
+                yield candle
+        else:
+            async for candle in self.pool.services(ChannelName.HISTORY).get_all_candles(**kwargs):
+                yield candle
+
+    async def get_last_prices(self, **kwargs) -> GetLastPricesResponse:
+        return await self._request(
+            "get_last_prices",
+            ChannelName.MARKET_DATA,
+            lambda services: services.market_data.get_last_prices(**kwargs),
+        )
+
+    def market_data_stream(
+        self, requests: AsyncIterable[MarketDataRequest]
+    ) -> AsyncIterator[MarketDataResponse]:
+        services = self.pool.services(ChannelName.MARKET_DATA)
+        return services.market_data_stream.market_data_stream(requests)
+
+    async def post_order(self, **kwargs) -> PostOrderResponse:
+        if self.sandbox:
+            return await self._request(
+                "post_order",
+                ChannelName.ORDERS,
+                lambda services: services.sandbox.post_sandbox_order(**kwargs),
+            )
+        return await self._request(
+            "post_order", ChannelName.ORDERS, lambda services: services.orders.post_order(**kwargs)
+        )
+
+    async def get_order_state(self, **kwargs) -> OrderState:
+        if self.sandbox:
+            return await self._request(
+                "get_order_state",
+                ChannelName.ORDERS,
+                lambda services: services.sandbox.get_sandbox_order_state(**kwargs),
+            )
+        return await self._request(
+            "get_order_state",
+            ChannelName.ORDERS,
+            lambda services: services.orders.get_order_state(**kwargs),
+        )
+
+    async def get_trading_status(self, **kwargs) -> GetTradingStatusResponse:
+        return await self._request(
+            "get_trading_status",
+            ChannelName.MARKET_DATA,
+            lambda services: services.market_data.get_trading_status(**kwargs),
+        )
+
+    async def get_instrument(self, **kwargs) -> InstrumentResponse:
+        return await self._request(
+            "get_instrument",
+            ChannelName.DEFAULT,
+            lambda services: services.instruments.get_instrument_by(**kwargs),
+        )
@@ -0,0 +1,95 @@
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from app.scheduler.polling import PollingScheduler
+    from app.settings import Settings
+    from app.strategies.interval.batch import IntervalBatchRunner
+
+
+class AppContext:
+    """
+    Settings, the broker client and the services configured by the settings.
+
+    Nothing is created on import. Settings are read from the environment and the rest is created
+    on the first use, or they are set explicitly with configure, e.g. by tools and tests which run
+    the strategies against a fake client or without a token.
+    """
+
+    def __init__(self):
+        self._settings: Optional["Settings"] = None
+        self._client: Optional[Any] = None
+        self._polling_scheduler: Optional["PollingScheduler"] = None
+        self._interval_batch_runner: Optional["IntervalBatchRunner"] = None
+
+    @property
+    def settings(self) -> "Settings":
+        if self._settings is None:
+            from app.settings import Settings
+
+            self._settings = Settings()
+        return self._settings
+
+    @property
+    def client(self) -> Any:
+        """
+        TinkoffClient, or RecordingClient around it if the sessions are recorded.
+        """
+        if self._client is None:
+            self._client = create_client(self.settings)
+        return self._client
+
+    @property
+    def polling_scheduler(self) -> "PollingScheduler":
+        if self._polling_scheduler is None:
+            from app.scheduler.polling import create_polling_scheduler
+
+            self._polling_scheduler = create_polling_scheduler(self.settings)
+        return self._polling_scheduler
+
+    @property
+    def interval_batch_runner(self) -> "IntervalBatchRunner":
+        if self._interval_batch_runner is None:
+            from app.strategies.interval.batch import IntervalBatchRunner
+
+            self._interval_batch_runner = IntervalBatchRunner(
+                interval=self.settings.batch_decisions_interval
+            )
+        return self._interval_batch_runner
+
+    def configure(self, settings: Optional["Settings"] = None, client: Optional[Any] = None):
+        """
+        Replaces the settings and/or the client. The modules which imported the proxies
+        see the new objects immediately. The services configured by the settings are created
+        again with the new settings.
+        """
+        if settings is not None:
+            self._settings = settings
+            self._polling_scheduler = None
+            self._interval_batch_runner = None
+        if client is not None:
+            self._client = client
+
+    def reset(self) -> None:
+        """
+        Forgets everything, the objects are created again on the next use.
+        """
+        self._settings = None
+        self._client = None
+        self._polling_scheduler = None
+        self._interval_batch_runner = None
+
+
+def create_client(settings: "Settings") -> Any:
+    """
+    Creates the broker client. The tinkoff library is imported here, not on import of app.
+    """
+    from app.client.recorder import RecordingClient, SessionRecorder
+    from app.client.tinkoff_client import TinkoffClient
+
+    client = TinkoffClient(token=settings.token, sandbox=settings.sandbox)
+    if settings.record_sessions_dir:
+        client = RecordingClient(client, SessionRecorder(settings.record_sessions_dir))
+    return client
+
+
+context = AppContext()
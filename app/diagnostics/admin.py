@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable
+
+from app.diagnostics.dumps import (
+    dump_tasks,
+    get_allocations_top,
+    get_strategies_memory,
+    stop_allocations_tracing,
+)
+from app.diagnostics.loop_monitor import LoopLagMonitor
+from app.diagnostics.profiler import (
+    format_folded,
+    format_top_functions,
+    get_top_functions,
+    sample_stacks,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_PROFILE_DURATION = 300
+
+HELP = """Commands:
+  lag                 event loop lag statistics
+  tasks               live asyncio tasks with their stacks
+  profile [seconds]   sampling profile of the event loop thread, 10 seconds by default
+  memory              approximate memory used by every strategy
+  allocations         top allocations by line. The first call starts tracing
+  allocations stop    stop allocations tracing
+"""
+
+
+class DiagnosticsServer:
+    """
+    On-demand diagnostics of the running bot.
+
+    Commands are accepted from a local unix socket, one command per connection.
+    Signals: SIGUSR1 logs live tasks, SIGUSR2 runs a profile for profile_duration seconds.
+    Profiles are also written to output_dir in the folded stacks format for flame graphs.
+    """
+
+    def __init__(
+        self,
+        monitor: LoopLagMonitor,
+        get_strategies: Callable[[], Dict[Hashable, Any]],
+        output_dir: str,
+        profile_duration: int = 30,
+        shared_objects: Iterable[Any] = (),
+    ):
+        """
+        :param monitor: event loop lag monitor
+        :param get_strategies: returns the running strategies by key
+        :param output_dir: directory for the profiles
+        :param profile_duration: duration in seconds of the profile started by a signal
+        :param shared_objects: objects which are not counted in the memory of strategies
+        """
+        self.monitor = monitor
+        self.get_strategies = get_strategies
+        self.output_dir = output_dir
+        self.profile_duration = profile_duration
+        self.shared_objects = list(shared_objects)
+        self._loop_thread_id = threading.get_ident()
+        self._profile_lock = asyncio.Lock()
+
+    async def profile(self, duration: float) -> str:
+        duration = min(max(duration, 0.1), MAX_PROFILE_DURATION)
+        if self._profile_lock.locked():
+            return "Another profile is in progress"
+        async with self._profile_lock:
+            samples = await asyncio.get_running_loop().run_in_executor(
+                None, sample_stacks, self._loop_thread_id, duration
+            )
+        samples_count = sum(samples.values())
+        if samples_count == 0:
+            return "No samples"
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, "w") as file:
+            file.write(format_folded(samples))
+        return (
+            f"{samples_count} samples in {duration}s. Folded stacks: {path}\n"
+            + format_top_functions(get_top_functions(samples), samples_count)
+        )
+
+    async def execute(self, command: str) -> str:
+        """
+        :param command: command line, see HELP
+        :return: command output
+        """
+        name, *args = command.split() or ["help"]
+        if name == "lag":
+            return " ".join(
+                f"{key}={value:.4f}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in self.monitor.get_stats().items()
+            )
+        if name == "tasks":
+            return dump_tasks()
+        if name == "profile":
+            try:
+                duration = float(args[0]) if args else 10.0
+            except ValueError:
+                return f"Invalid duration: {args[0]}"
+            return await self.profile(duration)
+        if name == "memory":
+            return get_strategies_memory(self.get_strategies(), exclude=self.shared_objects)
+        if name == "allocations":
+            if args == ["stop"]:
+                return stop_allocations_tracing()
+            return get_allocations_top()
+        return HELP
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            command = (await reader.readline()).decode().strip()
+            logger.info("Diagnostics command: %s", command, extra={"phase": "diagnostics"})
+            writer.write((await self.execute(command)).encode() + b"\n")
+            await writer.drain()
+        except Exception as e:
+            logger.error("Diagnostics command failed. %s", e, extra={"phase": "diagnostics"})
+        finally:
+            writer.close()
+
+    async def start_socket(self, path: str) -> asyncio.AbstractServer:
+        """
+        Listens to the commands on the unix socket. Only the owner can connect to it.
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self._handle_connection, path=path)
+        os.chmod(path, 0o600)
+        logger.info("Diagnostics socket is listening on %s", path)
+        return server
+
+    async def _log_command(self, command: str) -> None:
+        logger.info(
+            "Diagnostics %s:\n%s",
+            command,
+            await self.execute(command),
+            extra={"phase": "diagnostics"},
+        )
+
+    def install_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(
+            signal.SIGUSR1, lambda: asyncio.create_task(self._log_command("tasks"))
+        )
+        loop.add_signal_handler(
+            signal.SIGUSR2,
+            lambda: asyncio.create_task(self._log_command(f"profile {self.profile_duration}")),
+        )
@@ -0,0 +1,96 @@
+import asyncio
+import io
+import sys
+import tracemalloc
+from typing import Any, Dict, Hashable, Iterable, Optional, Set
+
+from app.diagnostics.loop_monitor import describe_task
+
+
+def dump_tasks(loop: Optional[asyncio.AbstractEventLoop] = None) -> str:
+    """
+    :return: live asyncio tasks with their stacks
+    """
+    tasks = sorted(asyncio.all_tasks(loop), key=lambda task: task.get_name())
+    output = io.StringIO()
+    output.write(f"{len(tasks)} tasks\n")
+    for task in tasks:
+        output.write(f"\n{describe_task(task)}\n")
+        task.print_stack(limit=10, file=output)
+    return output.getvalue()
+
+
+def get_object_size(obj: Any, exclude: Iterable[Any] = (), max_depth: int = 6) -> int:
+    """
+    Approximate memory used by the object and the objects it refers to.
+    Modules, classes and functions are not counted.
+
+    :param obj: object to measure
+    :param exclude: shared objects which are not counted, e.g. the client
+    :param max_depth: max depth of the references to follow
+    :return: size in bytes
+    """
+    seen: Set[int] = {id(value) for value in exclude}
+
+    def size(value: Any, depth: int) -> int:
+        if id(value) in seen or depth > max_depth or isinstance(value, (type, type(sys))):
+            return 0
+        if callable(value) and not hasattr(value, "__dict__"):
+            return 0
+        seen.add(id(value))
+        # numpy is not imported just to check, there are no arrays if it's not imported yet
+        numpy = sys.modules.get("numpy")
+        if numpy is not None and isinstance(value, numpy.ndarray):
+            return value.nbytes + sys.getsizeof(value)
+        total = sys.getsizeof(value)
+        if isinstance(value, dict):
+            total += sum(size(k, depth + 1) + size(v, depth + 1) for k, v in value.items())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            total += sum(size(item, depth + 1) for item in value)
+        if hasattr(value, "__dict__"):
+            total += size(vars(value), depth + 1)
+        for slot in getattr(type(value), "__slots__", ()):
+            if hasattr(value, slot):
+                total += size(getattr(value, slot), depth + 1)
+        return total
+
+    return size(obj, 0)
+
+
+def get_strategies_memory(strategies: Dict[Hashable, Any], exclude: Iterable[Any] = ()) -> str:
+    """
+    :param strategies: running strategies by key
+    :param exclude: shared objects which are not counted, e.g. the client
+    :return: approximate memory used by every strategy
+    """
+    rows = sorted(
+        ((get_object_size(strategy, exclude), key) for key, strategy in strategies.items()),
+        key=lambda row: row[0],
+        reverse=True,
+    )
+    lines = [f"{len(rows)} strategies, {sum(size for size, _ in rows) / 1024:.1f} KiB"]
+    lines += [f"{size / 1024:10.1f} KiB  {key}" for size, key in rows]
+    return "\n".join(lines)
+
+
+def get_allocations_top(limit: int = 20) -> str:
+    """
+    Top allocations by line. Tracing is started on the first call, so the first result only
+    contains allocations made after it. Tracing slows down allocations and is stopped
+    by stop_allocations_tracing.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        return "Allocations tracing is started. Request the snapshot again later"
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),)
+    )
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"Traced memory: current={current / 1024:.1f} KiB peak={peak / 1024:.1f} KiB"]
+    lines += [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
+    return "\n".join(lines)
+
+
+def stop_allocations_tracing() -> str:
+    tracemalloc.stop()
+    return "Allocations tracing is stopped"
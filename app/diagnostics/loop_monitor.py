@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def describe_task(task: Optional[asyncio.Task]) -> str:
+    if task is None:
+        return "no task (callback or loop internals)"
+    coroutine = task.get_coro()
+    return f"{task.get_name()} {getattr(coroutine, '__qualname__', coroutine)}"
+
+
+class LoopLagMonitor:
+    """
+    Measures the event loop scheduling delay and reports stalls.
+
+    A coroutine wakes up every interval and measures how late it is woken up. A watchdog thread
+    checks that the coroutine keeps waking up. If it doesn't for stall_threshold seconds,
+    the loop is blocked, and the stack of the loop thread and the running task are logged
+    while the stall is still happening.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.5,
+        stall_threshold: float = 1.0,
+        report_interval: float = 300,
+        window: int = 1000,
+    ):
+        """
+        :param interval: interval in seconds between the lag measurements
+        :param stall_threshold: loop blocking time in seconds to report the running task
+        :param report_interval: interval in seconds to log the lag statistics
+        :param window: number of the last measurements to calculate the statistics on
+        """
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.report_interval = report_interval
+        self.lags: Deque[float] = deque(maxlen=window)
+        self.stalls = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+        self._stopped = threading.Event()
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        :return: lag statistics in seconds over the last measurements
+        """
+        if not self.lags:
+            return {"samples": 0, "mean": 0.0, "p99": 0.0, "max": 0.0, "stalls": self.stalls}
+        lags = sorted(self.lags)
+        return {
+            "samples": len(lags),
+            "mean": sum(lags) / len(lags),
+            "p99": lags[int(0.99 * (len(lags) - 1))],
+            "max": lags[-1],
+            "stalls": self.stalls,
+        }
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stopped.wait(self.stall_threshold / 2):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat
+            if blocked_for < self.stall_threshold or heartbeat == reported_heartbeat:
+                continue
+            # The loop is blocked right now, so the stack shows the blocking code
+            reported_heartbeat = heartbeat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=20)) if frame else ""
+            logger.warning(
+                "Event loop is blocked for %.2fs. Running task: %s\n%s",
+                blocked_for,
+                describe_task(asyncio.current_task(self._loop)),
+                stack,
+                extra={"phase": "loop_lag", "latency": blocked_for, "rate_limit": True},
+            )
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        watchdog.start()
+        reported_at = time.monotonic()
+        try:
+            while True:
+                expected_at = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                self._heartbeat = time.monotonic()
+                self.lags.append(max(self._heartbeat - expected_at, 0.0))
+                if self._heartbeat - reported_at >= self.report_interval:
+                    reported_at = self._heartbeat
+                    stats = self.get_stats()
+                    logger.info(
+                        "Event loop lag: mean=%.4fs p99=%.4fs max=%.4fs stalls=%d",
+                        stats["mean"],
+                        stats["p99"],
+                        stats["max"],
+                        stats["stalls"],
+                        extra={"phase": "loop_lag"},
+                    )
+        finally:
+            self._stopped.set()
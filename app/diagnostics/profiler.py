@@ -0,0 +1,64 @@
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+
+def _collapse_stack(frame) -> str:
+    functions = []
+    while frame is not None:
+        code = frame.f_code
+        functions.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(functions))
+
+
+def sample_stacks(thread_id: int, duration: float, interval: float = 0.005) -> Counter:
+    """
+    Samples the stack of the thread. Blocking, should be run in another thread.
+    The sampled thread isn't slowed down, only its frames are read.
+
+    :param thread_id: id of the thread to sample
+    :param duration: sampling duration in seconds
+    :param interval: interval in seconds between the samples
+    :return: Counter of the collapsed stacks ("outer;...;inner" lines)
+    """
+    samples = Counter()
+    finish_at = time.monotonic() + duration
+    current_thread_id = threading.get_ident()
+    while time.monotonic() < finish_at:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None and thread_id != current_thread_id:
+            samples[_collapse_stack(frame)] += 1
+        time.sleep(interval)
+    return samples
+
+
+def format_folded(samples: Counter) -> str:
+    """
+    Formats the samples in the folded stacks format accepted by flame graph tools.
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+def get_top_functions(samples: Counter, limit: int = 20) -> List[Tuple[str, int, int]]:
+    """
+    :return: list of (function, own samples, total samples) sorted by total samples
+    """
+    own, total = Counter(), Counter()
+    for stack, count in samples.items():
+        functions = stack.split(";")
+        own[functions[-1]] += count
+        for function in set(functions):
+            total[function] += count
+    return [(function, own[function], count) for function, count in total.most_common(limit)]
+
+
+def format_top_functions(rows: Iterable[Tuple[str, int, int]], samples_count: int) -> str:
+    lines = [f"{'own %':>7} {'total %':>7}  function"]
+    for function, own, total in rows:
+        lines.append(
+            f"{own / samples_count * 100:7.1f} {total / samples_count * 100:7.1f}  {function}"
+        )
+    return "\n".join(lines)
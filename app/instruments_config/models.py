@@ -1,19 +1,101 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple, Type
 
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 
+from app.strategies.interval.models import IntervalStrategyConfig
 from app.strategies.models import StrategyName
 
+# Models of the strategies parameters to validate the config before it's applied
+STRATEGY_PARAMETERS_MODELS: Dict[StrategyName, Type[BaseModel]] = {
+    StrategyName.INTERVAL: IntervalStrategyConfig,
+}
+
 
 class StrategyConfig(BaseModel):
     name: StrategyName
     parameters: Dict[str, Any]
 
+    @validator("parameters")
+    def parameters_are_valid(cls, parameters: Dict[str, Any], values: Dict[str, Any]):
+        model = STRATEGY_PARAMETERS_MODELS.get(values.get("name"))
+        if model is not None:
+            model(**parameters)
+        return parameters
+
 
 class InstrumentConfig(BaseModel):
     figi: str
     strategy: StrategyConfig
+    # Accounts to trade the instrument on. By default, the accounts of the config are used
+    accounts: Optional[List[str]] = None
+
+
+class StrategyAssignment(BaseModel):
+    """
+    One strategy to run: the instrument config applied to one account.
+    account_id is None if no accounts are configured, the strategy chooses the account itself.
+    """
+
+    figi: str
+    account_id: Optional[str] = None
+    strategy: StrategyConfig
+
+    @property
+    def key(self) -> Tuple[str, Optional[str]]:
+        return self.figi, self.account_id
 
 
 class InstrumentsConfig(BaseModel):
+    # Accounts to trade the instruments on if they are not set for the instrument.
+    # By default, ACCOUNT_ID setting is used
+    accounts: List[str] = []
     instruments: List[InstrumentConfig]
+
+    @validator("instruments")
+    def figis_are_unique(
+        cls, instruments: List[InstrumentConfig], values: Dict[str, Any]
+    ) -> List[InstrumentConfig]:
+        keys = [
+            (instrument.figi, account_id)
+            for instrument in instruments
+            for account_id in set(instrument.accounts or values.get("accounts") or [None])
+        ]
+        duplicates = sorted({key[0] for key in keys if keys.count(key) > 1})
+        if duplicates:
+            raise ValueError(f"Instruments are configured more than once: {duplicates}")
+        return instruments
+
+    def get_assignments(self, default_account_id: Optional[str] = None) -> List[StrategyAssignment]:
+        """
+        Expands the instruments to the strategies to run, one per instrument and account.
+
+        :param default_account_id: account to use if no accounts are configured
+        :return: list of StrategyAssignment
+        """
+        assignments = []
+        for instrument in self.instruments:
+            account_ids = instrument.accounts or self.accounts or [default_account_id]
+            for account_id in dict.fromkeys(account_ids):
+                assignments.append(
+                    StrategyAssignment(
+                        figi=instrument.figi, account_id=account_id, strategy=instrument.strategy
+                    )
+                )
+        return assignments
+
+
+class InstrumentsConfigDiff(BaseModel):
+    """
+    Difference between two instruments configs by instrument and account.
+
+    added: strategies which are not present in the old config
+    removed: strategies which are not present in the new config
+    changed: strategies present in both configs with different strategy settings
+    """
+
+    added: List[StrategyAssignment] = []
+    removed: List[StrategyAssignment] = []
+    changed: List[StrategyAssignment] = []
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
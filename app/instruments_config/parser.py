@@ -1,4 +1,6 @@
-from app.instruments_config.models import InstrumentsConfig
+from typing import Optional
+
+from app.instruments_config.models import InstrumentsConfig, InstrumentsConfigDiff
 
 
 def get_instruments(filename: str = "instruments_config.json") -> InstrumentsConfig:
@@ -11,4 +13,33 @@ def get_instruments(filename: str = "instruments_config.json") -> InstrumentsCon
     return InstrumentsConfig.parse_file(filename)
 
 
-instruments_config = get_instruments()
+def diff_instruments(
+    old: InstrumentsConfig, new: InstrumentsConfig, default_account_id: Optional[str] = None
+) -> InstrumentsConfigDiff:
+    """
+    Compare two instruments configs by figi and account.
+
+    :param old: currently applied config
+    :param new: config to apply
+    :param default_account_id: account to use if no accounts are configured
+    :return: InstrumentsConfigDiff object
+    """
+    old_assignments = {
+        assignment.key: assignment for assignment in old.get_assignments(default_account_id)
+    }
+    new_assignments = {
+        assignment.key: assignment for assignment in new.get_assignments(default_account_id)
+    }
+    return InstrumentsConfigDiff(
+        added=[
+            assignment for key, assignment in new_assignments.items() if key not in old_assignments
+        ],
+        removed=[
+            assignment for key, assignment in old_assignments.items() if key not in new_assignments
+        ],
+        changed=[
+            assignment
+            for key, assignment in new_assignments.items()
+            if key in old_assignments and old_assignments[key] != assignment
+        ],
+    )
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import os
+from typing import AsyncIterator, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.instruments_config.models import InstrumentsConfig
+from app.instruments_config.parser import get_instruments
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentsConfigWatcher:
+    """
+    Watches instruments config file for changes.
+
+    The file is polled by its modification time and size, so no additional dependencies
+    are required. Invalid configs are reported and skipped, the last valid one stays applied.
+    """
+
+    def __init__(self, filename: str, check_interval: int):
+        self.filename = filename
+        self.check_interval = check_interval
+        self._file_signature: Optional[Tuple[int, int]] = None
+
+    def _get_file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> InstrumentsConfig:
+        """
+        Load the config and remember the file state it was loaded from.
+
+        :return: InstrumentsConfig object
+        """
+        self._file_signature = self._get_file_signature()
+        return get_instruments(self.filename)
+
+    async def watch(self) -> AsyncIterator[InstrumentsConfig]:
+        """
+        Yields a new config every time the file is changed and the new content is valid.
+        """
+        while True:
+            await asyncio.sleep(self.check_interval)
+            file_signature = self._get_file_signature()
+            if file_signature is None or file_signature == self._file_signature:
+                continue
+            self._file_signature = file_signature
+            try:
+                instruments_config = get_instruments(self.filename)
+            except (ValidationError, ValueError, OSError) as e:
+                logger.error(f"Failed to reload instruments config {self.filename}. {e}")
+                continue
+            logger.info(f"Instruments config {self.filename} has been changed")
+            yield instruments_config
@@ -1,29 +1,78 @@
 import asyncio
 import logging
+import sys
 
 from app.client import client
-from app.instruments_config.parser import instruments_config
+from app.context import context
+from app.diagnostics.admin import DiagnosticsServer
+from app.diagnostics.loop_monitor import LoopLagMonitor
+from app.instruments_config.watcher import InstrumentsConfigWatcher
 from app.settings import settings
-from app.strategies.strategy_fabric import resolve_strategy
+from app.strategies.manager import StrategiesManager
+from app.utils.log import setup_logging
 
-logging.basicConfig(
-    level=settings.log_level,
-    format="[%(levelname)-5s] %(asctime)-19s %(name)s:%(lineno)d: %(message)s",
-)
-logging.getLogger("tinkoff").setLevel(settings.tinkoff_library_log_level)
+logger = logging.getLogger(__name__)
+
+
+def configure_logging() -> None:
+    setup_logging(
+        level=settings.log_level,
+        use_queue=settings.log_async,
+        rate_limit_interval=settings.log_rate_limit_interval,
+        as_json=settings.log_json,
+    )
+    logging.getLogger("tinkoff").setLevel(settings.tinkoff_library_log_level)
+
+
+async def start_diagnostics(manager: StrategiesManager) -> None:
+    monitor = LoopLagMonitor(
+        interval=settings.loop_lag_interval, stall_threshold=settings.loop_stall_threshold
+    )
+    if settings.loop_lag_monitor:
+        asyncio.create_task(monitor.run())
+    diagnostics = DiagnosticsServer(
+        monitor=monitor,
+        get_strategies=lambda: manager.strategies,
+        output_dir=settings.diagnostics_dir,
+        profile_duration=settings.profile_duration,
+        shared_objects=(context.client, context.settings),
+    )
+    if settings.diagnostics_signals and sys.platform != "win32":
+        diagnostics.install_signal_handlers()
+    if settings.diagnostics_socket:
+        await diagnostics.start_socket(settings.diagnostics_socket)
 
 
 async def run():
+    configure_logging()
     await client.ainit()
-    spawned_tasks = []
-    for instrument_config in instruments_config.instruments:
-        strategy = resolve_strategy(
-            strategy_name=instrument_config.strategy.name,
-            figi=instrument_config.figi,
-            **instrument_config.strategy.parameters
+    try:
+        # Optional services are imported only if they are enabled
+        if settings.use_last_price_stream:
+            from app.market_data.last_price_stream import last_price_stream
+
+            asyncio.create_task(last_price_stream.run())
+        if settings.batch_decisions:
+            from app.strategies.interval.batch import interval_batch_runner
+
+            asyncio.create_task(interval_batch_runner.run())
+        watcher = InstrumentsConfigWatcher(
+            filename=settings.instruments_config_file,
+            check_interval=settings.instruments_config_reload_interval,
         )
-        spawned_tasks.append(asyncio.create_task(strategy.start()))
-    await asyncio.wait(spawned_tasks)
+        manager = StrategiesManager()
+        await start_diagnostics(manager)
+        manager.apply(watcher.load())
+        if settings.instruments_config_reload_interval > 0:
+            async for instruments_config in watcher.watch():
+                try:
+                    manager.apply(instruments_config)
+                except Exception:
+                    # The bot keeps running with the strategies it has, the next change is applied
+                    logger.exception("Failed to apply instruments config")
+        await manager.wait()
+    finally:
+        await client.aclose()
 
 
 if __name__ == "__main__":
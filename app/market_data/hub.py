@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class MarketDataHub:
+    """
+    Shares market data between the strategies trading the same instrument on different accounts,
+    so adding accounts doesn't multiply the market data requests.
+
+    Concurrent requests for the same data are coalesced into one request. If the instrument
+    is traded on more than one account, responses are also reused for ttl seconds.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Optional[str]]] = {}
+        self._in_flight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._cache: Dict[Tuple[str, Hashable], Tuple[float, Any]] = {}
+        self.requests = Counter()
+        self.shared = Counter()
+
+    def subscribe(self, figi: str, account_id: Optional[str]) -> None:
+        self._subscribers.setdefault(figi, set()).add(account_id)
+
+    def unsubscribe(self, figi: str, account_id: Optional[str]) -> None:
+        subscribers = self._subscribers.get(figi)
+        if subscribers is None:
+            return
+        subscribers.discard(account_id)
+        if not subscribers:
+            del self._subscribers[figi]
+            self._cache = {key: value for key, value in self._cache.items() if key[0] != figi}
+
+    def is_shared(self, figi: str) -> bool:
+        return len(self._subscribers.get(figi, ())) > 1
+
+    async def get(
+        self, figi: str, kind: Hashable, fetch: Callable[[], Awaitable[T]], ttl: float
+    ) -> T:
+        """
+        Gets the data from the cache, waits for the same request in flight or makes a new one.
+
+        :param figi: instrument the data belongs to
+        :param kind: kind of the data with the request parameters, e.g. ("candles", days)
+        :param fetch: function making the request
+        :param ttl: time in seconds to reuse the response if the instrument is shared
+        :return: response of the request
+        """
+        key = (figi, kind)
+        name = kind if isinstance(kind, str) else kind[0]
+        cached = self._cache.get(key)
+        if cached is not None and self.is_shared(figi):
+            expires_at, result = cached
+            if time.monotonic() < expires_at:
+                self.shared[name] += 1
+                return result
+        future = self._in_flight.get(key)
+        if future is None:
+            self.requests[name] += 1
+            future = asyncio.ensure_future(fetch())
+            self._in_flight[key] = future
+            future.add_done_callback(partial(self._on_fetched, key, ttl))
+        else:
+            self.shared[name] += 1
+        # The request isn't cancelled with one of the waiting strategies
+        return await asyncio.shield(future)
+
+    def _on_fetched(self, key: Tuple[str, Hashable], ttl: float, future: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        if self.is_shared(key[0]) and ttl > 0:
+            self._cache[key] = (time.monotonic() + ttl, future.result())
+
+
+market_data_hub = MarketDataHub()
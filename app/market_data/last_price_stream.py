@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Iterable, Optional, Set
+
+from tinkoff.invest import (
+    AioRequestError,
+    LastPriceInstrument,
+    MarketDataRequest,
+    SubscribeLastPriceRequest,
+    SubscriptionAction,
+)
+
+from app.client import client
+from app.stop_loss.engine import StopLossEngine, stop_loss_engine
+from app.utils.quotation import quotation_to_float
+
+logger = logging.getLogger(__name__)
+
+
+class LastPriceStream:
+    """
+    Streams last prices of the subscribed instruments to the stop loss engine,
+    so stop losses are triggered as soon as the price crosses the level
+    instead of waiting for the next strategy cycle.
+    """
+
+    def __init__(self, engine: StopLossEngine, reconnect_interval: int = 5):
+        self.engine = engine
+        self.reconnect_interval = reconnect_interval
+        # Accounts of the strategies using the prices by figi
+        self.subscribers: Dict[str, Set[Optional[str]]] = {}
+        self._changes: asyncio.Queue = asyncio.Queue()
+        # References to the running price checks, the loop keeps only weak ones
+        self._tasks: Set[asyncio.Task] = set()
+
+    def subscribe(self, figi: str, account_id: Optional[str] = None) -> None:
+        subscribers = self.subscribers.setdefault(figi, set())
+        if not subscribers:
+            self._changes.put_nowait(figi)
+        subscribers.add(account_id)
+
+    def unsubscribe(self, figi: str, account_id: Optional[str] = None) -> None:
+        """
+        Removes the subscriber. The instrument is unsubscribed once it has no subscribers left.
+        """
+        subscribers = self.subscribers.get(figi)
+        if subscribers is None:
+            return
+        subscribers.discard(account_id)
+        if not subscribers:
+            del self.subscribers[figi]
+            self._changes.put_nowait(figi)
+
+    @staticmethod
+    def _last_price_request(figis: Iterable[str], action: SubscriptionAction) -> MarketDataRequest:
+        return MarketDataRequest(
+            subscribe_last_price_request=SubscribeLastPriceRequest(
+                subscription_action=action,
+                instruments=[LastPriceInstrument(figi=figi) for figi in sorted(figis)],
+            )
+        )
+
+    async def _requests(self) -> AsyncIterator[MarketDataRequest]:
+        # Everything subscribed so far is requested on every (re)connect
+        while not self._changes.empty():
+            self._changes.get_nowait()
+        if self.subscribers:
+            yield self._last_price_request(
+                self.subscribers, SubscriptionAction.SUBSCRIPTION_ACTION_SUBSCRIBE
+            )
+        while True:
+            figis = {await self._changes.get()}
+            while not self._changes.empty():
+                figis.add(self._changes.get_nowait())
+            # The queue only tells which figis changed, the actual state is in the subscribers
+            subscribed = {figi for figi in figis if figi in self.subscribers}
+            if subscribed:
+                yield self._last_price_request(
+                    subscribed, SubscriptionAction.SUBSCRIPTION_ACTION_SUBSCRIBE
+                )
+            if figis - subscribed:
+                yield self._last_price_request(
+                    figis - subscribed, SubscriptionAction.SUBSCRIPTION_ACTION_UNSUBSCRIBE
+                )
+
+    def _on_price_handled(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Failed to check stop losses by the streamed price. %r",
+                task.exception(),
+                extra={"phase": "stop_loss"},
+            )
+
+    async def run(self) -> None:
+        while True:
+            try:
+                async for response in client.market_data_stream(self._requests()):
+                    if response.last_price is None:
+                        continue
+                    task = asyncio.create_task(
+                        self.engine.on_price(
+                            response.last_price.figi, quotation_to_float(response.last_price.price)
+                        )
+                    )
+                    self._tasks.add(task)
+                    task.add_done_callback(self._on_price_handled)
+            except AioRequestError as are:
+                logger.error("Last price stream error. Reconnecting. %s", are)
+            await asyncio.sleep(self.reconnect_interval)
+
+
+last_price_stream = LastPriceStream(stop_loss_engine)
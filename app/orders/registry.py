@@ -0,0 +1,212 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from tinkoff.invest import OrderExecutionReportStatus, OrderState, PostOrderResponse
+
+logger = logging.getLogger(__name__)
+
+FINAL_ORDER_STATUSES = [
+    OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_CANCELLED,
+    OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_REJECTED,
+    OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL,
+]
+# Status of an order which is not active at the broker anymore, but its final state is unknown
+FINISHED_UNKNOWN_STATUS = OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_UNSPECIFIED
+
+
+class TrackedOrder:
+    __slots__ = ("order_id", "account_id", "figi", "status")
+
+    def __init__(
+        self, order_id: str, account_id: str, figi: str, status: OrderExecutionReportStatus
+    ):
+        self.order_id = order_id
+        self.account_id = account_id
+        self.figi = figi
+        self.status = status
+
+    @property
+    def is_open(self) -> bool:
+        return self.status not in FINAL_ORDER_STATUSES and self.status != FINISHED_UNKNOWN_STATUS
+
+
+class OrderRegistry:
+    """
+    In-process registry of the orders posted by the bot.
+
+    Open orders are indexed by (account_id, figi), so strategies can check them in O(1)
+    and wait until there are no open orders without requesting the broker.
+    The registry is updated from post order responses and order states. It can be
+    reconciled with the broker by the list of active orders.
+    """
+
+    def __init__(self):
+        self.orders: Dict[str, TrackedOrder] = {}
+        self._open_orders: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self._no_open_orders: Dict[Tuple[str, str], asyncio.Event] = {}
+        self._finish_listeners: Dict[Tuple[str, str], List[Callable[[TrackedOrder], None]]] = (
+            defaultdict(list)
+        )
+
+    def add_finish_listener(
+        self, account_id: str, figi: str, listener: Callable[[TrackedOrder], None]
+    ) -> None:
+        """
+        Add a function to call when an order of the instrument gets a final status.
+        The listener is called synchronously and can be called more than once for the same order.
+
+        :param account_id: id of the account
+        :param figi: figi of the instrument
+        :param listener: function which takes the finished order
+        """
+        self._finish_listeners[(account_id, figi)].append(listener)
+
+    def remove_finish_listener(
+        self, account_id: str, figi: str, listener: Callable[[TrackedOrder], None]
+    ) -> None:
+        listeners = self._finish_listeners.get((account_id, figi), [])
+        if listener in listeners:
+            listeners.remove(listener)
+
+    def _get_event(self, key: Tuple[str, str]) -> asyncio.Event:
+        if key not in self._no_open_orders:
+            self._no_open_orders[key] = asyncio.Event()
+            if not self._open_orders[key]:
+                self._no_open_orders[key].set()
+        return self._no_open_orders[key]
+
+    def _set_status(
+        self, account_id: str, figi: str, order_id: str, status: OrderExecutionReportStatus
+    ) -> None:
+        order = self.orders.get(order_id)
+        if order is None:
+            order = TrackedOrder(order_id=order_id, account_id=account_id, figi=figi, status=status)
+            self.orders[order_id] = order
+        order.status = status
+
+        key = (order.account_id, order.figi)
+        if order.is_open:
+            self._open_orders[key].add(order_id)
+            self._get_event(key).clear()
+        else:
+            # Only open orders are kept, final ones are not needed anymore
+            self.orders.pop(order_id, None)
+            self._open_orders[key].discard(order_id)
+            if not self._open_orders[key]:
+                self._get_event(key).set()
+            for listener in self._finish_listeners.get(key, []):
+                listener(order)
+
+    def register(self, account_id: str, figi: str, posted_order: PostOrderResponse) -> None:
+        """
+        Register just posted order.
+
+        :param account_id: id of the account the order was posted for
+        :param figi: figi of the instrument
+        :param posted_order: response of the post order request
+        """
+        self._set_status(
+            account_id=account_id,
+            figi=figi,
+            order_id=posted_order.order_id,
+            status=posted_order.execution_report_status,
+        )
+
+    def update(self, account_id: str, order_state: OrderState) -> None:
+        """
+        Update order status from the order state.
+
+        :param account_id: id of the account the order belongs to
+        :param order_state: actual order state
+        """
+        self._set_status(
+            account_id=account_id,
+            figi=order_state.figi,
+            order_id=order_state.order_id,
+            status=order_state.execution_report_status,
+        )
+
+    def get_missing_orders(
+        self, account_id: str, active_orders: List[OrderState]
+    ) -> List[TrackedOrder]:
+        """
+        :param account_id: id of the account
+        :param active_orders: active orders of the account from the broker
+        :return: tracked orders of the account which are not active at the broker anymore
+        """
+        active_order_ids = {order.order_id for order in active_orders}
+        return [
+            order
+            for order in self.orders.values()
+            if order.account_id == account_id and order.order_id not in active_order_ids
+        ]
+
+    def sync(
+        self,
+        account_id: str,
+        active_orders: List[OrderState],
+        finished_orders: Iterable[OrderState] = (),
+    ) -> None:
+        """
+        Reconcile the registry with the list of active orders of the account from the broker.
+        Orders missing in the list get their status from finished_orders, the ones without
+        a state are finished with FINISHED_UNKNOWN_STATUS. Orders unknown to the registry,
+        e.g. posted manually, are added.
+
+        :param account_id: id of the account
+        :param active_orders: active orders of the account
+        :param finished_orders: actual states of the orders missing in active_orders
+        """
+        known_order_ids = set()
+        for order_state in finished_orders:
+            known_order_ids.add(order_state.order_id)
+            self.update(account_id, order_state)
+        for order in self.get_missing_orders(account_id, active_orders):
+            if order.order_id in known_order_ids:
+                continue
+            logger.debug(
+                "Order %s is not active anymore, its final status is unknown",
+                order.order_id,
+                extra={"figi": order.figi},
+            )
+            self._set_status(
+                account_id=account_id,
+                figi=order.figi,
+                order_id=order.order_id,
+                status=FINISHED_UNKNOWN_STATUS,
+            )
+        for order_state in active_orders:
+            if order_state.execution_report_status in FINAL_ORDER_STATUSES:
+                continue
+            self.update(account_id, order_state)
+
+    def has_open_orders(self, account_id: str, figi: str) -> bool:
+        return bool(self._open_orders.get((account_id, figi)))
+
+    def get_open_orders(self, account_id: str, figi: str) -> List[TrackedOrder]:
+        order_ids = self._open_orders.get((account_id, figi), ())
+        return [self.orders[order_id] for order_id in order_ids]
+
+    async def wait_for_no_open_orders(
+        self, account_id: str, figi: str, timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Wait until all the orders of the instrument are finished.
+
+        :param account_id: id of the account
+        :param figi: figi of the instrument
+        :param timeout: max time to wait in seconds
+        :return: True if there are no open orders, False if timeout is reached
+        """
+        if not self.has_open_orders(account_id, figi):
+            return True
+        try:
+            await asyncio.wait_for(self._get_event((account_id, figi)).wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+order_registry = OrderRegistry()
@@ -0,0 +1,216 @@
+import asyncio
+import heapq
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from app.settings import Settings
+from app.utils.lazy import LazyProxy
+
+logger = logging.getLogger(__name__)
+
+
+class PollingScheduler:
+    """
+    Central scheduler of instrument polls.
+
+    Every instrument asks for its next turn with a desired delay. Turns are kept in a priority
+    queue by due time and handed out not faster than the global request budget allows,
+    so instruments which are due first are polled first.
+
+    The delay is chosen by the distance from the last price to the interesting levels
+    (corridor borders, stop loss): the closer the price is, the more often it's polled.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float,
+        min_interval: float,
+        near_distance: float,
+        max_backoff: float,
+        report_interval: float = 300,
+    ):
+        self.requests_per_second = requests_per_second
+        self.min_interval = min_interval
+        self.near_distance = near_distance
+        self.max_backoff = max_backoff
+        self.report_interval = report_interval
+
+        # Turns are keyed by (account_id, figi)
+        self._queue: List[Tuple[float, int, Tuple[Optional[str], str]]] = []
+        self._sequence = 0
+        self._scheduled: Dict[Tuple[Optional[str], str], int] = {}
+        self._waiters: Dict[Tuple[Optional[str], str], asyncio.Future] = {}
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._tokens = 1.0
+        self._tokens_updated_at = 0.0
+        # Poll times of the last report interval by figi
+        self._polls: Dict[str, Deque[float]] = {}
+
+    def next_interval(
+        self, check_interval: float, last_price: Optional[float], levels: Iterable[Optional[float]]
+    ) -> float:
+        """
+        Calculate the delay before the next poll of the instrument.
+
+        The regular check_interval is used when the closest level is near_distance away
+        (relative to the price). Closer prices are polled proportionally more often,
+        down to min_interval. Farther prices are polled less often, up to
+        check_interval * max_backoff. Without a price the instrument is backed off completely.
+
+        :param check_interval: configured check interval of the instrument
+        :param last_price: last price of the instrument
+        :param levels: price levels to watch. None values are skipped
+        :return: delay in seconds
+        """
+        max_interval = check_interval * self.max_backoff
+        distances = (
+            [abs(last_price - level) / last_price for level in levels if level is not None]
+            if last_price
+            else []
+        )
+        if not distances:
+            return max_interval
+        interval = check_interval * min(distances) / self.near_distance
+        return min(max(interval, self.min_interval), max_interval)
+
+    def market_closed_interval(self, check_interval: float) -> float:
+        return check_interval * self.max_backoff
+
+    async def wait_turn(self, figi: str, delay: float, account_id: Optional[str] = None) -> None:
+        """
+        Wait for the next poll of the instrument. Returns not earlier than in delay seconds.
+
+        :param figi: figi of the instrument
+        :param delay: desired delay in seconds
+        :param account_id: account of the strategy. The same figi can be traded on several accounts,
+            every strategy has its own turn
+        """
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        key = (account_id, figi)
+        self._sequence += 1
+        self._scheduled[key] = self._sequence
+        heapq.heappush(self._queue, (loop.time() + delay, self._sequence, key))
+        waiter = loop.create_future()
+        self._waiters[key] = waiter
+        self._changed.set()
+        try:
+            await waiter
+        finally:
+            if self._waiters.get(key) is waiter:
+                del self._waiters[key]
+                del self._scheduled[key]
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._changed = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            asyncio.create_task(self._report())
+
+    def _wait_for_token(self, current_time: float) -> float:
+        """
+        Take a token from the request budget.
+
+        :return: 0 if the token is taken, otherwise time to wait for the next token
+        """
+        self._tokens = min(
+            1.0, self._tokens + (current_time - self._tokens_updated_at) * self.requests_per_second
+        )
+        self._tokens_updated_at = current_time
+        if self._tokens < 1.0:
+            return (1.0 - self._tokens) / self.requests_per_second
+        self._tokens -= 1.0
+        return 0.0
+
+    async def _wait_changed(self, timeout: Optional[float]) -> None:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._changed.clear()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._queue:
+                await self._wait_changed(None)
+                continue
+            due_time, sequence, key = self._queue[0]
+            if self._scheduled.get(key) != sequence:
+                # The turn was cancelled or rescheduled
+                heapq.heappop(self._queue)
+                continue
+            current_time = loop.time()
+            if due_time > current_time:
+                await self._wait_changed(due_time - current_time)
+                continue
+            wait_time = self._wait_for_token(current_time)
+            if wait_time > 0:
+                await asyncio.sleep(wait_time)
+                continue
+            heapq.heappop(self._queue)
+            self._register_poll(key[1])
+            waiter = self._waiters.get(key)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(None)
+
+    def _register_poll(self, figi: str) -> None:
+        current_time = time.monotonic()
+        polls = self._polls.setdefault(figi, deque())
+        polls.append(current_time)
+        while polls[0] < current_time - self.report_interval:
+            polls.popleft()
+
+    def get_polling_rates(self) -> Dict[str, float]:
+        """
+        Achieved polling rate of every instrument for the last report interval.
+
+        :return: polls per minute by figi
+        """
+        current_time = time.monotonic()
+        rates = {}
+        for figi, polls in self._polls.items():
+            recent_polls = [poll for poll in polls if poll >= current_time - self.report_interval]
+            rates[figi] = len(recent_polls) * 60 / self.report_interval
+        return rates
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            rates = self.get_polling_rates()
+            if not rates:
+                continue
+            logger.info(
+                "Polling rate: %.1f requests per minute for %d instruments, max %.1f (%s)",
+                sum(rates.values()),
+                len(rates),
+                max(rates.values()),
+                max(rates, key=rates.get),
+                extra={"phase": "polling"},
+            )
+            for figi, rate in rates.items():
+                logger.debug(
+                    "Polling rate: %.2f per minute", rate, extra={"figi": figi, "phase": "polling"}
+                )
+
+
+def create_polling_scheduler(settings: Settings) -> PollingScheduler:
+    return PollingScheduler(
+        requests_per_second=settings.polling_requests_per_second,
+        min_interval=settings.polling_min_interval,
+        near_distance=settings.polling_near_distance,
+        max_backoff=settings.polling_max_backoff,
+    )
+
+
+def get_polling_scheduler() -> PollingScheduler:
+    from app.context import context
+
+    return context.polling_scheduler
+
+
+# Created by the application context on the first use
+polling_scheduler: PollingScheduler = LazyProxy(get_polling_scheduler)  # type: ignore
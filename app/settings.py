@@ -3,6 +3,8 @@ from typing import Optional
 
 from pydantic import BaseSettings
 
+from app.utils.lazy import LazyProxy
+
 
 class Settings(BaseSettings):
     app_name: str = "qwertyo1"
@@ -11,10 +13,75 @@ class Settings(BaseSettings):
     sandbox: bool = True
     log_level = logging.DEBUG
     tinkoff_library_log_level = logging.INFO
+    # Write logs from a background thread instead of the event loop
+    log_async: bool = True
+    # Interval in seconds to pass repeated messages like "Waiting for the market to open"
+    log_rate_limit_interval: int = 600
+    log_json: bool = False
     use_candle_history_cache = True
+    # Check stop losses on every streamed last price instead of once per strategy cycle
+    use_last_price_stream: bool = False
+    # Poll prices more often near the corridor borders and the stop loss, less often far from them
+    adaptive_polling: bool = False
+    # Global budget of polls for all the instruments
+    polling_requests_per_second: float = 5.0
+    polling_min_interval: float = 1.0
+    # Relative distance from the price to the closest level at which check_interval is used
+    polling_near_distance: float = 0.005
+    # Max interval between polls as a multiplier of check_interval
+    polling_max_backoff: float = 4.0
+    # Makes decisions for all the interval strategies in one pass with one last prices request
+    batch_decisions: bool = False
+    batch_decisions_interval: float = 5.0
+    # gRPC API address. By default, the address from the tinkoff library is used
+    grpc_target: Optional[str] = None
+    # Use a plaintext channel, e.g. for a local stand-in server
+    grpc_insecure: bool = False
+    # Intervals in seconds of keepalive pings and of waiting for their acknowledgement
+    grpc_keepalive_time: int = 30
+    grpc_keepalive_timeout: int = 10
+    # Max time in seconds of one read request attempt
+    request_deadline: float = 5.0
+    post_order_deadline: float = 10.0
+    # Number of repeated attempts after unavailability, deadline and rate limit errors
+    request_retries: int = 2
+    # Base and max delays in seconds of the exponential backoff between the attempts
+    request_retry_backoff: float = 0.2
+    request_retry_max_backoff: float = 2.0
+    # Send a duplicate last prices, trading status or portfolio request if the first one
+    # is slower than p95 latency of the method, and take whichever returns first
+    hedged_requests: bool = False
+    hedge_min_delay: float = 0.05
+    # Time in seconds to reuse last prices and trading statuses of the instruments
+    # traded on several accounts
+    shared_market_data_ttl: float = 5.0
+    # Time in seconds to reuse candles history of the instruments traded on several accounts
+    shared_history_ttl: float = 60.0
+    # Measure the event loop lag and log the running task when the loop is blocked
+    loop_lag_monitor: bool = True
+    loop_lag_interval: float = 0.5
+    loop_stall_threshold: float = 1.0
+    # Unix socket for diagnostics commands. Disabled if not set
+    diagnostics_socket: Optional[str] = None
+    # SIGUSR1 logs live tasks, SIGUSR2 logs a sampling profile of profile_duration seconds
+    diagnostics_signals: bool = True
+    diagnostics_dir: str = "diagnostics"
+    profile_duration: int = 30
+    # Directory to record all the client requests and responses to. Disabled if not set
+    record_sessions_dir: Optional[str] = None
+    instruments_config_file: str = "instruments_config.json"
+    # Interval in seconds to check the instruments config file for changes. 0 disables reloading
+    instruments_config_reload_interval: int = 10
 
     class Config:
         env_file = ".env"
 
 
-settings = Settings()
+def get_settings() -> Settings:
+    from app.context import context
+
+    return context.settings
+
+
+# Settings are read on the first attribute access, so importing app doesn't require a token
+settings: Settings = LazyProxy(get_settings)  # type: ignore
@@ -1,4 +1,5 @@
 import sqlite3
+from contextlib import contextmanager
 
 
 class SQLiteClient:
@@ -12,6 +13,27 @@ class SQLiteClient:
     def close(self):
         self.conn.close()
 
+    def executescript(self, sql):
+        self.conn.executescript(sql)
+        self.conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yields a cursor. All the statements executed with it are committed together
+        or rolled back if an exception is raised.
+        """
+        cursor = self.conn.cursor()
+        try:
+            yield cursor
+        except BaseException:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+        finally:
+            cursor.close()
+
     def execute(self, sql, params=None):
         if params is None:
             params = []
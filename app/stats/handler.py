@@ -1,17 +1,19 @@
 import asyncio
+import logging
 
-from tinkoff.invest import OrderExecutionReportStatus, AioRequestError
+from tinkoff.invest import AioRequestError, OrderDirection
 
 from app.client import TinkoffClient
+from app.orders.registry import FINAL_ORDER_STATUSES, order_registry
 from app.stats.sqlite_client import StatsSQLiteClient
 from app.strategies.models import StrategyName
 from app.utils.quotation import quotation_to_float
 
-FINAL_ORDER_STATUSES = [
-    OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_CANCELLED,
-    OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_REJECTED,
-    OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL,
-]
+logger = logging.getLogger(__name__)
+
+# Delay in seconds between the order state requests, doubled after every failed request
+ORDER_STATE_POLL_INTERVAL = 10
+ORDER_STATE_MAX_POLL_INTERVAL = 300
 
 
 class StatsHandler:
@@ -39,6 +41,7 @@ class StatsHandler:
             )
         except AioRequestError:
             return
+        order_registry.update(account_id=account_id, order_state=order_state)
         self.db.add_order(
             order_id=order_id,
             figi=order_state.figi,
@@ -46,12 +49,43 @@ class StatsHandler:
             price=quotation_to_float(order_state.total_order_amount),
             quantity=order_state.lots_requested,
             status=str(order_state.execution_report_status),
+            strategy=self.strategy.value,
+            account_id=account_id,
         )
+        poll_interval = ORDER_STATE_POLL_INTERVAL
         while order_state.execution_report_status not in FINAL_ORDER_STATUSES:
-            await asyncio.sleep(10)
-            order_state = await self.broker_client.get_order_state(
-                account_id=account_id, order_id=order_id
-            )
-        self.db.update_order_status(
-            order_id=order_id, status=str(order_state.execution_report_status)
+            await asyncio.sleep(poll_interval)
+            previous_status = order_state.execution_report_status
+            try:
+                order_state = await self.broker_client.get_order_state(
+                    account_id=account_id, order_id=order_id
+                )
+            except AioRequestError as are:
+                # The order is still open, so it is tracked until its state is available again
+                poll_interval = min(poll_interval * 2, ORDER_STATE_MAX_POLL_INTERVAL)
+                logger.error(
+                    "Failed to get state of order %s, retrying in %s seconds. %s",
+                    order_id,
+                    poll_interval,
+                    are,
+                    extra={"figi": order_state.figi},
+                )
+                continue
+            poll_interval = ORDER_STATE_POLL_INTERVAL
+            order_registry.update(account_id=account_id, order_state=order_state)
+            if (
+                order_state.execution_report_status != previous_status
+                and order_state.execution_report_status not in FINAL_ORDER_STATUSES
+            ):
+                self.db.update_order_status(
+                    order_id=order_id, status=str(order_state.execution_report_status)
+                )
+        self.db.finalize_order(
+            order_id=order_id,
+            status=str(order_state.execution_report_status),
+            is_buy=order_state.direction == OrderDirection.ORDER_DIRECTION_BUY,
+            executed_price=quotation_to_float(order_state.average_position_price),
+            executed_amount=quotation_to_float(order_state.executed_order_price),
+            executed_lots=order_state.lots_executed,
+            commission=quotation_to_float(order_state.executed_commission),
         )
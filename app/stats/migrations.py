@@ -0,0 +1,100 @@
+import sqlite3
+from typing import List
+
+from app.sqlite.client import SQLiteClient
+
+# Each element is a migration script. Its index plus one is the schema version it leads to.
+# The applied version is stored in sqlite user_version pragma. Never change applied migrations,
+# add new ones to the end of the list instead.
+MIGRATIONS: List[str] = [
+    # 1: initial schema. Databases created before versioning already have this table
+    """
+    CREATE TABLE IF NOT EXISTS orders (
+        id str PRIMARY KEY,
+        figi str,
+        direction TEXT,
+        price REAL,
+        quantity INTEGER,
+        status TEXT
+    );
+    """,
+    # 2: order lifecycle, fills, ownership, indexes and daily PnL rollup
+    """
+    ALTER TABLE orders ADD COLUMN strategy TEXT;
+    ALTER TABLE orders ADD COLUMN account_id TEXT;
+    ALTER TABLE orders ADD COLUMN executed_price REAL;
+    ALTER TABLE orders ADD COLUMN executed_amount REAL;
+    ALTER TABLE orders ADD COLUMN executed_quantity INTEGER;
+    ALTER TABLE orders ADD COLUMN commission REAL;
+    ALTER TABLE orders ADD COLUMN created_at TEXT;
+    ALTER TABLE orders ADD COLUMN updated_at TEXT;
+    ALTER TABLE orders ADD COLUMN finalized_at TEXT;
+
+    CREATE INDEX IF NOT EXISTS idx_orders_figi_created_at ON orders (figi, created_at);
+    CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at);
+    CREATE INDEX IF NOT EXISTS idx_orders_account_id ON orders (account_id);
+
+    CREATE TABLE IF NOT EXISTS order_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id TEXT NOT NULL,
+        status TEXT,
+        created_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_order_events_order_id ON order_events (order_id, created_at);
+
+    CREATE TABLE IF NOT EXISTS pnl_daily (
+        figi TEXT NOT NULL,
+        day TEXT NOT NULL,
+        bought_quantity INTEGER NOT NULL DEFAULT 0,
+        sold_quantity INTEGER NOT NULL DEFAULT 0,
+        buy_amount REAL NOT NULL DEFAULT 0,
+        sell_amount REAL NOT NULL DEFAULT 0,
+        commission REAL NOT NULL DEFAULT 0,
+        orders_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (figi, day)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_pnl_daily_day ON pnl_daily (day);
+    """,
+    # 3: realized PnL by average cost. Positions held before this version are unknown
+    """
+    ALTER TABLE pnl_daily ADD COLUMN realized_pnl REAL NOT NULL DEFAULT 0;
+
+    CREATE TABLE IF NOT EXISTS positions (
+        account_id TEXT NOT NULL,
+        figi TEXT NOT NULL,
+        lots INTEGER NOT NULL DEFAULT 0,
+        cost REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (account_id, figi)
+    ) WITHOUT ROWID;
+    """,
+    # 4: executed quantities are stored in lots, the columns are named so
+    """
+    ALTER TABLE orders RENAME COLUMN executed_quantity TO executed_lots;
+    ALTER TABLE pnl_daily RENAME COLUMN bought_quantity TO bought_lots;
+    ALTER TABLE pnl_daily RENAME COLUMN sold_quantity TO sold_lots;
+    """,
+]
+
+
+def get_schema_version(db_client: SQLiteClient) -> int:
+    return db_client.execute_select_one("PRAGMA user_version")[0]
+
+
+def migrate(db_client: SQLiteClient) -> int:
+    """
+    Applies all the migrations which are not applied yet.
+    Every migration is applied in its own transaction together with the version bump.
+
+    :param db_client: connected sqlite client
+    :return: schema version after migration
+    """
+    version = get_schema_version(db_client)
+    for new_version, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        try:
+            db_client.executescript(
+                f"BEGIN;\n{script}\nPRAGMA user_version = {new_version};\nCOMMIT;"
+            )
+        except sqlite3.Error:
+            db_client.conn.rollback()
+            raise
+    return get_schema_version(db_client)
@@ -1,26 +1,48 @@
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
 from app.sqlite.client import SQLiteClient
+from app.stats.migrations import migrate
+
+
+def _utc_now() -> str:
+    return datetime.now(tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def apply_fill(
+    lots: int, cost: float, is_buy: bool, quantity: int, amount: float, commission: float
+) -> Tuple[int, float, float]:
+    """
+    Applies a fill to the position by the average cost method.
+    Buy commission is a part of the position cost, sell commission reduces the realized PnL.
+    Sold lots beyond the position (e.g. bought before the stats were collected) realize nothing.
+
+    :param lots: position quantity in lots
+    :param cost: total cost of the position
+    :param is_buy: whether the fill is a buy
+    :param quantity: filled quantity in lots
+    :param amount: money amount of the fill
+    :param commission: commission of the fill
+    :return: position lots, position cost and realized PnL after the fill
+    """
+    if is_buy:
+        return lots + quantity, cost + amount + commission, 0.0
+    closed_lots = min(quantity, lots)
+    if closed_lots == 0:
+        return lots, cost, -commission
+    closed_cost = cost * closed_lots / lots
+    realized_pnl = amount * closed_lots / quantity - closed_cost - commission
+    return lots - closed_lots, cost - closed_cost, realized_pnl
 
 
 class StatsSQLiteClient:
     def __init__(self, db_name: str):
         self.db_client = SQLiteClient(db_name)
         self.db_client.connect()
+        self.db_client.execute("PRAGMA journal_mode=WAL")
+        self.db_client.execute("PRAGMA synchronous=NORMAL")
 
-        self._create_tables()
-
-    def _create_tables(self):
-        self.db_client.execute(
-            """
-            CREATE TABLE IF NOT EXISTS orders (
-                id str PRIMARY KEY,
-                figi str,
-                direction TEXT,
-                price REAL,
-                quantity INTEGER,
-                status TEXT
-            )
-            """
-        )
+        migrate(self.db_client)
 
     def add_order(
         self,
@@ -30,17 +52,153 @@ class StatsSQLiteClient:
         price: float,
         quantity: int,
         status: str,
+        strategy: Optional[str] = None,
+        account_id: Optional[str] = None,
     ):
-        self.db_client.execute_insert(
-            "INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?)",
-            (order_id, figi, order_direction, price, quantity, status),
-        )
+        created_at = _utc_now()
+        with self.db_client.transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO orders "
+                "(id, figi, direction, price, quantity, status, strategy, account_id, "
+                "created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    order_id,
+                    figi,
+                    order_direction,
+                    price,
+                    quantity,
+                    status,
+                    strategy,
+                    account_id,
+                    created_at,
+                    created_at,
+                ),
+            )
+            cursor.execute(
+                "INSERT INTO order_events (order_id, status, created_at) VALUES (?, ?, ?)",
+                (order_id, status, created_at),
+            )
 
     def get_orders(self):
         return self.db_client.execute_select("SELECT * FROM orders")
 
     def update_order_status(self, order_id: str, status: str):
-        self.db_client.execute_update(
-            "UPDATE orders SET status=? WHERE id=?",
-            (status, order_id),
+        updated_at = _utc_now()
+        with self.db_client.transaction() as cursor:
+            cursor.execute(
+                "UPDATE orders SET status=?, updated_at=? WHERE id=?",
+                (status, updated_at, order_id),
+            )
+            cursor.execute(
+                "INSERT INTO order_events (order_id, status, created_at) VALUES (?, ?, ?)",
+                (order_id, status, updated_at),
+            )
+
+    def finalize_order(
+        self,
+        order_id: str,
+        status: str,
+        is_buy: bool,
+        executed_price: float,
+        executed_amount: float,
+        executed_lots: int,
+        commission: float,
+    ):
+        """
+        Stores the final state of the order, applies its fill to the position of the account
+        and adds it to the daily PnL rollup.
+        The rollup is updated once per order, repeated calls only update the order status.
+
+        :param order_id: id of the order
+        :param status: final status of the order
+        :param is_buy: whether the order is a buy order
+        :param executed_price: average price of the executed instruments
+        :param executed_amount: total money amount of the executed part of the order
+        :param executed_lots: number of executed lots
+        :param commission: executed commission
+        """
+        finalized_at = _utc_now()
+        with self.db_client.transaction() as cursor:
+            cursor.execute(
+                "UPDATE orders SET status=?, executed_price=?, executed_amount=?, "
+                "executed_lots=?, commission=?, updated_at=?, finalized_at=? "
+                "WHERE id=? AND finalized_at IS NULL",
+                (
+                    status,
+                    executed_price,
+                    executed_amount,
+                    executed_lots,
+                    commission,
+                    finalized_at,
+                    finalized_at,
+                    order_id,
+                ),
+            )
+            is_first_finalization = cursor.rowcount > 0
+            cursor.execute(
+                "INSERT INTO order_events (order_id, status, created_at) VALUES (?, ?, ?)",
+                (order_id, status, finalized_at),
+            )
+            if not is_first_finalization or executed_lots == 0:
+                return
+            figi, account_id = cursor.execute(
+                "SELECT figi, COALESCE(account_id, '') FROM orders WHERE id=?", (order_id,)
+            ).fetchone()
+            position = cursor.execute(
+                "SELECT lots, cost FROM positions WHERE account_id=? AND figi=?",
+                (account_id, figi),
+            ).fetchone()
+            lots, cost, realized_pnl = apply_fill(
+                *(position or (0, 0.0)),
+                is_buy=is_buy,
+                quantity=executed_lots,
+                amount=executed_amount,
+                commission=commission,
+            )
+            cursor.execute(
+                "INSERT INTO positions (account_id, figi, lots, cost) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (account_id, figi) DO UPDATE SET "
+                "lots=excluded.lots, cost=excluded.cost",
+                (account_id, figi, lots, cost),
+            )
+            cursor.execute(
+                "INSERT INTO pnl_daily "
+                "(figi, day, bought_lots, sold_lots, buy_amount, sell_amount, "
+                "commission, realized_pnl, orders_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT (figi, day) DO UPDATE SET "
+                "bought_lots=bought_lots + excluded.bought_lots, "
+                "sold_lots=sold_lots + excluded.sold_lots, "
+                "buy_amount=buy_amount + excluded.buy_amount, "
+                "sell_amount=sell_amount + excluded.sell_amount, "
+                "commission=commission + excluded.commission, "
+                "realized_pnl=realized_pnl + excluded.realized_pnl, "
+                "orders_count=orders_count + 1",
+                (
+                    figi,
+                    finalized_at[:10],
+                    executed_lots if is_buy else 0,
+                    0 if is_buy else executed_lots,
+                    executed_amount if is_buy else 0.0,
+                    0.0 if is_buy else executed_amount,
+                    commission,
+                    realized_pnl,
+                ),
+            )
+
+    def get_pnl_by_figi(self, since: date) -> List[Tuple]:
+        """
+        Get realized PnL aggregated by instrument from the daily rollup.
+        PnL of a sell is its amount minus the average cost of the sold lots and the commission,
+        open positions don't affect it.
+
+        :param since: first day to include
+        :return: list of (figi, pnl, bought_lots, sold_lots, commission, orders_count)
+        """
+        return self.db_client.execute_select(
+            "SELECT figi, SUM(realized_pnl) AS pnl, "
+            "SUM(bought_lots), SUM(sold_lots), SUM(commission), SUM(orders_count) "
+            "FROM pnl_daily WHERE day >= ? GROUP BY figi ORDER BY pnl DESC",
+            (since.isoformat(),),
         )
@@ -0,0 +1,124 @@
+import asyncio
+import bisect
+import logging
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StopTrigger:
+    """
+    Stop loss trigger of one position. Fires when the price is lower than or equal to the level.
+    """
+
+    __slots__ = ("account_id", "figi", "level", "quantity", "callback")
+
+    def __init__(
+        self,
+        account_id: str,
+        figi: str,
+        level: float,
+        quantity: int,
+        callback: Callable[["StopTrigger", float], Awaitable[None]],
+    ):
+        self.account_id = account_id
+        self.figi = figi
+        self.level = level
+        self.quantity = quantity
+        self.callback = callback
+
+    def __lt__(self, other: "StopTrigger") -> bool:
+        return self.level < other.level
+
+
+class StopLossEngine:
+    """
+    Keeps stop loss levels of all the open positions.
+
+    Triggers are indexed by figi and sorted by level, so the highest level is always the last one.
+    Checking a price which doesn't cross any level is O(1). Crossed triggers are removed and their
+    callbacks are called. A trigger has to be set again when the position changes.
+    """
+
+    def __init__(self):
+        self._triggers: Dict[str, List[StopTrigger]] = {}
+        self._triggers_by_position: Dict[Tuple[str, str], StopTrigger] = {}
+
+    def set_trigger(
+        self,
+        account_id: str,
+        figi: str,
+        level: float,
+        quantity: int,
+        callback: Callable[[StopTrigger, float], Awaitable[None]],
+    ) -> StopTrigger:
+        """
+        Set or replace the stop loss trigger of the position.
+
+        :param account_id: id of the account
+        :param figi: figi of the instrument
+        :param level: price level to trigger at
+        :param quantity: position quantity
+        :param callback: coroutine function called with the trigger and the price which crossed it
+        :return: the new trigger
+        """
+        self.remove_trigger(account_id, figi)
+        trigger = StopTrigger(
+            account_id=account_id, figi=figi, level=level, quantity=quantity, callback=callback
+        )
+        bisect.insort(self._triggers.setdefault(figi, []), trigger)
+        self._triggers_by_position[(account_id, figi)] = trigger
+        return trigger
+
+    def remove_trigger(self, account_id: str, figi: str) -> None:
+        trigger = self._triggers_by_position.pop((account_id, figi), None)
+        if trigger is None:
+            return
+        triggers = self._triggers[figi]
+        triggers.remove(trigger)
+        if not triggers:
+            del self._triggers[figi]
+
+    def get_trigger(self, account_id: str, figi: str) -> StopTrigger:
+        return self._triggers_by_position.get((account_id, figi))
+
+    def pop_crossed(self, figi: str, price: float) -> List[StopTrigger]:
+        """
+        Remove and return the triggers of the instrument crossed by the price.
+        """
+        triggers = self._triggers.get(figi)
+        if not triggers or price > triggers[-1].level:
+            return []
+        crossed = []
+        while triggers and price <= triggers[-1].level:
+            trigger = triggers.pop()
+            del self._triggers_by_position[(trigger.account_id, trigger.figi)]
+            crossed.append(trigger)
+        if not triggers:
+            del self._triggers[figi]
+        return crossed
+
+    async def on_price(self, figi: str, price: float) -> List[StopTrigger]:
+        """
+        Check the new price of the instrument and run callbacks of the crossed triggers.
+
+        :param figi: figi of the instrument
+        :param price: new price
+        :return: crossed triggers
+        """
+        crossed = self.pop_crossed(figi, price)
+        if crossed:
+            results = await asyncio.gather(
+                *(trigger.callback(trigger, price) for trigger in crossed), return_exceptions=True
+            )
+            for trigger, result in zip(crossed, results):
+                if isinstance(result, Exception):
+                    logger.error(
+                        "Stop loss handling failed. %s",
+                        result,
+                        extra={"figi": figi, "phase": "stop_loss"},
+                    )
+        return crossed
+
+
+stop_loss_engine = StopLossEngine()
@@ -1,11 +1,19 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 
 class BaseStrategy(ABC):
     @abstractmethod
-    def __init__(self, figi: str, *args, **kwargs):
+    def __init__(self, figi: str, account_id: Optional[str] = None, *args, **kwargs):
         pass
 
     @abstractmethod
     async def start(self):
         pass
+
+    @abstractmethod
+    def update_config(self, **kwargs):
+        """
+        Apply new strategy parameters to the running strategy without resetting its state.
+        """
+        pass
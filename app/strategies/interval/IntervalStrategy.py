@@ -1,11 +1,18 @@
 import asyncio
 import logging
+import time
 from datetime import timedelta
 from typing import List, Optional
 from uuid import uuid4
 
-import numpy as np
-from tinkoff.invest import CandleInterval, HistoricCandle, AioRequestError, Instrument
+from tinkoff.invest import (
+    CandleInterval,
+    GetTradingStatusResponse,
+    HistoricCandle,
+    AioRequestError,
+    Instrument,
+    PostOrderResponse,
+)
 from tinkoff.invest.grpc.instruments_pb2 import INSTRUMENT_ID_TYPE_FIGI
 from tinkoff.invest.grpc.orders_pb2 import (
     ORDER_DIRECTION_SELL,
@@ -15,12 +22,19 @@ from tinkoff.invest.grpc.orders_pb2 import (
 from tinkoff.invest.utils import now
 
 from app.client import client
+from app.market_data.hub import market_data_hub
+from app.market_data.last_price_stream import last_price_stream
+from app.orders.registry import TrackedOrder, order_registry
+from app.scheduler.polling import polling_scheduler
 from app.settings import settings
 from app.stats.handler import StatsHandler
+from app.stop_loss.engine import StopTrigger, stop_loss_engine
+from app.strategies.interval.batch import interval_batch_runner
+from app.strategies.interval.decisions import calculate_corridor
 from app.strategies.interval.models import IntervalStrategyConfig, Corridor
 from app.strategies.base import BaseStrategy
 from app.strategies.models import StrategyName
-from app.utils.portfolio import get_position, get_order
+from app.utils.portfolio import get_position
 from app.utils.quantity import is_quantity_valid
 from app.utils.quotation import quotation_to_float
 
@@ -39,25 +53,52 @@ class IntervalStrategy(BaseStrategy):
     that the interval is from 10th to 90th percentile.
     """
 
-    def __init__(self, figi: str, **kwargs):
-        self.account_id = settings.account_id
+    def __init__(self, figi: str, account_id: Optional[str] = None, **kwargs):
+        self.account_id = account_id if account_id is not None else settings.account_id
         self.corridor: Optional[Corridor] = None
+        self.corridor_updated_at = 0.0
+        self.last_price: Optional[float] = None
         self.figi = figi
         self.instrument_info: Optional[Instrument] = None
         self.config: IntervalStrategyConfig = IntervalStrategyConfig(**kwargs)
         self.stats_handler = StatsHandler(StrategyName.INTERVAL, client)
+        self.position_quantity = 0
+        self.position_price = 0.0
+        self.is_position_outdated = True
+        self.is_trading_available = False
+
+    def update_config(self, **kwargs) -> None:
+        """
+        Replaces strategy configuration. New values are used starting from the next cycle.
+        """
+        self.config = IntervalStrategyConfig(**kwargs)
+        # Stop loss level depends on the config
+        self.is_position_outdated = True
+        self.publish_state()
+        logger.info("Configuration updated: %s", self.config, extra={"figi": self.figi})
 
     async def get_historical_data(self) -> List[HistoricCandle]:
         """
         Gets historical data for the instrument. Returns list of candles.
         Requests all the 1-min candles from days_back_to_consider days back to now.
+        The candles are shared with the strategies of the instrument on other accounts.
 
         :return: list of HistoricCandle
         """
+        return await market_data_hub.get(
+            self.figi,
+            ("candles", self.config.days_back_to_consider),
+            self.download_historical_data,
+            ttl=settings.shared_history_ttl,
+        )
+
+    async def download_historical_data(self) -> List[HistoricCandle]:
         candles = []
+        started_at = time.perf_counter()
         logger.debug(
-            f"Start getting historical data for {self.config.days_back_to_consider} "
-            f"days back from now. figi={self.figi}"
+            "Start getting historical data for %s days back from now",
+            self.config.days_back_to_consider,
+            extra={"figi": self.figi, "phase": "history"},
         )
         async for candle in client.get_all_candles(
             figi=self.figi,
@@ -66,7 +107,15 @@ class IntervalStrategy(BaseStrategy):
             interval=CandleInterval.CANDLE_INTERVAL_1_MIN,
         ):
             candles.append(candle)
-        logger.debug(f"Found {len(candles)} candles. figi={self.figi}")
+        logger.debug(
+            "Found %d candles",
+            len(candles),
+            extra={
+                "figi": self.figi,
+                "phase": "history",
+                "latency": time.perf_counter() - started_at,
+            },
+        )
         return candles
 
     async def update_corridor(self) -> None:
@@ -79,24 +128,118 @@ class IntervalStrategy(BaseStrategy):
         values = []
         for candle in candles:
             values.append(quotation_to_float(candle.close))
-        lower_percentile = (1 - self.config.interval_size) / 2 * 100
-        corridor = list(np.percentile(values, [lower_percentile, 100 - lower_percentile]))
+        bottom, top = calculate_corridor(values, self.config.interval_size)
         logger.debug(
-            f"Corridor: {corridor}. days_back_to_consider={self.config.days_back_to_consider} "
-            f"figi={self.figi}"
+            "Corridor: %s. days_back_to_consider=%s",
+            [bottom, top],
+            self.config.days_back_to_consider,
+            extra={"figi": self.figi, "phase": "corridor"},
         )
-        self.corridor = Corridor(bottom=corridor[0], top=corridor[1])
+        self.corridor = Corridor(bottom=bottom, top=top)
+        self.corridor_updated_at = time.monotonic()
+        self.publish_state()
 
-    async def get_position_quantity(self) -> int:
+    def is_corridor_outdated(self) -> bool:
         """
-        Get quantity of the instrument in the position.
-        :return: int - quantity
+        The corridor is recalculated once per check_interval. With adaptive polling prices
+        can be checked more often, but the history is still requested once per check_interval.
+        """
+        if not settings.adaptive_polling:
+            return True
+        return (
+            self.corridor is None
+            or time.monotonic() - self.corridor_updated_at >= self.config.check_interval
+        )
+
+    def handle_posted_order(self, posted_order: PostOrderResponse) -> None:
+        """
+        Registers the posted order and starts tracking its state in the background.
+
+        :param posted_order: response of the post order request
+        """
+        order_registry.register(
+            account_id=self.account_id, figi=self.figi, posted_order=posted_order
+        )
+        asyncio.create_task(
+            self.stats_handler.handle_new_order(
+                order_id=posted_order.order_id, account_id=self.account_id
+            )
+        )
+
+    async def sync_orders(self) -> None:
+        """
+        Reconciles the order registry with the active orders of the account.
+        Final states of the orders which are not active anymore are requested separately,
+        because filled and cancelled orders are missing in the active orders alike.
+        """
+        orders = await client.get_orders(account_id=self.account_id)
+        finished_orders = []
+        for order in order_registry.get_missing_orders(self.account_id, orders.orders):
+            try:
+                finished_orders.append(
+                    await client.get_order_state(
+                        account_id=self.account_id, order_id=order.order_id
+                    )
+                )
+            except AioRequestError as are:
+                logger.error(
+                    "Error getting state of order %s. %s",
+                    order.order_id,
+                    are,
+                    extra={"figi": order.figi},
+                )
+        order_registry.sync(
+            account_id=self.account_id,
+            active_orders=orders.orders,
+            finished_orders=finished_orders,
+        )
+
+    def on_order_finished(self, order: TrackedOrder) -> None:
+        self.is_position_outdated = True
+
+    async def refresh_position(self) -> None:
+        """
+        Gets the position from the portfolio and updates its stop loss trigger.
         """
         positions = (await client.get_portfolio(account_id=self.account_id)).positions
         position = get_position(positions, self.figi)
         if position is None:
-            return 0
-        return int(quotation_to_float(position.quantity))
+            self.position_quantity, self.position_price = 0, 0.0
+        else:
+            self.position_quantity = int(quotation_to_float(position.quantity))
+            self.position_price = quotation_to_float(position.average_position_price)
+        self.is_position_outdated = False
+        self.update_stop_loss_trigger()
+        self.publish_state()
+
+    def publish_state(self) -> None:
+        """
+        Writes the corridor and the position to the batch decision pass if it's enabled.
+        """
+        if settings.batch_decisions:
+            interval_batch_runner.update_state(self)
+
+    def update_stop_loss_trigger(self) -> None:
+        if self.position_quantity <= 0 or self.position_price <= 0:
+            stop_loss_engine.remove_trigger(self.account_id, self.figi)
+            return
+        stop_loss_engine.set_trigger(
+            account_id=self.account_id,
+            figi=self.figi,
+            level=self.position_price - self.position_price * self.config.stop_loss_percent,
+            quantity=self.position_quantity,
+            callback=self.handle_stop_loss,
+        )
+        if settings.use_last_price_stream:
+            last_price_stream.subscribe(self.figi, self.account_id)
+
+    async def get_position_quantity(self) -> int:
+        """
+        Get quantity of the instrument in the position.
+        :return: int - quantity
+        """
+        await self.refresh_position()
+        return self.position_quantity
 
     async def handle_corridor_crossing_top(self, last_price: float) -> None:
         """
@@ -108,7 +251,10 @@ class IntervalStrategy(BaseStrategy):
         position_quantity = await self.get_position_quantity()
         if position_quantity > 0:
             logger.info(
-                f"Selling {position_quantity} shares. Last price={last_price} figi={self.figi}"
+                "Selling %s shares. Last price=%s",
+                position_quantity,
+                last_price,
+                extra={"figi": self.figi, "phase": "order"},
             )
             try:
                 quantity = position_quantity / self.instrument_info.lot
@@ -123,13 +269,9 @@ class IntervalStrategy(BaseStrategy):
                     account_id=self.account_id,
                 )
             except Exception as e:
-                logger.error(f"Failed to post sell order. figi={self.figi}. {e}")
+                logger.error("Failed to post sell order. %s", e, extra={"figi": self.figi})
                 return
-            asyncio.create_task(
-                self.stats_handler.handle_new_order(
-                    order_id=posted_order.order_id, account_id=self.account_id
-                )
-            )
+            self.handle_posted_order(posted_order)
 
     async def handle_corridor_crossing_bottom(self, last_price: float) -> None:
         """
@@ -142,7 +284,10 @@ class IntervalStrategy(BaseStrategy):
         if position_quantity < self.config.quantity_limit:
             quantity_to_buy = self.config.quantity_limit - position_quantity
             logger.info(
-                f"Buying {quantity_to_buy} shares. Last price={last_price} figi={self.figi}"
+                "Buying %s shares. Last price=%s",
+                quantity_to_buy,
+                last_price,
+                extra={"figi": self.figi, "phase": "order"},
             )
             try:
                 quantity = quantity_to_buy / self.instrument_info.lot
@@ -157,69 +302,120 @@ class IntervalStrategy(BaseStrategy):
                     account_id=self.account_id,
                 )
             except Exception as e:
-                logger.error(f"Failed to post buy order. figi={self.figi}. {e}")
+                logger.error("Failed to post buy order. %s", e, extra={"figi": self.figi})
                 return
-            asyncio.create_task(
-                self.stats_handler.handle_new_order(
-                    order_id=posted_order.order_id, account_id=self.account_id
-                )
-            )
+            self.handle_posted_order(posted_order)
 
     async def get_last_price(self) -> float:
         """
         Get last price of the instrument.
         :return: float - last price
         """
-        last_prices_response = await client.get_last_prices(figi=[self.figi])
-        last_prices = last_prices_response.last_prices
-        return quotation_to_float(last_prices.pop().price)
+        last_prices_response = await market_data_hub.get(
+            self.figi,
+            "last_prices",
+            lambda: client.get_last_prices(figi=[self.figi]),
+            ttl=settings.shared_market_data_ttl,
+        )
+        # The response can be shared, so it's not modified
+        return quotation_to_float(last_prices_response.last_prices[-1].price)
 
-    async def validate_stop_loss(self, last_price: float) -> None:
+    async def handle_stop_loss(self, trigger: StopTrigger, last_price: float) -> None:
         """
-        Check if stop loss is reached. If yes, then sells all the shares.
-        :param last_price: Last price of the instrument.
+        This method is called by the stop loss engine when the price crosses the stop loss level.
+        Sells all the shares.
+
+        :param trigger: crossed stop loss trigger
+        :param last_price: the price which crossed the level
         """
-        positions = (await client.get_portfolio(account_id=self.account_id)).positions
-        position = get_position(positions, self.figi)
-        if position is None or quotation_to_float(position.quantity) == 0:
+        logger.info(
+            "Stop loss triggered. Last price=%s",
+            last_price,
+            extra={"figi": self.figi, "phase": "stop_loss"},
+        )
+        # The trigger is removed by the engine. It's set again after the position is refreshed
+        self.is_position_outdated = True
+        try:
+            quantity = trigger.quantity / self.instrument_info.lot
+            if not is_quantity_valid(quantity):
+                raise ValueError(f"Invalid quantity for posting an order. quantity={quantity}")
+            posted_order = await client.post_order(
+                order_id=str(uuid4()),
+                figi=self.figi,
+                direction=ORDER_DIRECTION_SELL,
+                quantity=int(quantity),
+                order_type=ORDER_TYPE_MARKET,
+                account_id=self.account_id,
+            )
+        except Exception as e:
+            logger.error("Failed to post sell order. %s", e, extra={"figi": self.figi})
             return
-        position_price = quotation_to_float(position.average_position_price)
-        if last_price <= position_price - position_price * self.config.stop_loss_percent:
-            logger.info(f"Stop loss triggered. Last price={last_price} figi={self.figi}")
-            try:
-                quantity = int(quotation_to_float(position.quantity)) / self.instrument_info.lot
-                if not is_quantity_valid(quantity):
-                    raise ValueError(f"Invalid quantity for posting an order. quantity={quantity}")
-                posted_order = await client.post_order(
-                    order_id=str(uuid4()),
-                    figi=self.figi,
-                    direction=ORDER_DIRECTION_SELL,
-                    quantity=int(quantity),
-                    order_type=ORDER_TYPE_MARKET,
-                    account_id=self.account_id,
-                )
-            except Exception as e:
-                logger.error(f"Failed to post sell order. figi={self.figi}. {e}")
-                return
-            asyncio.create_task(
-                self.stats_handler.handle_new_order(
-                    order_id=posted_order.order_id, account_id=self.account_id
-                )
+        self.handle_posted_order(posted_order)
+
+    async def handle_last_price(self, last_price: float) -> None:
+        """
+        Makes a trading decision by the last price.
+
+        :param last_price: last price of the instrument
+        """
+        crossed_triggers = await stop_loss_engine.on_price(self.figi, last_price)
+        if any(trigger.account_id == self.account_id for trigger in crossed_triggers):
+            # The position is being sold, corridor decisions are made on the next cycle
+            return
+
+        if last_price >= self.corridor.top:
+            logger.debug(
+                "Last price %s is higher than top corridor border %s",
+                last_price,
+                self.corridor.top,
+                extra={"figi": self.figi, "phase": "decision"},
+            )
+            await self.handle_corridor_crossing_top(last_price=last_price)
+        elif last_price <= self.corridor.bottom:
+            logger.debug(
+                "Last price %s is lower than bottom corridor border %s",
+                last_price,
+                self.corridor.bottom,
+                extra={"figi": self.figi, "phase": "decision"},
             )
-        return
+            await self.handle_corridor_crossing_bottom(last_price=last_price)
+
+    async def get_trading_status(self) -> GetTradingStatusResponse:
+        return await market_data_hub.get(
+            self.figi,
+            "trading_status",
+            lambda: client.get_trading_status(figi=self.figi),
+            ttl=settings.shared_market_data_ttl,
+        )
 
     async def ensure_market_open(self):
         """
         Ensure that the market is open. Holds the loop until the instrument is available.
         :return: when instrument is available for trading
         """
-        trading_status = await client.get_trading_status(figi=self.figi)
+        trading_status = await self.get_trading_status()
         while not (
             trading_status.market_order_available_flag and trading_status.api_trade_available_flag
         ):
-            logger.debug(f"Waiting for the market to open. figi={self.figi}")
-            await asyncio.sleep(60)
-            trading_status = await client.get_trading_status(figi=self.figi)
+            if self.is_trading_available:
+                self.is_trading_available = False
+                self.publish_state()
+            logger.debug(
+                "Waiting for the market to open",
+                extra={"figi": self.figi, "phase": "market_status", "rate_limit": True},
+            )
+            if settings.adaptive_polling:
+                await polling_scheduler.wait_turn(
+                    self.figi,
+                    polling_scheduler.market_closed_interval(self.config.check_interval),
+                    account_id=self.account_id,
+                )
+            else:
+                await asyncio.sleep(60)
+            trading_status = await self.get_trading_status()
+        if not self.is_trading_available:
+            self.is_trading_available = True
+            self.publish_state()
 
     async def prepare_data(self):
         self.instrument_info = (
@@ -229,47 +425,115 @@ class IntervalStrategy(BaseStrategy):
     async def main_cycle(self):
         await self.prepare_data()
         logger.info(
-            f"Starting interval strategy for figi {self.figi} "
-            f"({self.instrument_info.name} {self.instrument_info.currency}) lot size is {self.instrument_info.lot}. "
-            f"Configuration is: {self.config}"
+            "Starting interval strategy (%s %s) lot size is %s. Configuration is: %s",
+            self.instrument_info.name,
+            self.instrument_info.currency,
+            self.instrument_info.lot,
+            self.config,
+            extra={"figi": self.figi},
         )
+        if settings.batch_decisions:
+            await self.batch_cycle()
+            return
         while True:
             try:
                 await self.ensure_market_open()
-                await self.update_corridor()
+                if self.is_corridor_outdated():
+                    await self.update_corridor()
 
-                orders = await client.get_orders(account_id=self.account_id)
-                if get_order(orders=orders.orders, figi=self.figi):
-                    logger.info(f"There are orders in progress. Waiting. figi={self.figi}")
-                    continue
+                if order_registry.has_open_orders(self.account_id, self.figi):
+                    logger.info(
+                        "There are orders in progress. Waiting",
+                        extra={"figi": self.figi, "phase": "orders", "rate_limit": True},
+                    )
+                    if not await order_registry.wait_for_no_open_orders(
+                        self.account_id, self.figi, timeout=self.config.check_interval
+                    ):
+                        # Order state updates could be lost, so the broker is asked directly
+                        await self.sync_orders()
+                    if order_registry.has_open_orders(self.account_id, self.figi):
+                        await self.wait_next_check()
+                        continue
+
+                if self.is_position_outdated:
+                    await self.refresh_position()
 
                 last_price = await self.get_last_price()
-                logger.debug(f"Last price: {last_price}, figi={self.figi}")
+                self.last_price = last_price
+                logger.debug(
+                    "Last price: %s", last_price, extra={"figi": self.figi, "phase": "price"}
+                )
 
-                await self.validate_stop_loss(last_price)
+                await self.handle_last_price(last_price)
 
-                if last_price >= self.corridor.top:
-                    logger.debug(
-                        f"Last price {last_price} is higher than top corridor border "
-                        f"{self.corridor.top}. figi={self.figi}"
-                    )
-                    await self.handle_corridor_crossing_top(last_price=last_price)
-                elif last_price <= self.corridor.bottom:
-                    logger.debug(
-                        f"Last price {last_price} is lower than bottom corridor border "
-                        f"{self.corridor.bottom}. figi={self.figi}"
-                    )
-                    await self.handle_corridor_crossing_bottom(last_price=last_price)
+                if self.is_position_outdated and not order_registry.has_open_orders(
+                    self.account_id, self.figi
+                ):
+                    await self.refresh_position()
             except AioRequestError as are:
-                logger.error(f"Client error {are}")
+                logger.error("Client error %s", are, extra={"figi": self.figi})
+
+            await self.wait_next_check()
+
+    async def batch_cycle(self):
+        """
+        Keeps the corridor and the market status up to date. Decisions are made
+        by the batch decision pass for all the instruments at once.
+        """
+        interval_batch_runner.add(self)
+        try:
+            while True:
+                try:
+                    await self.ensure_market_open()
+                    await self.update_corridor()
+                except AioRequestError as are:
+                    logger.error("Client error %s", are, extra={"figi": self.figi})
+                await asyncio.sleep(self.config.check_interval)
+        finally:
+            interval_batch_runner.remove(self)
 
+    async def wait_next_check(self) -> None:
+        """
+        Sleeps check_interval or, with adaptive polling, waits for the next turn
+        from the polling scheduler depending on the distance to the corridor and the stop loss.
+        """
+        if not settings.adaptive_polling:
             await asyncio.sleep(self.config.check_interval)
+            return
+        stop_loss_trigger = stop_loss_engine.get_trigger(self.account_id, self.figi)
+        levels = [
+            self.corridor.top if self.corridor else None,
+            self.corridor.bottom if self.corridor else None,
+            stop_loss_trigger.level if stop_loss_trigger else None,
+        ]
+        await polling_scheduler.wait_turn(
+            self.figi,
+            polling_scheduler.next_interval(self.config.check_interval, self.last_price, levels),
+            account_id=self.account_id,
+        )
 
     async def start(self):
         if self.account_id is None:
             try:
                 self.account_id = (await client.get_accounts()).accounts.pop().id
             except AioRequestError as are:
-                logger.error(f"Error taking account id. Stopping strategy. {are}")
+                logger.error(
+                    "Error taking account id. Stopping strategy. %s", are, extra={"figi": self.figi}
+                )
                 return
-        await self.main_cycle()
+        try:
+            await self.sync_orders()
+        except AioRequestError as are:
+            logger.error("Error getting active orders. %s", are, extra={"figi": self.figi})
+        order_registry.add_finish_listener(self.account_id, self.figi, self.on_order_finished)
+        market_data_hub.subscribe(self.figi, self.account_id)
+        try:
+            await self.main_cycle()
+        finally:
+            market_data_hub.unsubscribe(self.figi, self.account_id)
+            order_registry.remove_finish_listener(
+                self.account_id, self.figi, self.on_order_finished
+            )
+            stop_loss_engine.remove_trigger(self.account_id, self.figi)
+            if settings.use_last_price_stream:
+                last_price_stream.unsubscribe(self.figi, self.account_id)
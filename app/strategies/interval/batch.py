@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Dict, List
+
+import numpy as np
+from tinkoff.invest import AioRequestError
+
+from app.client import client
+from app.orders.registry import order_registry
+from app.stop_loss.engine import stop_loss_engine
+from app.strategies.interval.decisions import evaluate_actions
+from app.utils.lazy import LazyProxy
+from app.utils.quotation import quotation_to_float
+
+if TYPE_CHECKING:
+    from app.strategies.interval.IntervalStrategy import IntervalStrategy
+
+logger = logging.getLogger(__name__)
+
+
+class IntervalBatchRunner:
+    """
+    Makes trading decisions for all the interval strategies at once.
+
+    Strategies keep their corridors and positions up to date and write them to the aligned arrays
+    of the runner. On every tick the last prices of all the instruments are requested with
+    one request, the decisions are made with one vectorized pass and the actions are dispatched
+    to the strategies concurrently.
+    """
+
+    def __init__(self, interval: float):
+        """
+        :param interval: interval in seconds between the decision passes
+        """
+        self.interval = interval
+        self.strategies: List["IntervalStrategy"] = []
+        self._indexes: Dict[int, int] = {}
+        self._allocate(0)
+
+    def _allocate(self, size: int) -> None:
+        self.figis: List[str] = [strategy.figi for strategy in self.strategies]
+        self.last_price = np.full(size, np.nan)
+        self.top = np.full(size, np.nan)
+        self.bottom = np.full(size, np.nan)
+        self.quantity = np.zeros(size)
+        self.average_price = np.zeros(size)
+        self.quantity_limit = np.zeros(size)
+        self.stop_loss_percent = np.zeros(size)
+        self.is_ready = np.zeros(size, dtype=bool)
+
+    def add(self, strategy: "IntervalStrategy") -> None:
+        """
+        Adds the strategy to the decision pass. The arrays are rebuilt, it happens only when
+        the instruments config is changed.
+        """
+        if id(strategy) in self._indexes:
+            return
+        self.strategies.append(strategy)
+        self._rebuild()
+
+    def remove(self, strategy: "IntervalStrategy") -> None:
+        if id(strategy) not in self._indexes:
+            return
+        self.strategies.remove(strategy)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._indexes = {id(strategy): index for index, strategy in enumerate(self.strategies)}
+        self._allocate(len(self.strategies))
+        for strategy in self.strategies:
+            self.update_state(strategy)
+
+    def update_state(self, strategy: "IntervalStrategy") -> None:
+        """
+        Writes the corridor, the position and the config of the strategy to the arrays.
+        Called by the strategy when any of them is changed.
+        """
+        index = self._indexes.get(id(strategy))
+        if index is None:
+            return
+        if strategy.corridor is None:
+            self.top[index], self.bottom[index] = np.nan, np.nan
+        else:
+            self.top[index], self.bottom[index] = strategy.corridor.top, strategy.corridor.bottom
+        self.quantity[index] = strategy.position_quantity
+        self.average_price[index] = strategy.position_price
+        self.quantity_limit[index] = strategy.config.quantity_limit
+        self.stop_loss_percent[index] = strategy.config.stop_loss_percent
+        self.is_ready[index] = (
+            strategy.is_trading_available and strategy.instrument_info is not None
+        )
+
+    async def update_last_prices(self) -> None:
+        """
+        Requests the last prices of all the instruments with one request.
+        """
+        response = await client.get_last_prices(figi=list(set(self.figis)))
+        prices = {
+            last_price.figi: quotation_to_float(last_price.price)
+            for last_price in response.last_prices
+        }
+        self.last_price[:] = [prices.get(figi, np.nan) for figi in self.figis]
+
+    async def refresh_outdated_positions(self) -> None:
+        await asyncio.gather(
+            *(
+                strategy.refresh_position()
+                for strategy in self.strategies
+                if strategy.is_position_outdated
+                and not order_registry.has_open_orders(strategy.account_id, strategy.figi)
+            )
+        )
+
+    async def tick(self) -> None:
+        """
+        One decision pass for all the strategies.
+        """
+        await self.refresh_outdated_positions()
+        await self.update_last_prices()
+        started_at = time.perf_counter()
+        has_open_orders = np.fromiter(
+            (
+                order_registry.has_open_orders(strategy.account_id, strategy.figi)
+                for strategy in self.strategies
+            ),
+            dtype=bool,
+            count=len(self.strategies),
+        )
+        actions = evaluate_actions(
+            last_price=self.last_price,
+            top=self.top,
+            bottom=self.bottom,
+            quantity=self.quantity,
+            average_price=self.average_price,
+            quantity_limit=self.quantity_limit,
+            stop_loss_percent=self.stop_loss_percent,
+            is_available=self.is_ready & ~has_open_orders,
+        )
+        for index, strategy in enumerate(self.strategies):
+            strategy.last_price = (
+                None if np.isnan(self.last_price[index]) else self.last_price[index]
+            )
+        logger.debug(
+            "Decisions made for %d instruments: %d stop losses, %d sells, %d buys",
+            len(self.strategies),
+            actions.stop_loss.sum(),
+            actions.sell.sum(),
+            actions.buy.sum(),
+            extra={"phase": "decision", "latency": time.perf_counter() - started_at},
+        )
+        await asyncio.gather(
+            *(self._stop_loss(index) for index in np.flatnonzero(actions.stop_loss)),
+            *(
+                self.strategies[index].handle_corridor_crossing_top(
+                    last_price=float(self.last_price[index])
+                )
+                for index in np.flatnonzero(actions.sell)
+            ),
+            *(
+                self.strategies[index].handle_corridor_crossing_bottom(
+                    last_price=float(self.last_price[index])
+                )
+                for index in np.flatnonzero(actions.buy)
+            ),
+        )
+
+    async def _stop_loss(self, index: int) -> None:
+        strategy = self.strategies[index]
+        trigger = stop_loss_engine.get_trigger(strategy.account_id, strategy.figi)
+        if trigger is None:
+            # The trigger has been fired by the last price stream
+            return
+        stop_loss_engine.remove_trigger(strategy.account_id, strategy.figi)
+        await strategy.handle_stop_loss(trigger, float(self.last_price[index]))
+
+    async def run(self) -> None:
+        while True:
+            if self.strategies:
+                try:
+                    await self.tick()
+                except AioRequestError as are:
+                    logger.error("Client error %s", are)
+                except Exception:
+                    # The loop serves all the batched instruments, so it never stops on an error
+                    logger.exception("Batch decision pass failed")
+            await asyncio.sleep(self.interval)
+
+
+def get_interval_batch_runner() -> IntervalBatchRunner:
+    from app.context import context
+
+    return context.interval_batch_runner
+
+
+# Created by the application context on the first use
+interval_batch_runner: IntervalBatchRunner = LazyProxy(get_interval_batch_runner)  # type: ignore
@@ -0,0 +1,76 @@
+from typing import NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+
+def calculate_corridor(values: Sequence[float], interval_size: float) -> Tuple[float, float]:
+    """
+    Corridor containing interval_size share of the prices, e.g. from 10th to 90th percentile
+    for interval_size=0.8.
+
+    :param values: prices
+    :param interval_size: share of the prices inside the corridor
+    :return: bottom and top of the corridor
+    """
+    lower_percentile = (1 - interval_size) / 2 * 100
+    bottom, top = np.percentile(values, [lower_percentile, 100 - lower_percentile])
+    return float(bottom), float(top)
+
+
+class Actions(NamedTuple):
+    """
+    Boolean masks of the actions, aligned with the input arrays.
+    At most one action is set for every instrument.
+    """
+
+    stop_loss: np.ndarray
+    sell: np.ndarray
+    buy: np.ndarray
+
+
+def evaluate_actions(
+    last_price: np.ndarray,
+    top: np.ndarray,
+    bottom: np.ndarray,
+    quantity: np.ndarray,
+    average_price: np.ndarray,
+    quantity_limit: np.ndarray,
+    stop_loss_percent: np.ndarray,
+    is_available: np.ndarray,
+) -> Actions:
+    """
+    Vectorized interval strategy decision rules for many instruments at once.
+    The rules are the same as in IntervalStrategy.handle_last_price:
+
+    - stop loss: there is a position and the price is at or below
+      average_price * (1 - stop_loss_percent). Other actions are skipped
+    - sell: the price is at or above the top corridor border and there is a position
+    - buy: the price is at or below the bottom corridor border (and below the top one)
+      and the position is less than quantity_limit
+
+    :param last_price: last prices. NaN if unknown
+    :param top: top corridor borders. NaN if the corridor is not calculated
+    :param bottom: bottom corridor borders. NaN if the corridor is not calculated
+    :param quantity: position quantities
+    :param average_price: average position prices
+    :param quantity_limit: max quantities of the positions
+    :param stop_loss_percent: stop loss percents
+    :param is_available: whether decisions can be made for the instrument
+        (market is open, there are no orders in progress)
+    :return: Actions object
+    """
+    has_price = ~np.isnan(last_price)
+    has_position = quantity > 0
+    stop_loss = (
+        is_available
+        & has_price
+        & has_position
+        & (average_price > 0)
+        & (last_price <= average_price - average_price * stop_loss_percent)
+    )
+    # Comparisons with NaN are False, so instruments without a corridor get no actions
+    decidable = is_available & has_price & ~stop_loss
+    above_top = last_price >= top
+    sell = decidable & above_top & has_position
+    buy = decidable & ~above_top & (last_price <= bottom) & (quantity < quantity_limit)
+    return Actions(stop_loss=stop_loss, sell=sell, buy=buy)
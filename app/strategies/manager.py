@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+from app.instruments_config.models import InstrumentsConfig, StrategyAssignment
+from app.instruments_config.parser import diff_instruments
+from app.settings import settings
+from app.strategies.base import BaseStrategy
+from app.strategies.strategy_fabric import resolve_strategy
+
+logger = logging.getLogger(__name__)
+
+# Strategies are run per instrument and account
+StrategyKey = Tuple[str, Optional[str]]
+
+
+class StrategiesManager:
+    """
+    Keeps the set of running strategies in sync with the instruments config.
+
+    Applying a config only touches the instruments and accounts that differ from the running ones:
+    new instruments are started, removed ones are stopped and changed parameters
+    are applied in place, so unchanged strategies keep their state.
+    """
+
+    def __init__(self):
+        self.instruments_config = InstrumentsConfig(instruments=[])
+        self.strategies: Dict[StrategyKey, BaseStrategy] = {}
+        self.tasks: Dict[StrategyKey, asyncio.Task] = {}
+
+    def apply(self, instruments_config: InstrumentsConfig) -> None:
+        """
+        Reconcile running strategies with the given config.
+
+        :param instruments_config: config to apply
+        """
+        diff = diff_instruments(
+            self.instruments_config, instruments_config, default_account_id=settings.account_id
+        )
+        for assignment in diff.removed:
+            self.stop_strategy(assignment.key)
+        for assignment in diff.changed:
+            self.update_strategy(assignment)
+        for assignment in diff.added:
+            self.start_strategy(assignment)
+        for assignment in instruments_config.get_assignments(settings.account_id):
+            # Strategies which stopped by themselves, e.g. crashed, are started again
+            if assignment.key not in self.tasks:
+                logger.info(
+                    f"Restarting stopped strategy. figi={assignment.figi} "
+                    f"account_id={assignment.account_id}"
+                )
+                self.start_strategy(assignment)
+        self.instruments_config = instruments_config
+        if not diff.is_empty():
+            logger.info(
+                f"Instruments config applied. added={len(diff.added)} "
+                f"removed={len(diff.removed)} changed={len(diff.changed)}"
+            )
+
+    def start_strategy(self, assignment: StrategyAssignment) -> None:
+        strategy = resolve_strategy(
+            strategy_name=assignment.strategy.name,
+            figi=assignment.figi,
+            account_id=assignment.account_id,
+            **assignment.strategy.parameters,
+        )
+        task = asyncio.create_task(strategy.start())
+        task.add_done_callback(partial(self._on_strategy_done, assignment.key))
+        self.strategies[assignment.key] = strategy
+        self.tasks[assignment.key] = task
+
+    def stop_strategy(self, key: StrategyKey) -> None:
+        figi, account_id = key
+        logger.info(f"Stopping strategy. figi={figi} account_id={account_id}")
+        self.strategies.pop(key, None)
+        task = self.tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def update_strategy(self, assignment: StrategyAssignment) -> None:
+        if assignment.key not in self.strategies:
+            self.start_strategy(assignment)
+            return
+        running_assignment = self._get_running_assignment(assignment.key)
+        if running_assignment.strategy.name != assignment.strategy.name:
+            self.stop_strategy(assignment.key)
+            self.start_strategy(assignment)
+            return
+        logger.info(
+            f"Updating strategy parameters. figi={assignment.figi} "
+            f"account_id={assignment.account_id}"
+        )
+        self.strategies[assignment.key].update_config(**assignment.strategy.parameters)
+
+    def _get_running_assignment(self, key: StrategyKey) -> StrategyAssignment:
+        for assignment in self.instruments_config.get_assignments(settings.account_id):
+            if assignment.key == key:
+                return assignment
+        raise KeyError(key)
+
+    def _on_strategy_done(self, key: StrategyKey, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        figi, account_id = key
+        if task.exception() is not None:
+            logger.error(
+                f"Strategy stopped with an error. figi={figi} account_id={account_id} "
+                f"{task.exception()!r}"
+            )
+        # The strategy is not running anymore, so the next config apply starts it again
+        if self.tasks.get(key) is task:
+            self.tasks.pop(key)
+            self.strategies.pop(key, None)
+
+    async def wait(self) -> None:
+        """
+        Wait until all the running strategies are finished.
+        """
+        while self.tasks:
+            await asyncio.wait(list(self.tasks.values()))
+            self.tasks = {key: task for key, task in self.tasks.items() if not task.done()}
@@ -1,12 +1,14 @@
-from typing import Dict
+import importlib
+from typing import Dict, Tuple
 
-from app.strategies.interval.IntervalStrategy import IntervalStrategy
 from app.strategies.base import BaseStrategy
 from app.strategies.errors import UnsupportedStrategyError
 from app.strategies.models import StrategyName
 
-strategies: Dict[StrategyName, BaseStrategy.__class__] = {
-    StrategyName.INTERVAL: IntervalStrategy,
+# Module and class of every strategy. Strategies are imported on the first use,
+# so importing the manager doesn't load the tinkoff library and numpy
+strategies: Dict[StrategyName, Tuple[str, str]] = {
+    StrategyName.INTERVAL: ("app.strategies.interval.IntervalStrategy", "IntervalStrategy"),
 }
 
 
@@ -21,4 +23,6 @@ def resolve_strategy(strategy_name: StrategyName, figi: str, *args, **kwargs) ->
     """
     if strategy_name not in strategies:
         raise UnsupportedStrategyError(strategy_name)
-    return strategies[strategy_name](figi=figi, *args, **kwargs)
+    module_name, class_name = strategies[strategy_name]
+    strategy_class = getattr(importlib.import_module(module_name), class_name)
+    return strategy_class(figi=figi, *args, **kwargs)
@@ -0,0 +1,26 @@
+from typing import Any, Callable
+
+
+class LazyProxy:
+    """
+    Stands for the object returned by the factory. The factory is called on every attribute
+    access, so nothing is created on import and the object can be replaced later
+    (e.g. by AppContext.configure) while modules keep the proxy imported by name.
+    """
+
+    __slots__ = ("_factory",)
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._factory(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._factory(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._factory(), name)
+
+    def __repr__(self) -> str:
+        return f"<LazyProxy of {self._factory.__qualname__}>"
@@ -0,0 +1,134 @@
+import atexit
+import json
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# Attributes which can be passed with `extra` and are rendered as structured fields
+STRUCTURED_FIELDS = ("figi", "phase", "latency")
+
+LOG_FORMAT = "[%(levelname)-5s] %(asctime)-19s %(name)s:%(lineno)d: %(message)s"
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Appends structured fields (figi, phase, latency) to the message.
+    In json mode renders the whole record as a json object instead.
+    """
+
+    def __init__(self, fmt: str = LOG_FORMAT, as_json: bool = False):
+        super().__init__(fmt)
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            field: getattr(record, field)
+            for field in STRUCTURED_FIELDS
+            if getattr(record, field, None) is not None
+        }
+        if isinstance(fields.get("latency"), float):
+            fields["latency"] = round(fields["latency"], 6)
+        if self.as_json:
+            data = {
+                "level": record.levelname,
+                "time": self.formatTime(record),
+                "logger": record.name,
+                "line": record.lineno,
+                "message": record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                data["exc_info"] = self.formatException(record.exc_info)
+            return json.dumps(data, default=str)
+        message = super().format(record)
+        if not fields:
+            return message
+        return message + " " + " ".join(f"{key}={value}" for key, value in fields.items())
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drops repeated messages marked with `extra={"rate_limit": True}`.
+
+    Messages are considered the same if they have the same logger, message template and figi.
+    Only one of them is passed per interval. The number of dropped messages is added
+    to the next passed one.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__()
+        self.interval = interval
+        self._last_emitted: Dict[Tuple, float] = {}
+        self._suppressed: Dict[Tuple, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "rate_limit", False):
+            return True
+        key = (record.name, record.msg, getattr(record, "figi", None))
+        current_time = time.monotonic()
+        last_emitted = self._last_emitted.get(key)
+        if last_emitted is not None and current_time - last_emitted < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+        self._last_emitted[key] = current_time
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.msg = f"{record.msg} (suppressed {suppressed} similar messages)"
+        return True
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler which doesn't format records in the caller thread.
+    Formatting and writing are done by the listener thread only.
+
+    Arguments of the record are formatted later, so they shouldn't be mutated after logging.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _stop_listener(listener: QueueListener) -> None:
+    # Flushes the queue. The listener can be already stopped manually
+    if listener._thread is not None:
+        listener.stop()
+
+
+def setup_logging(
+    level: int,
+    use_queue: bool = True,
+    rate_limit_interval: float = 0,
+    as_json: bool = False,
+) -> Optional[QueueListener]:
+    """
+    Configure root logger.
+
+    :param level: log level of the root logger
+    :param use_queue: whether to hand records to a background writer thread
+    :param rate_limit_interval: interval in seconds for rate limited messages. 0 disables limiting
+    :param as_json: whether to write records as json objects
+    :return: started QueueListener if use_queue is set. It's stopped at exit automatically
+    """
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(StructuredFormatter(as_json=as_json))
+
+    listener = None
+    if use_queue:
+        handler: logging.Handler = LazyQueueHandler(queue.SimpleQueue())
+        listener = QueueListener(handler.queue, stream_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(_stop_listener, listener)
+    else:
+        handler = stream_handler
+    if rate_limit_interval > 0:
+        handler.addFilter(RateLimitFilter(rate_limit_interval))
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    for existing_handler in root_logger.handlers[:]:
+        root_logger.removeHandler(existing_handler)
+    root_logger.addHandler(handler)
+    return listener
@@ -0,0 +1,144 @@
+from typing import List, Tuple
+
+import grpc
+import pytest
+from tinkoff.invest.grpc import marketdata_pb2, orders_pb2
+from tinkoff.invest.grpc.orders_pb2 import ORDER_DIRECTION_BUY, ORDER_TYPE_MARKET
+
+from app.client import ChannelName, TinkoffClient
+from app.settings import settings
+
+SERVICE_NAME = "tinkoff.public.invest.api.contract.v1.{}"
+
+
+class StandInServer:
+    """
+    Local grpc server answering a few tinkoff API methods. Records peers of the calls
+    to check which connection a request was sent over.
+    """
+
+    def __init__(self):
+        self.server = None
+        self.port = 0
+        self.calls: List[Tuple[str, str]] = []
+
+    async def get_last_prices(self, request, context):
+        self.calls.append(("GetLastPrices", context.peer()))
+        return marketdata_pb2.GetLastPricesResponse(
+            last_prices=[marketdata_pb2.LastPrice(figi=figi) for figi in request.figi]
+        )
+
+    async def post_order(self, request, context):
+        self.calls.append(("PostOrder", context.peer()))
+        return orders_pb2.PostOrderResponse(order_id=request.order_id, figi=request.figi)
+
+    async def start(self) -> None:
+        self.server = grpc.aio.server()
+        self.server.add_generic_rpc_handlers(
+            (
+                grpc.method_handlers_generic_handler(
+                    SERVICE_NAME.format("MarketDataService"),
+                    {
+                        "GetLastPrices": grpc.unary_unary_rpc_method_handler(
+                            self.get_last_prices,
+                            request_deserializer=marketdata_pb2.GetLastPricesRequest.FromString,
+                            response_serializer=marketdata_pb2.GetLastPricesResponse.SerializeToString,
+                        )
+                    },
+                ),
+                grpc.method_handlers_generic_handler(
+                    SERVICE_NAME.format("OrdersService"),
+                    {
+                        "PostOrder": grpc.unary_unary_rpc_method_handler(
+                            self.post_order,
+                            request_deserializer=orders_pb2.PostOrderRequest.FromString,
+                            response_serializer=orders_pb2.PostOrderResponse.SerializeToString,
+                        )
+                    },
+                ),
+            )
+        )
+        self.port = self.server.add_insecure_port(f"127.0.0.1:{self.port}")
+        await self.server.start()
+
+    async def stop(self) -> None:
+        await self.server.stop(None)
+
+    def peers(self, method: str) -> List[str]:
+        return [peer for name, peer in self.calls if name == method]
+
+
+@pytest.fixture
+async def server():
+    server = StandInServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+async def client(server, test_settings, mocker):
+    mocker.patch.object(settings, "grpc_target", f"127.0.0.1:{server.port}")
+    mocker.patch.object(settings, "grpc_insecure", True)
+    mocker.patch.object(settings, "use_candle_history_cache", False)
+    client = TinkoffClient(token="token", sandbox=False)
+    await client.ainit()
+    yield client
+    await client.aclose()
+
+
+async def post_order(client: TinkoffClient):
+    return await client.post_order(
+        order_id="order",
+        figi="figi",
+        direction=ORDER_DIRECTION_BUY,
+        quantity=1,
+        order_type=ORDER_TYPE_MARKET,
+        account_id="account",
+    )
+
+
+class TestChannelPool:
+    async def test_requests_are_routed_by_service(self, client, server):
+        await client.get_last_prices(figi=["figi"])
+        await client.get_last_prices(figi=["figi"])
+        posted_order = await post_order(client)
+
+        assert posted_order.order_id == "order"
+        market_data_peers = set(server.peers("GetLastPrices"))
+        orders_peers = set(server.peers("PostOrder"))
+        assert len(market_data_peers) == 1
+        assert len(orders_peers) == 1
+        assert market_data_peers != orders_peers
+
+    async def test_reconnect_keeps_other_channels(self, client, server):
+        await client.get_last_prices(figi=["figi"])
+        await post_order(client)
+
+        await client.pool.reconnect(ChannelName.MARKET_DATA)
+        response = await client.get_last_prices(figi=["figi"])
+        await post_order(client)
+
+        assert response.last_prices[0].figi == "figi"
+        market_data_peers = server.peers("GetLastPrices")
+        orders_peers = server.peers("PostOrder")
+        assert market_data_peers[0] != market_data_peers[1]
+        assert orders_peers[0] == orders_peers[1]
+
+    async def test_server_restart(self, client, server):
+        await client.get_last_prices(figi=["figi"])
+        await server.stop()
+        await server.start()
+
+        response = await client.get_last_prices(figi=["figi"])
+
+        assert response.last_prices[0].figi == "figi"
+
+    async def test_aclose_closes_all_channels(self, client):
+        channels = [client.pool.channel(name) for name in ChannelName]
+
+        await client.aclose()
+
+        for channel in channels:
+            with pytest.raises(grpc.aio.UsageError):
+                await channel.unary_unary("/test/Method")(b"")
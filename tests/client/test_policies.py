@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from grpc import StatusCode
+from tinkoff.invest import AioRequestError
+
+from app.client.policies import RequestExecutor, RequestPolicy
+from app.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(test_settings, mocker):
+    mocker.patch.object(settings, "request_retry_backoff", 0.001)
+
+
+class TestRequestExecutor:
+    async def test_retries_retryable_errors(self):
+        executor = RequestExecutor({"read": RequestPolicy(deadline=1, retries=2)})
+        attempts = []
+
+        async def call():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise AioRequestError(StatusCode.UNAVAILABLE, "unavailable", None)
+            return "result"
+
+        assert await executor.execute("read", call) == "result"
+        assert executor.metrics.retries["read"] == 2
+
+    async def test_does_not_retry_other_errors(self):
+        executor = RequestExecutor({"read": RequestPolicy(deadline=1, retries=2)})
+
+        async def call():
+            raise AioRequestError(StatusCode.INVALID_ARGUMENT, "invalid", None)
+
+        with pytest.raises(AioRequestError):
+            await executor.execute("read", call)
+        assert executor.metrics.retries["read"] == 0
+
+    async def test_deadline(self):
+        executor = RequestExecutor({"post": RequestPolicy(deadline=0.01)})
+
+        async def call():
+            await asyncio.sleep(1)
+
+        with pytest.raises(AioRequestError) as error:
+            await executor.execute("post", call)
+        assert error.value.code == StatusCode.DEADLINE_EXCEEDED
+        assert executor.metrics.deadlines_exceeded["post"] == 1
+
+    async def test_hedged_request_wins(self):
+        executor = RequestExecutor({"read": RequestPolicy(deadline=1, hedge=True)})
+        for _ in range(20):
+            executor._get_latency_tracker("read").add(0.001)
+        attempts = []
+
+        async def call():
+            attempts.append(1)
+            await asyncio.sleep(0.5 if len(attempts) == 1 else 0)
+            return len(attempts)
+
+        assert await executor.execute("read", call) == 2
+        assert executor.metrics.hedges["read"] == 1
+        assert executor.metrics.hedges_won["read"] == 1
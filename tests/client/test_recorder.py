@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from tinkoff.invest import HistoricCandle, Quotation
+
+from app.client.recorder import SessionRecorder
+
+START = datetime(2024, 1, 1, 10, tzinfo=timezone.utc)
+
+
+def get_candle(minute: int, close: int = 100, is_complete: bool = True) -> HistoricCandle:
+    price = Quotation(units=close, nano=0)
+    return HistoricCandle(
+        open=price,
+        high=price,
+        low=price,
+        close=price,
+        volume=1,
+        time=START + timedelta(minutes=minute),
+        is_complete=is_complete,
+    )
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = SessionRecorder(str(tmp_path))
+    yield recorder
+    recorder.close()
+
+
+def get_minutes(candles) -> list:
+    return [int((values[0] - START.timestamp()) // 60) for values in candles]
+
+
+class TestSessionRecorder:
+    def test_only_new_and_changed_candles_are_recorded(self, recorder):
+        timestamp = START.timestamp()
+        first = [get_candle(0), get_candle(1), get_candle(2, is_complete=False)]
+        assert get_minutes(recorder.get_new_candles("FIGI", first, timestamp)) == [0, 1, 2]
+
+        second = [get_candle(1), get_candle(2, close=101), get_candle(3, is_complete=False)]
+        assert get_minutes(recorder.get_new_candles("FIGI", second, timestamp)) == [2, 3]
+
+        longer_history = [get_candle(-1), get_candle(0), get_candle(3, is_complete=False)]
+        assert get_minutes(recorder.get_new_candles("FIGI", longer_history, timestamp)) == [-1]
+
+    def test_candles_are_recorded_again_in_a_new_file(self, recorder):
+        candles = [get_candle(0)]
+        recorder.get_new_candles("FIGI", candles, START.timestamp())
+
+        next_day = (START + timedelta(days=1)).timestamp()
+        assert get_minutes(recorder.get_new_candles("FIGI", candles, next_day)) == [0]
@@ -0,0 +1,16 @@
+import pytest
+
+from app.context import context
+from app.settings import Settings
+
+
+@pytest.fixture
+def test_settings() -> Settings:
+    """
+    Settings which don't depend on the environment. The context is restored after the test.
+    """
+    saved = dict(vars(context))
+    settings = Settings(token="test")
+    context.configure(settings=settings)
+    yield settings
+    vars(context).update(saved)
@@ -0,0 +1,43 @@
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.instruments_config.models import InstrumentsConfig
+from app.instruments_config.watcher import InstrumentsConfigWatcher
+
+
+def get_config(interval_size: float) -> dict:
+    return {
+        "instruments": [
+            {
+                "figi": "FIGI",
+                "strategy": {"name": "interval", "parameters": {"interval_size": interval_size}},
+            }
+        ]
+    }
+
+
+class TestInstrumentsConfig:
+    def test_invalid_strategy_parameters(self):
+        with pytest.raises(ValidationError):
+            InstrumentsConfig.parse_obj(get_config(interval_size=2))
+
+
+class TestInstrumentsConfigWatcher:
+    async def test_invalid_config_is_skipped(self, tmp_path):
+        path = tmp_path / "instruments_config.json"
+        path.write_text(json.dumps(get_config(interval_size=0.8)))
+        watcher = InstrumentsConfigWatcher(filename=str(path), check_interval=0)
+        watcher.load()
+        configs = watcher.watch()
+
+        path.write_text(json.dumps(get_config(interval_size=2)))
+        next_config = asyncio.ensure_future(configs.__anext__())
+        await asyncio.sleep(0.05)
+        assert not next_config.done()
+
+        path.write_text(json.dumps(get_config(interval_size=0.5)) + " ")
+        instruments_config = await asyncio.wait_for(next_config, timeout=1)
+        assert instruments_config.instruments[0].strategy.parameters["interval_size"] == 0.5
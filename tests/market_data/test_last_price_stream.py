@@ -0,0 +1,33 @@
+from tinkoff.invest import SubscriptionAction
+
+from app.market_data.last_price_stream import LastPriceStream
+from app.stop_loss.engine import StopLossEngine
+
+SUBSCRIBE = SubscriptionAction.SUBSCRIPTION_ACTION_SUBSCRIBE
+UNSUBSCRIBE = SubscriptionAction.SUBSCRIPTION_ACTION_UNSUBSCRIBE
+
+
+async def next_request(requests) -> tuple:
+    request = (await requests.__anext__()).subscribe_last_price_request
+    return request.subscription_action, [instrument.figi for instrument in request.instruments]
+
+
+class TestLastPriceStream:
+    async def test_figi_is_unsubscribed_after_the_last_subscriber(self):
+        stream = LastPriceStream(StopLossEngine())
+        stream.subscribe("FIGI", "first")
+        stream.subscribe("FIGI", "second")
+        stream.subscribe("OTHER", "first")
+        requests = stream._requests()
+
+        assert await next_request(requests) == (SUBSCRIBE, ["FIGI", "OTHER"])
+
+        stream.unsubscribe("FIGI", "first")
+        stream.unsubscribe("OTHER", "first")
+        assert await next_request(requests) == (UNSUBSCRIBE, ["OTHER"])
+
+        stream.unsubscribe("FIGI", "second")
+        stream.subscribe("NEW", "first")
+        assert await next_request(requests) == (SUBSCRIBE, ["NEW"])
+        assert await next_request(requests) == (UNSUBSCRIBE, ["FIGI"])
+        assert stream.subscribers == {"NEW": {"first"}}
@@ -0,0 +1,80 @@
+import asyncio
+
+from tinkoff.invest import OrderExecutionReportStatus, OrderState, PostOrderResponse
+
+from app.orders.registry import FINISHED_UNKNOWN_STATUS, OrderRegistry
+
+NEW = OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_NEW
+FILL = OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL
+CANCELLED = OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_CANCELLED
+
+
+def post_order(registry: OrderRegistry, order_id: str, account_id: str = "account") -> None:
+    registry.register(
+        account_id, "FIGI", PostOrderResponse(order_id=order_id, execution_report_status=NEW)
+    )
+
+
+def get_order_state(order_id: str, status: OrderExecutionReportStatus) -> OrderState:
+    return OrderState(order_id=order_id, figi="FIGI", execution_report_status=status)
+
+
+class TestOrderRegistry:
+    async def test_wait_returns_immediately_without_open_orders(self):
+        registry = OrderRegistry()
+
+        assert await registry.wait_for_no_open_orders("account", "FIGI", timeout=0)
+
+    async def test_fill_finishes_waiting(self):
+        registry = OrderRegistry()
+        post_order(registry, "order")
+        waiting = asyncio.create_task(registry.wait_for_no_open_orders("account", "FIGI"))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        registry.update("account", get_order_state("order", FILL))
+
+        assert await asyncio.wait_for(waiting, timeout=1)
+        assert not registry.has_open_orders("account", "FIGI")
+
+    async def test_cancel_finishes_waiting_after_all_orders(self):
+        registry = OrderRegistry()
+        post_order(registry, "first")
+        post_order(registry, "second")
+
+        registry.update("account", get_order_state("first", CANCELLED))
+        assert not await registry.wait_for_no_open_orders("account", "FIGI", timeout=0.01)
+
+        registry.update("account", get_order_state("second", CANCELLED))
+        assert await registry.wait_for_no_open_orders("account", "FIGI", timeout=0.01)
+
+    async def test_sync_drops_orders_missing_at_broker(self):
+        registry = OrderRegistry()
+        post_order(registry, "filled")
+        post_order(registry, "unknown")
+        post_order(registry, "active")
+        post_order(registry, "other account", account_id="other")
+        finished = []
+        registry.add_finish_listener("account", "FIGI", finished.append)
+        active_orders = [get_order_state("active", NEW)]
+
+        missing_orders = registry.get_missing_orders("account", active_orders)
+        registry.sync("account", active_orders, finished_orders=[get_order_state("filled", FILL)])
+
+        assert sorted(order.order_id for order in missing_orders) == ["filled", "unknown"]
+        assert [(order.order_id, order.status) for order in finished] == [
+            ("filled", FILL),
+            ("unknown", FINISHED_UNKNOWN_STATUS),
+        ]
+        assert [order.order_id for order in registry.get_open_orders("account", "FIGI")] == [
+            "active"
+        ]
+        assert registry.has_open_orders("other", "FIGI")
+
+    async def test_sync_keeps_orders_active_again(self):
+        registry = OrderRegistry()
+        post_order(registry, "order")
+
+        registry.sync("account", [], finished_orders=[get_order_state("order", NEW)])
+
+        assert registry.has_open_orders("account", "FIGI")
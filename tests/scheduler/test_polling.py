@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from app.scheduler.polling import PollingScheduler
+
+
+@pytest.fixture(autouse=True)
+async def cancel_scheduler_tasks():
+    yield
+    for task in asyncio.all_tasks():
+        if task is not asyncio.current_task():
+            task.cancel()
+
+
+def get_scheduler() -> PollingScheduler:
+    return PollingScheduler(
+        requests_per_second=1000, min_interval=0.01, near_distance=0.005, max_backoff=4
+    )
+
+
+class TestPollingScheduler:
+    async def test_same_figi_on_two_accounts(self):
+        scheduler = get_scheduler()
+        turns = []
+
+        async def poll(account_id: str):
+            for turn in range(3):
+                await scheduler.wait_turn("FIGI", 0.01, account_id=account_id)
+                turns.append((account_id, turn))
+
+        await asyncio.wait_for(asyncio.gather(poll("acc1"), poll("acc2")), timeout=1)
+
+        assert sorted(turns) == [
+            (account, turn) for account in ("acc1", "acc2") for turn in range(3)
+        ]
+
+    async def test_turns_follow_due_time(self):
+        scheduler = get_scheduler()
+        order = []
+
+        async def poll(figi: str, delay: float):
+            await scheduler.wait_turn(figi, delay)
+            order.append(figi)
+
+        await asyncio.wait_for(asyncio.gather(poll("LATE", 0.05), poll("EARLY", 0.01)), timeout=1)
+
+        assert order == ["EARLY", "LATE"]
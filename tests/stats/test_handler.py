@@ -0,0 +1,54 @@
+from unittest.mock import AsyncMock
+
+from grpc import StatusCode
+from tinkoff.invest import (
+    AioRequestError,
+    MoneyValue,
+    OrderDirection,
+    OrderExecutionReportStatus,
+    OrderState,
+)
+
+from app.stats import handler
+from app.stats.handler import StatsHandler
+from app.strategies.models import StrategyName
+
+NEW = OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_NEW
+FILL = OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL
+
+
+def get_order_state(status: OrderExecutionReportStatus) -> OrderState:
+    money = MoneyValue(units=100, nano=0)
+    return OrderState(
+        order_id="order",
+        figi="FIGI",
+        direction=OrderDirection.ORDER_DIRECTION_BUY,
+        execution_report_status=status,
+        lots_requested=1,
+        lots_executed=1 if status == FILL else 0,
+        total_order_amount=money,
+        average_position_price=money,
+        executed_order_price=money,
+        executed_commission=MoneyValue(units=0, nano=0),
+    )
+
+
+class TestStatsHandler:
+    async def test_order_is_tracked_after_request_errors(self, mocker):
+        mocker.patch.object(handler, "StatsSQLiteClient")
+        sleep = mocker.patch.object(handler.asyncio, "sleep", AsyncMock())
+        error = AioRequestError(StatusCode.UNAVAILABLE, "unavailable", None)
+        broker_client = AsyncMock()
+        broker_client.get_order_state.side_effect = [
+            get_order_state(NEW),
+            error,
+            error,
+            get_order_state(FILL),
+        ]
+        stats_handler = StatsHandler(StrategyName.INTERVAL, broker_client)
+
+        await stats_handler.handle_new_order(account_id="account", order_id="order")
+
+        assert [call.args[0] for call in sleep.await_args_list] == [10, 20, 40]
+        stats_handler.db.finalize_order.assert_called_once()
+        assert stats_handler.db.finalize_order.call_args.kwargs["status"] == str(FILL)
@@ -0,0 +1,39 @@
+from datetime import date
+
+import pytest
+
+from app.stats.sqlite_client import StatsSQLiteClient
+
+
+@pytest.fixture
+def db(tmp_path):
+    return StatsSQLiteClient(db_name=str(tmp_path / "stats.db"))
+
+
+def fill(db: StatsSQLiteClient, order_id: str, is_buy: bool, lots: int, amount: float) -> None:
+    db.add_order(
+        order_id, "FIGI", "BUY" if is_buy else "SELL", amount, lots, "NEW", "interval", "a"
+    )
+    db.finalize_order(order_id, "FILL", is_buy, amount / lots, amount, lots, 1.0)
+
+
+class TestStatsSQLiteClient:
+    def test_open_position_is_not_a_loss(self, db):
+        fill(db, "buy", is_buy=True, lots=10, amount=1000.0)
+
+        [(figi, pnl, *_)] = db.get_pnl_by_figi(since=date(2000, 1, 1))
+
+        assert (figi, pnl) == ("FIGI", 0.0)
+
+    def test_pnl_is_realized_by_average_cost(self, db):
+        fill(db, "first buy", is_buy=True, lots=10, amount=1000.0)
+        fill(db, "second buy", is_buy=True, lots=10, amount=1200.0)
+        fill(db, "sell", is_buy=False, lots=5, amount=600.0)
+        # Finalizing the order again doesn't change the rollup
+        db.finalize_order("sell", "FILL", False, 120.0, 600.0, 5, 1.0)
+
+        [(_, pnl, bought_lots, sold_lots, *_)] = db.get_pnl_by_figi(since=date(2000, 1, 1))
+
+        assert (bought_lots, sold_lots) == (20, 5)
+        # Average cost of a lot is (1000 + 1200 + 2 commissions) / 20 = 110.1
+        assert pnl == pytest.approx(600.0 - 5 * 110.1 - 1.0)
@@ -0,0 +1,40 @@
+from unittest.mock import AsyncMock
+
+from app.stop_loss.engine import StopLossEngine
+
+
+class TestStopLossEngine:
+    def test_crossed_from_the_highest_level(self):
+        engine = StopLossEngine()
+        callback = AsyncMock()
+        engine.set_trigger("first", "FIGI", level=90.0, quantity=1, callback=callback)
+        engine.set_trigger("second", "FIGI", level=95.0, quantity=1, callback=callback)
+        engine.set_trigger("third", "FIGI", level=80.0, quantity=1, callback=callback)
+
+        assert engine.pop_crossed("FIGI", 96.0) == []
+        crossed = engine.pop_crossed("FIGI", 90.0)
+
+        assert [trigger.account_id for trigger in crossed] == ["second", "first"]
+        assert engine.get_trigger("first", "FIGI") is None
+        assert engine.get_trigger("third", "FIGI").level == 80.0
+
+    def test_set_trigger_replaces_the_position_trigger(self):
+        engine = StopLossEngine()
+        callback = AsyncMock()
+        engine.set_trigger("account", "FIGI", level=95.0, quantity=1, callback=callback)
+        engine.set_trigger("account", "FIGI", level=85.0, quantity=2, callback=callback)
+
+        assert engine.pop_crossed("FIGI", 90.0) == []
+        crossed = engine.pop_crossed("FIGI", 85.0)
+
+        assert [(trigger.level, trigger.quantity) for trigger in crossed] == [(85.0, 2)]
+        assert engine.pop_crossed("FIGI", 0.0) == []
+
+    async def test_on_price_calls_callbacks(self):
+        engine = StopLossEngine()
+        callback = AsyncMock()
+        trigger = engine.set_trigger("account", "FIGI", level=95.0, quantity=1, callback=callback)
+
+        await engine.on_price("FIGI", 94.0)
+
+        callback.assert_awaited_once_with(trigger, 94.0)
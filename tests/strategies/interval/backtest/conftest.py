@@ -21,6 +21,7 @@ from tinkoff.invest import (
     PostOrderResponse,
     InstrumentResponse,
     Instrument,
+    OrderExecutionReportStatus,
 )
 from tinkoff.invest.caching.market_data_cache.cache_settings import MarketDataCacheSettings
 from tinkoff.invest.services import MarketDataCache, Services
@@ -179,7 +180,12 @@ class PortfolioHandler:
             self.resources += quantity * last_price - (self.comission * quantity * last_price)
             self.average_price = MoneyValue(units=0, nano=0)
 
-        return PostOrderResponse(order_id=uuid.uuid4().hex)
+        # Market orders are filled immediately
+        return PostOrderResponse(
+            order_id=uuid.uuid4().hex,
+            figi=self.figi,
+            execution_report_status=OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL,
+        )
 
 
 @pytest.fixture(scope="session")
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+from tinkoff.invest.grpc.orders_pb2 import ORDER_DIRECTION_BUY, ORDER_DIRECTION_SELL
+
+from app.stop_loss.engine import stop_loss_engine
+from app.strategies.interval.decisions import evaluate_actions
+from app.strategies.interval.IntervalStrategy import IntervalStrategy
+from app.strategies.interval.models import Corridor
+
+# last price, bottom, top, quantity, average price, quantity limit, stop loss percent, action
+CASES = [
+    (95.0, 100.0, 120.0, 0, 0.0, 10, 0.01, "buy"),
+    (100.0, 100.0, 120.0, 5, 101.0, 10, 0.05, "buy"),
+    (95.0, 100.0, 120.0, 10, 96.0, 10, 0.05, None),
+    (110.0, 100.0, 120.0, 5, 105.0, 10, 0.01, None),
+    (120.0, 100.0, 120.0, 5, 105.0, 10, 0.01, "sell"),
+    (130.0, 100.0, 120.0, 0, 0.0, 10, 0.01, None),
+    (99.0, 100.0, 120.0, 5, 100.0, 10, 0.01, "stop_loss"),
+    (98.0, 100.0, 120.0, 5, 100.0, 10, 0.01, "stop_loss"),
+    (99.5, 100.0, 120.0, 5, 100.0, 10, 0.01, "buy"),
+    (125.0, 100.0, 120.0, 5, 130.0, 10, 0.01, "stop_loss"),
+    (95.0, 100.0, 120.0, 5, 100.0, 10, 0.0, "stop_loss"),
+]
+
+
+def get_batch_action(last_price, bottom, top, quantity, average_price, limit, stop_loss_percent):
+    actions = evaluate_actions(
+        last_price=np.array([last_price]),
+        top=np.array([top]),
+        bottom=np.array([bottom]),
+        quantity=np.array([quantity]),
+        average_price=np.array([average_price]),
+        quantity_limit=np.array([limit]),
+        stop_loss_percent=np.array([stop_loss_percent]),
+        is_available=np.array([True]),
+    )
+    for name in ("stop_loss", "sell", "buy"):
+        if getattr(actions, name)[0]:
+            return name
+    return None
+
+
+async def get_strategy_action(
+    mocker, last_price, bottom, top, quantity, average_price, limit, stop_loss_percent
+):
+    client = mocker.patch("app.strategies.interval.IntervalStrategy.client")
+    client.post_order = AsyncMock()
+    mocker.patch("app.strategies.interval.IntervalStrategy.StatsHandler", MagicMock())
+    strategy = IntervalStrategy(
+        figi="FIGI",
+        account_id="account",
+        quantity_limit=limit,
+        stop_loss_percent=stop_loss_percent,
+    )
+    strategy.handle_stop_loss = AsyncMock()
+    strategy.handle_posted_order = MagicMock()
+    strategy.get_position_quantity = AsyncMock(return_value=quantity)
+    strategy.instrument_info = SimpleNamespace(lot=1)
+    strategy.corridor = Corridor(bottom=bottom, top=top)
+    strategy.position_quantity, strategy.position_price = quantity, average_price
+    strategy.update_stop_loss_trigger()
+    try:
+        await strategy.handle_last_price(last_price)
+    finally:
+        stop_loss_engine.remove_trigger("account", "FIGI")
+
+    if strategy.handle_stop_loss.called:
+        return "stop_loss"
+    if client.post_order.called:
+        direction = client.post_order.call_args.kwargs["direction"]
+        return {ORDER_DIRECTION_SELL: "sell", ORDER_DIRECTION_BUY: "buy"}[direction]
+    return None
+
+
+@pytest.mark.parametrize("case", CASES)
+async def test_batch_decisions_match_strategy(case, test_settings, mocker):
+    *parameters, expected_action = case
+
+    assert get_batch_action(*parameters) == expected_action
+    assert await get_strategy_action(mocker, *parameters) == expected_action
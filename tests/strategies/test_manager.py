@@ -0,0 +1,41 @@
+import asyncio
+
+from app.instruments_config.models import InstrumentsConfig
+from app.strategies import manager as manager_module
+from app.strategies.manager import StrategiesManager
+
+CONFIG = InstrumentsConfig.parse_obj(
+    {"instruments": [{"figi": "FIGI", "strategy": {"name": "interval", "parameters": {}}}]}
+)
+
+
+class CrashingStrategy:
+    started = 0
+
+    def __init__(self, **kwargs):
+        pass
+
+    async def start(self):
+        CrashingStrategy.started += 1
+        raise RuntimeError("crash")
+
+
+async def wait_for_strategies(manager: StrategiesManager) -> None:
+    await asyncio.wait(list(manager.tasks.values()))
+    # Done callbacks are called on the next loop iteration
+    await asyncio.sleep(0)
+
+
+class TestStrategiesManager:
+    async def test_crashed_strategy_is_restarted_on_apply(self, test_settings, mocker):
+        mocker.patch.object(manager_module, "resolve_strategy", CrashingStrategy)
+        CrashingStrategy.started = 0
+        manager = StrategiesManager()
+
+        manager.apply(CONFIG)
+        await wait_for_strategies(manager)
+        assert manager.tasks == {} and manager.strategies == {}
+
+        manager.apply(CONFIG)
+        await wait_for_strategies(manager)
+        assert CrashingStrategy.started == 2
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+from app.client import client
+from app.scheduler.polling import polling_scheduler
+from app.context import AppContext, context
+from app.settings import Settings, settings
+
+
+class TestAppContext:
+    def test_import_does_not_require_token(self):
+        env = {key: value for key, value in os.environ.items() if key != "TOKEN"}
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, app.main; from app.context import context; "
+                "assert context._settings is None and context._client is None; "
+                "assert not {'numpy', 'tinkoff', 'grpc'} & set(sys.modules)",
+            ],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        assert process.returncode == 0, process.stderr
+
+    def test_configure_replaces_imported_proxies(self, test_settings):
+        context.configure(
+            settings=Settings(token="test", request_deadline=1.5),
+            client=SimpleNamespace(name="fake"),
+        )
+
+        assert settings.request_deadline == 1.5
+        assert client.name == "fake"
+
+    def test_services_follow_configured_settings(self, test_settings):
+        assert polling_scheduler.requests_per_second == test_settings.polling_requests_per_second
+
+        context.configure(settings=Settings(token="test", polling_requests_per_second=50))
+
+        assert polling_scheduler.requests_per_second == 50
+
+    def test_objects_are_created_on_first_use(self, monkeypatch):
+        monkeypatch.setenv("TOKEN", "test")
+        app_context = AppContext()
+
+        assert app_context._settings is None
+        assert app_context.settings.token == "test"
+        assert app_context.settings is app_context.settings
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from tools.sim import cache as cache_module
+from tools.sim.cache import CODE_FILES, ResultCache, get_key
+
+
+@pytest.fixture
+def code_root(tmp_path, monkeypatch):
+    root = tmp_path / "code"
+    for name in CODE_FILES:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"# {name}\n")
+    monkeypatch.setattr(cache_module, "ROOT", root)
+    monkeypatch.setattr(cache_module, "_code_version", None)
+    return root
+
+
+class TestResultCache:
+    def test_least_recently_used_entries_are_evicted(self, tmp_path):
+        cache = ResultCache(str(tmp_path / "cache"))
+        for key in ("a", "b", "c"):
+            cache.put("results", key, b"x" * 1000)
+        for key, accessed_at in (("a", 1000), ("b", 2000), ("c", 3000)):
+            os.utime(tmp_path / "cache" / "results" / f"{key}.pkl", (accessed_at, accessed_at))
+        assert cache.get("results", "a") is not None
+
+        entry_size = next(cache.entries()).size
+        removed = cache.evict(max_size=2 * entry_size)
+
+        assert [entry.key for entry in removed] == ["b"]
+        assert cache.get("results", "b") is None
+        assert cache.get("results", "c") is not None
+
+    def test_put_does_not_evict(self, tmp_path):
+        cache = ResultCache(str(tmp_path / "cache"), max_size=0)
+        cache.put("results", "a", 1)
+        cache.put("results", "b", 2)
+
+        assert cache.get("results", "a") == 1
+        assert len(cache.evict()) == 2
+        assert list(cache.entries()) == []
+
+    def test_evict_within_namespace(self, tmp_path):
+        cache = ResultCache(str(tmp_path / "cache"))
+        cache.put("results", "result", 1)
+        cache.put("signals", "signals", 2)
+
+        removed = cache.evict(max_size=0, namespace="signals")
+
+        assert [entry.key for entry in removed] == ["signals"]
+        assert cache.get("results", "result") == 1
+
+    def test_code_change_invalidates_keys(self, tmp_path, code_root):
+        cache = ResultCache(str(tmp_path / "cache"))
+        cache.put("results", get_key({"figi": "FIGI"}), "result")
+        assert cache.get("results", get_key({"figi": "FIGI"})) == "result"
+
+        (code_root / CODE_FILES[0]).write_text("# changed\n")
+        cache_module._code_version = None
+
+        assert cache.get("results", get_key({"figi": "FIGI"})) is None
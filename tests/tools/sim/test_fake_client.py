@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+
+import pytest
+from grpc import StatusCode
+from tinkoff.invest import AioRequestError
+
+from tools.sim.fake_client import FakeClientConfig, FakeTinkoffClient
+
+
+class TestFakeTinkoffClient:
+    async def test_unknown_order_is_not_found(self):
+        client = FakeTinkoffClient(
+            config=FakeClientConfig(latency=0),
+            clock=lambda: datetime(2024, 1, 10, 12, tzinfo=timezone.utc),
+        )
+
+        with pytest.raises(AioRequestError) as error:
+            await client.get_order_state(account_id="fake-account", order_id="unknown")
+
+        assert error.value.code == StatusCode.NOT_FOUND
@@ -0,0 +1,59 @@
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+
+from tools.sim.portfolio import (
+    InstrumentSignals,
+    SimulatedAccount,
+    compute_all_signals,
+    compute_synthetic_signals,
+    get_attribution,
+    run_portfolio,
+)
+
+END = datetime.fromisoformat("2024-01-03T00:00:00+00:00")
+START = datetime.fromisoformat("2024-01-02T00:00:00+00:00")
+PARAMETERS = [
+    {"interval_size": 0.5, "days_back_to_consider": 1, "check_interval": 300, "quantity_limit": 20},
+    {"interval_size": 0.6, "days_back_to_consider": 1, "check_interval": 600, "quantity_limit": 5},
+]
+
+
+def run_synthetic_portfolio(workers: int):
+    figis = ["FIGI0001", "FIGI0002"]
+    compute = partial(compute_synthetic_signals, market_config={"seed": 1})
+    signals = compute_all_signals(compute, figis, PARAMETERS, START, END, workers=workers)
+    account = SimulatedAccount(figis, cash=10000.0, commission=0.001)
+    return run_portfolio(signals, PARAMETERS, account)
+
+
+def get_signals(figi: str, price: float) -> InstrumentSignals:
+    return InstrumentSignals(
+        figi=figi,
+        time=np.array([0]),
+        price=np.array([price]),
+        bottom=np.array([110.0]),
+        top=np.array([200.0]),
+        is_open=np.array([True]),
+    )
+
+
+class TestPortfolio:
+    def test_result_does_not_depend_on_workers(self):
+        first = run_synthetic_portfolio(workers=1)
+        second = run_synthetic_portfolio(workers=2)
+
+        np.testing.assert_array_equal(first.equity, second.equity)
+        assert get_attribution(first.account) == get_attribution(second.account)
+
+    def test_buys_are_limited_by_cash(self):
+        account = SimulatedAccount(["FIGI0001", "FIGI0002"], cash=1500.0, commission=0.0)
+        parameters = [{"quantity_limit": 10}, {"quantity_limit": 10}]
+
+        run_portfolio(
+            [get_signals("FIGI0001", 100.0), get_signals("FIGI0002", 100.0)], parameters, account
+        )
+
+        assert account.quantity.tolist() == [10, 5]
+        assert account.cash == 0.0
@@ -0,0 +1,37 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+from tools.sim.replay_client import ReplayClient
+
+
+def get_candle_values(time: int) -> list:
+    return [time, 100, 0, 101, 0, 99, 0, 100, 0, 10, True]
+
+
+class TestReplayClient:
+    async def test_candles_are_filtered_by_the_requested_window(self, tmp_path):
+        path = tmp_path / "session.jsonl.gz"
+        event = {
+            "t": 300.0,
+            "m": "get_all_candles",
+            "k": {"figi": "FIGI"},
+            "n": 3,
+            "c": [get_candle_values(time) for time in (60, 120, 180)],
+        }
+        with gzip.open(path, "wt") as file:
+            file.write(json.dumps(event) + "\n" + json.dumps(event) + "\n")
+        client = ReplayClient([str(path)])
+
+        candles = [
+            candle
+            async for candle in client.get_all_candles(
+                figi="FIGI",
+                from_=datetime.fromtimestamp(120, tz=timezone.utc),
+                to=datetime.fromtimestamp(180, tz=timezone.utc),
+            )
+        ]
+        all_candles = [candle async for candle in client.get_all_candles(figi="FIGI")]
+
+        assert [int(candle.time.timestamp()) for candle in candles] == [120]
+        assert [int(candle.time.timestamp()) for candle in all_candles] == [60, 120, 180]
@@ -0,0 +1,73 @@
+"""
+Inspection and pruning of the backtest cache.
+
+    PYTHONPATH=./ python tools/backtest_cache.py stats
+    PYTHONPATH=./ python tools/backtest_cache.py list --namespace signals
+    PYTHONPATH=./ python tools/backtest_cache.py prune --older-than 7
+    PYTHONPATH=./ python tools/backtest_cache.py prune --max-size 256
+    PYTHONPATH=./ python tools/backtest_cache.py prune --all --namespace results
+"""
+
+import argparse
+from collections import defaultdict
+from datetime import datetime
+
+from tools.sim.cache import DEFAULT_CACHE_DIR, ResultCache, get_code_version
+
+
+def format_size(size: int) -> str:
+    return f"{size / 2**20:.1f} MB"
+
+
+def show_stats(cache: ResultCache) -> None:
+    counts = defaultdict(int)
+    sizes = defaultdict(int)
+    for entry in cache.entries():
+        counts[entry.namespace] += 1
+        sizes[entry.namespace] += entry.size
+    print(f"Cache directory: {cache.directory}, code version: {get_code_version()}")
+    for namespace in sorted(counts):
+        print(f"{namespace:>10}: {counts[namespace]:>6} entries, {format_size(sizes[namespace])}")
+    print(f"{'total':>10}: {sum(counts.values()):>6} entries, {format_size(sum(sizes.values()))}")
+
+
+def show_entries(cache: ResultCache, namespace: str) -> None:
+    for entry in sorted(cache.entries(namespace), key=lambda entry: -entry.accessed_at):
+        accessed_at = datetime.fromtimestamp(entry.accessed_at).isoformat(timespec="seconds")
+        print(f"{entry.namespace:>10} {entry.key[:16]} {format_size(entry.size):>10} {accessed_at}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="number and size of the entries")
+    list_parser = subparsers.add_parser("list", help="entries, the recently used first")
+    list_parser.add_argument("--namespace", help="signals or results")
+    prune_parser = subparsers.add_parser("prune", help="remove entries")
+    prune_parser.add_argument("--namespace", help="signals or results")
+    prune_parser.add_argument("--older-than", type=float, help="days since the last access")
+    prune_parser.add_argument("--max-size", type=int, help="evict the least recently used, MB")
+    prune_parser.add_argument("--all", action="store_true", help="remove all the entries")
+    args = parser.parse_args()
+    if args.command == "prune":
+        options = [args.older_than is not None, args.max_size is not None, args.all]
+        if sum(options) != 1:
+            parser.error("prune requires exactly one of --older-than, --max-size and --all")
+
+    cache = ResultCache(args.cache_dir)
+    if args.command == "stats":
+        show_stats(cache)
+    elif args.command == "list":
+        show_entries(cache, args.namespace)
+    elif args.max_size is not None:
+        removed = cache.evict(args.max_size * 2**20, namespace=args.namespace)
+        print(f"Removed {len(removed)} entries, {format_size(sum(e.size for e in removed))}")
+    else:
+        older_than = args.older_than * 86400 if args.older_than is not None else None
+        removed = cache.prune(older_than=older_than, namespace=args.namespace)
+        print(f"Removed {len(removed)} entries, {format_size(sum(e.size for e in removed))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Offline benchmarks of the hot paths. Everything runs on synthetic data, no token or network is needed.
+
+    PYTHONPATH=./ python tools/benchmark.py --output bench_results.json
+    PYTHONPATH=./ python tools/benchmark.py --compare bench_baseline.json
+
+Comparison exits with code 1 if any benchmark is slower than the baseline by more than the threshold.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("TOKEN", "benchmark")
+
+from tools.sim.backtest import run_strategy_backtest  # noqa: E402
+from tools.sim.candles import SyntheticMarketConfig, generate_candles  # noqa: E402
+from tools.sim.fake_client import FakeClientConfig, FakeTinkoffClient, to_quotation  # noqa: E402
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], None]]] = {}
+
+
+def benchmark(name: str):
+    """
+    Registers benchmark setup function. Setup is not timed and returns the function to time.
+    """
+
+    def decorator(setup: Callable[[], Callable[[], None]]):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+async def iterate(items: list):
+    for item in items:
+        yield item
+
+
+@benchmark("update_corridor_90_days")
+def setup_update_corridor() -> Callable[[], None]:
+    from app.strategies.interval.IntervalStrategy import IntervalStrategy
+
+    fake_client = FakeTinkoffClient(config=FakeClientConfig(latency=0.0, history_days=91))
+    now = datetime.now(tz=timezone.utc)
+
+    async def download_candles() -> list:
+        return [
+            candle
+            async for candle in fake_client.get_all_candles(
+                figi="BENCH0001", from_=now - timedelta(days=90), to=now
+            )
+        ]
+
+    # Candles are built once, so the run times the corridor calculation only
+    candles = asyncio.run(download_candles())
+    client = MagicMock()
+    client.get_all_candles = lambda **kwargs: iterate(candles)
+    with patch("app.strategies.interval.IntervalStrategy.StatsHandler", MagicMock()):
+        strategy = IntervalStrategy(figi="BENCH0001", days_back_to_consider=90)
+
+    def run():
+        with patch("app.strategies.interval.IntervalStrategy.client", client):
+            asyncio.run(strategy.update_corridor())
+
+    return run
+
+
+@benchmark("quotation_to_float_100k")
+def setup_quotation_to_float() -> Callable[[], None]:
+    from app.utils.quotation import quotation_to_float
+
+    now = datetime.now(tz=timezone.utc)
+    series = generate_candles("BENCH0002", now - timedelta(days=200), now, SyntheticMarketConfig())
+    quotations = [to_quotation(value) for value in series.close[:100_000]]
+
+    def run():
+        for quotation in quotations:
+            quotation_to_float(quotation)
+
+    return run
+
+
+@benchmark("backtest_2_days")
+def setup_backtest() -> Callable[[], None]:
+    parameters = {"days_back_to_consider": 3, "check_interval": 300, "quantity_limit": 10}
+
+    def run():
+        asyncio.run(run_strategy_backtest("BENCH0003", parameters, days=2))
+
+    return run
+
+
+@benchmark("stats_insert_finalize_1k")
+def setup_stats() -> Callable[[], None]:
+    from app.stats.sqlite_client import StatsSQLiteClient
+
+    def run():
+        with tempfile.TemporaryDirectory() as workdir:
+            db = StatsSQLiteClient(db_name=os.path.join(workdir, "stats.db"))
+            for i in range(1000):
+                order_id = f"order-{i}"
+                db.add_order(order_id, f"FIGI{i % 50}", "BUY", 100.0, 1, "NEW", "interval", "acc")
+                db.finalize_order(order_id, "FILL", i % 2 == 0, 100.0, 100.0, 1, 0.3)
+            db.db_client.close()
+
+    return run
+
+
+@benchmark("startup_to_first_decision")
+def setup_startup() -> Callable[[], None]:
+    def run():
+        subprocess.run(
+            [sys.executable, __file__, "--startup-probe"],
+            check=True,
+            env={**os.environ, "PYTHONPATH": os.getcwd()},
+            stdout=subprocess.DEVNULL,
+        )
+
+    return run
+
+
+def startup_probe():
+    """
+    Starts the bot with the fake client and exits on the first last price request,
+    which is the moment the first trading decision is made.
+    """
+    workdir = tempfile.mkdtemp(prefix="benchmark_")
+    config_path = os.path.join(workdir, "instruments_config.json")
+    with open(config_path, "w") as f:
+        json.dump(
+            {
+                "instruments": [
+                    {"figi": "BENCH0004", "strategy": {"name": "interval", "parameters": {}}}
+                ]
+            },
+            f,
+        )
+    os.environ.update(
+        {
+            "INSTRUMENTS_CONFIG_FILE": config_path,
+            "INSTRUMENTS_CONFIG_RELOAD_INTERVAL": "0",
+            "LOG_LEVEL": "30",
+        }
+    )
+    os.chdir(workdir)
+
+    class ProbeClient(FakeTinkoffClient):
+        async def get_last_prices(self, **kwargs):
+            os._exit(0)
+
+    from app.context import context
+
+    context.configure(client=ProbeClient(config=FakeClientConfig(latency=0.0, history_days=31)))
+    from app.main import run
+
+    asyncio.run(run())
+
+
+def run_benchmarks(names: List[str], repeat: int) -> dict:
+    results = {}
+    for name in names:
+        run = BENCHMARKS[name]()
+        timings = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started_at)
+        results[name] = {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "runs": timings,
+        }
+        print(f"{name:<30} median={results[name]['median']:.4f}s min={results[name]['min']:.4f}s")
+    return results
+
+
+def get_git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    """
+    Print comparison with the baseline by median times.
+
+    :return: True if there are no regressions
+    """
+    ok = True
+    print(f"{'benchmark':<30} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<30} {'-':>10} {result['median']:>10.4f} {'new':>7}")
+            continue
+        ratio = result["median"] / baseline[name]["median"]
+        slower = ratio > 1 + threshold
+        ok = ok and not slower
+        print(
+            f"{name:<30} {baseline[name]['median']:>10.4f} {result['median']:>10.4f} "
+            f"{ratio:>7.2f}{'  SLOWER' if slower else ''}"
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot path benchmarks")
+    parser.add_argument("--only", help="comma separated benchmark names", default="")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="path to save the results as json")
+    parser.add_argument("--compare", help="path to the baseline results json")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown ratio")
+    parser.add_argument("--startup-probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.startup_probe:
+        startup_probe()
+        return
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    results = run_benchmarks(names, args.repeat)
+    report = {
+        "meta": {
+            "created_at": datetime.now(tz=timezone.utc).isoformat(),
+            "revision": get_git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if not compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
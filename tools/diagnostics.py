@@ -0,0 +1,48 @@
+import argparse
+import os
+import socket
+import sys
+
+
+def send_command(path: str, command: str, timeout: float) -> str:
+    """
+    Sends the command to the diagnostics socket of the running bot and returns the output.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(path)
+        connection.sendall(command.encode() + b"\n")
+        chunks = []
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks).decode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diagnostics of the running bot")
+    parser.add_argument(
+        "--socket",
+        default=os.environ.get("DIAGNOSTICS_SOCKET"),
+        help="Diagnostics socket path. DIAGNOSTICS_SOCKET by default",
+    )
+    parser.add_argument("command", nargs="*", default=["help"], help="Command, e.g. profile 10")
+    args = parser.parse_args()
+    if not args.socket:
+        parser.error("Diagnostics socket is not set")
+    command = " ".join(args.command)
+    timeout = 30.0
+    if args.command[0] == "profile":
+        # The profile is returned after it's finished
+        timeout += float(args.command[1]) if len(args.command) > 1 else 10.0
+    try:
+        print(send_command(args.socket, command, timeout))
+    except OSError as e:
+        print(f"Can't connect to {args.socket}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
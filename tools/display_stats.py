@@ -1,14 +1,44 @@
-import sqlite3
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
 
+from app.stats.sqlite_client import StatsSQLiteClient
 
-def get_orders():
-    with sqlite3.connect("stats.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM orders")
-        return cursor.fetchall()
+
+def display_orders(db: StatsSQLiteClient):
+    for order in db.get_orders():
+        print(order)
+
+
+def display_pnl(db: StatsSQLiteClient, days: int):
+    started_at = time.perf_counter()
+    # Days of the rollup are UTC days
+    today = datetime.now(tz=timezone.utc).date()
+    rows = db.get_pnl_by_figi(since=today - timedelta(days=days))
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    print(
+        f"{'figi':<14} {'pnl':>14} {'bought lots':>12} {'sold lots':>12} {'commission':>12} "
+        f"{'orders':>8}"
+    )
+    for figi, pnl, bought_lots, sold_lots, commission, orders_count in rows:
+        print(
+            f"{figi:<14} {pnl:>14.2f} {bought_lots:>12} {sold_lots:>12} {commission:>12.2f} "
+            f"{orders_count:>8}"
+        )
+    print(f"PnL by instrument for the last {days} days. Query took {elapsed_ms:.1f} ms")
 
 
 if __name__ == "__main__":
-    orders = get_orders()
-    for order in orders:
-        print(order)
+    parser = argparse.ArgumentParser(description="Display trading stats")
+    parser.add_argument("--db", default="stats.db", help="path to the stats database")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("orders", help="list of executed trades (default)")
+    pnl_parser = subparsers.add_parser("pnl", help="PnL by instrument")
+    pnl_parser.add_argument("--days", type=int, default=90, help="number of days back")
+    args = parser.parse_args()
+
+    stats_db = StatsSQLiteClient(db_name=args.db)
+    if args.command == "pnl":
+        display_pnl(stats_db, args.days)
+    else:
+        display_orders(stats_db)
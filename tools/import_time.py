@@ -0,0 +1,125 @@
+"""
+Import time of the app and tools entry points.
+
+Every module is imported in a fresh interpreter with `-X importtime` and without TOKEN,
+so a module which needs the settings or creates the client on import fails here.
+
+    PYTHONPATH=./ python tools/import_time.py
+    PYTHONPATH=./ python tools/import_time.py --modules app.main --top 15
+
+Reports the import time (interpreter startup excluded), the wall time of the process
+and which heavy packages were loaded by the import.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+DEFAULT_MODULES = [
+    "app.settings",
+    "app.context",
+    "app.client",
+    "app.instruments_config.parser",
+    "app.strategies.interval.decisions",
+    "app.strategies.manager",
+    "app.main",
+    "tools.sim.cache",
+    "tools.sim.portfolio",
+    "tools.portfolio_backtest",
+]
+HEAVY_PACKAGES = ("numpy", "tinkoff", "grpc", "pydantic", "sqlite3")
+
+PROBE = "import {module}, json, sys; print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}})))"
+
+
+def parse_import_time(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    :return: (package, self us, cumulative us, nesting level) of every line of -X importtime
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        level = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), level))
+    return rows
+
+
+def run_probe(module: str) -> Tuple[subprocess.CompletedProcess, float]:
+    env = {key: value for key, value in os.environ.items() if key != "TOKEN"}
+    started_at = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module)],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    return process, time.perf_counter() - started_at
+
+
+def measure(module: str, startup_modules: Set[str], repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        process, wall_time = run_probe(module)
+        if process.returncode != 0:
+            error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "failed"
+            return {"module": module, "error": error}
+        rows = [row for row in parse_import_time(process.stderr) if row[0] not in startup_modules]
+        import_time = sum(cumulative for _, _, cumulative, level in rows if level == 1) / 1e6
+        if best is None or import_time < best["import_time"]:
+            self_times: Dict[str, int] = defaultdict(int)
+            for name, self_us, _, _ in rows:
+                self_times[name.split(".")[0]] += self_us
+            loaded = set(json.loads(process.stdout.strip().splitlines()[-1]))
+            best = {
+                "module": module,
+                "import_time": import_time,
+                "wall_time": wall_time,
+                "heavy_packages": [name for name in HEAVY_PACKAGES if name in loaded],
+                "packages": {name: us / 1e6 for name, us in self_times.items()},
+            }
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of the entry points")
+    parser.add_argument("--modules", default=",".join(DEFAULT_MODULES), help="comma separated")
+    parser.add_argument("--repeat", type=int, default=3, help="the fastest run is reported")
+    parser.add_argument("--top", type=int, default=0, help="show the slowest packages")
+    parser.add_argument("--output", help="path to save the results as json")
+    args = parser.parse_args()
+
+    process, _ = run_probe("sys")
+    startup_modules = {name for name, _, _, _ in parse_import_time(process.stderr)}
+
+    results = []
+    print(f"{'module':<36} {'import':>9} {'wall':>9}  heavy packages")
+    for module in args.modules.split(","):
+        result = measure(module, startup_modules, args.repeat)
+        results.append(result)
+        if "error" in result:
+            print(f"{module:<36} {'failed':>9} {'':>9}  {result['error']}")
+            continue
+        print(
+            f"{module:<36} {result['import_time'] * 1000:>7.1f}ms {result['wall_time'] * 1000:>7.1f}ms"
+            f"  {', '.join(result['heavy_packages']) or '-'}"
+        )
+        if args.top:
+            packages = sorted(result["packages"].items(), key=lambda item: -item[1])
+            for name, seconds in packages[: args.top]:
+                print(f"    {name:<32} {seconds * 1000:>7.1f}ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if any("error" in result for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Runs the unchanged bot runtime (app.main.run) against a fake broker with synthetic market data
+and reports cycle latency, API call rates and memory usage.
+
+Several instrument counts can be given at once, every count is run in a separate process:
+
+    PYTHONPATH=./ python tools/load_test.py --instruments 10,100,500 --duration 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from tools.sim.candles import SyntheticMarketConfig
+from tools.sim.fake_client import FakeClientConfig, FakeTinkoffClient
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "max": max(values), "count": len(values)}
+
+
+class InstrumentedFakeClient(FakeTinkoffClient):
+    """
+    Measures strategy cycles from the client side.
+
+    A cycle starts with the trading status request (ensure_market_open) and the decision
+    latency is the time from that moment to the last price response, which covers history
+    download, corridor calculation and orders check.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cycle_started_at: Dict[str, float] = {}
+        self.cycle_periods: List[float] = []
+        self.decision_latencies: List[float] = []
+
+    async def get_trading_status(self, figi: str, **kwargs):
+        started_at = time.perf_counter()
+        if figi in self.cycle_started_at:
+            self.cycle_periods.append(started_at - self.cycle_started_at[figi])
+        self.cycle_started_at[figi] = started_at
+        return await super().get_trading_status(figi=figi, **kwargs)
+
+    async def get_last_prices(self, figi: List[str], **kwargs):
+        response = await super().get_last_prices(figi=figi, **kwargs)
+        for f in figi:
+            if f in self.cycle_started_at:
+                self.decision_latencies.append(time.perf_counter() - self.cycle_started_at[f])
+        return response
+
+
+def get_rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+async def measure_loop_lag(lags: List[float], interval: float = 0.1):
+    while True:
+        started_at = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started_at - interval)
+
+
+def write_instruments_config(path: str, figis: List[str], args: argparse.Namespace) -> None:
+    instruments = [
+        {
+            "figi": figi,
+            "strategy": {
+                "name": "interval",
+                "parameters": {
+                    "interval_size": 0.8,
+                    "days_back_to_consider": args.days_back,
+                    "check_interval": args.check_interval,
+                    "quantity_limit": 10,
+                },
+            },
+        }
+        for figi in figis
+    ]
+    with open(path, "w") as f:
+        json.dump({"instruments": instruments}, f)
+
+
+async def run_load_test(args: argparse.Namespace) -> dict:
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    config_path = os.path.join(workdir, "instruments_config.json")
+    figis = [f"SYN{i:08d}" for i in range(args.instruments)]
+    write_instruments_config(config_path, figis, args)
+
+    # Settings are read on the first use, so the environment has to be ready before running app
+    os.environ.setdefault("TOKEN", "load-test")
+    os.environ.setdefault("LOG_LEVEL", "30")
+    os.environ["INSTRUMENTS_CONFIG_FILE"] = config_path
+    os.environ["INSTRUMENTS_CONFIG_RELOAD_INTERVAL"] = "0"
+    os.chdir(workdir)
+
+    fake_client = InstrumentedFakeClient(
+        market_config=SyntheticMarketConfig(seed=args.seed),
+        config=FakeClientConfig(
+            latency=args.latency,
+            error_rate=args.error_rate,
+            rate_limits={"get_last_prices": args.rate_limit} if args.rate_limit else {},
+            history_days=args.days_back + 1,
+        ),
+    )
+    for figi in figis:
+        fake_client.get_series(figi)
+    market_data_bytes = sum(series.nbytes for series in fake_client.series.values())
+
+    from app.context import context
+
+    context.configure(client=fake_client)
+    from app.main import run
+
+    rss_before = get_rss_bytes()
+    lags: List[float] = []
+    lag_task = asyncio.create_task(measure_loop_lag(lags))
+    cpu_started_at = time.process_time()
+    try:
+        await asyncio.wait_for(run(), timeout=args.duration)
+    except asyncio.TimeoutError:
+        pass
+    cpu_time = time.process_time() - cpu_started_at
+    lag_task.cancel()
+
+    return {
+        "instruments": args.instruments,
+        "duration": args.duration,
+        "cpu_time": cpu_time,
+        "cycle_period": percentiles(fake_client.cycle_periods),
+        "decision_latency": percentiles(fake_client.decision_latencies),
+        "loop_lag": percentiles(lags),
+        "api_calls_per_second": {
+            method: stats.calls / args.duration for method, stats in fake_client.stats.items()
+        },
+        "api_errors": {method: stats.errors for method, stats in fake_client.stats.items()},
+        "api_latency": {
+            method: percentiles(stats.latencies) for method, stats in fake_client.stats.items()
+        },
+        "memory": {
+            "rss_before_start": rss_before,
+            "rss_after": get_rss_bytes(),
+            "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            "synthetic_market_data": market_data_bytes,
+        },
+    }
+
+
+def print_report(results: List[dict]) -> None:
+    print(
+        f"{'instruments':>11} {'cpu, s':>8} {'decision p50':>13} {'decision p99':>13} "
+        f"{'cycle p99':>10} {'lag max':>8} {'calls/s':>8} {'rss, MB':>8}"
+    )
+    for result in results:
+        decision = result["decision_latency"]
+        cycle = result["cycle_period"]
+        print(
+            f"{result['instruments']:>11} {result['cpu_time']:>8.1f} "
+            f"{decision.get('p50', float('nan')):>13.3f} {decision.get('p99', float('nan')):>13.3f} "
+            f"{cycle.get('p99', float('nan')):>10.1f} {result['loop_lag'].get('max', 0):>8.3f} "
+            f"{sum(result['api_calls_per_second'].values()):>8.1f} "
+            f"{result['memory']['rss_after'] / 2 ** 20:>8.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the bot against a fake broker")
+    parser.add_argument("--instruments", default="10,100", help="comma separated instrument counts")
+    parser.add_argument("--duration", type=float, default=120, help="seconds to run every test")
+    parser.add_argument("--check-interval", type=int, default=60)
+    parser.add_argument("--days-back", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02, help="median API latency, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0, help="get_last_prices per second")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="path to save the results as json")
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.instruments.split(",")]
+    if len(counts) == 1:
+        args.instruments = counts[0]
+        results = [asyncio.run(run_load_test(args))]
+    else:
+        results = []
+        for count in counts:
+            # Separate process per count to get independent memory and import state
+            with tempfile.NamedTemporaryFile(suffix=".json") as output:
+                command = [sys.executable, __file__, "--instruments", str(count)]
+                for name in (
+                    "duration",
+                    "check_interval",
+                    "days_back",
+                    "latency",
+                    "error_rate",
+                    "rate_limit",
+                    "seed",
+                ):
+                    command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+                command += ["--output", output.name]
+                subprocess.run(command, check=True, env=os.environ)
+                results.extend(json.load(output))
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=float)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Backtest of the whole instruments config on one shared account.
+
+All the instruments are simulated on a merged time axis and compete for the cash of one account.
+Signals (prices and corridors) of every instrument are computed in parallel processes, then the
+decisions are made in time order with the same rules as the interval strategy.
+
+    PYTHONPATH=./ python tools/portfolio_backtest.py --config instruments_config.json --days 30
+
+By default, synthetic candles are used. With --source cache real candles are loaded through
+the candles cache of the tinkoff library, TOKEN environment variable is required then.
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Callable, List, Tuple
+
+from app.instruments_config.models import InstrumentsConfig
+from app.strategies.models import StrategyName
+from tools.sim.cache import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_MAX_SIZE,
+    ResultCache,
+    get_key,
+    normalize_parameters,
+)
+from tools.sim.candles import SyntheticMarketConfig
+from tools.sim.portfolio import (
+    InstrumentSignals,
+    PortfolioResult,
+    SimulatedAccount,
+    compute_all_signals,
+    compute_cached_signals,
+    compute_synthetic_signals,
+    get_attribution,
+    get_max_drawdown,
+    run_portfolio,
+)
+
+
+def print_report(summary: dict) -> None:
+    print(
+        f"Equity: {summary['initial_cash']:.2f} -> {summary['final_equity']:.2f} "
+        f"({summary['return'] * 100:+.2f}%), max drawdown {summary['max_drawdown'] * 100:.2f}%"
+    )
+    print(
+        f"{'figi':>14} {'pnl':>12} {'realized':>12} {'unrealized':>12} {'commission':>11} "
+        f"{'buys':>5} {'sells':>5} {'stops':>5}"
+    )
+    for row in summary["instruments"]:
+        print(
+            f"{row['figi']:>14} {row['pnl']:>12.2f} {row['realized']:>12.2f} "
+            f"{row['unrealized']:>12.2f} {row['commission']:>11.2f} {row['buys']:>5} "
+            f"{row['sells']:>5} {row['stop_losses']:>5}"
+        )
+    print(
+        f"Signals computed in {summary['signals_time']:.2f}s, "
+        f"portfolio simulated in {summary['simulation_time']:.2f}s"
+    )
+
+
+def run(
+    compute: Callable[..., InstrumentSignals],
+    figis: List[str],
+    parameters: List[dict],
+    start: datetime,
+    end: datetime,
+    args: argparse.Namespace,
+) -> Tuple[dict, PortfolioResult]:
+    started_at = time.perf_counter()
+    signals = compute_all_signals(compute, figis, parameters, start, end, workers=args.workers)
+    signals_time = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    account = SimulatedAccount(figis, cash=args.cash, commission=args.commission, lot=args.lot)
+    result = run_portfolio(signals, parameters, account)
+    simulation_time = time.perf_counter() - started_at
+
+    final_equity = float(result.equity[-1]) if len(result.equity) else args.cash
+    summary = {
+        "initial_cash": args.cash,
+        "final_equity": final_equity,
+        "return": final_equity / args.cash - 1,
+        "max_drawdown": get_max_drawdown(result.equity),
+        "instruments": get_attribution(result.account),
+        "signals_time": signals_time,
+        "simulation_time": simulation_time,
+    }
+    return summary, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backtest of the instruments config on one account"
+    )
+    parser.add_argument("--config", default="instruments_config.json")
+    parser.add_argument("--days", type=int, default=30, help="number of days to simulate")
+    parser.add_argument("--end", help="the end of the simulation, ISO format. Default is now")
+    parser.add_argument("--cash", type=float, default=100000.0)
+    parser.add_argument("--commission", type=float, default=0.0005, help="share of the amount")
+    parser.add_argument("--lot", type=int, default=1)
+    parser.add_argument("--source", choices=("synthetic", "cache"), default="synthetic")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic market seed")
+    parser.add_argument("--workers", type=int, default=None, help="signal computing processes")
+    parser.add_argument("--output-dir", help="directory to save equity.csv and summary.json")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="backtest cache directory")
+    parser.add_argument(
+        "--cache-size", type=int, default=DEFAULT_MAX_SIZE // 2**20, help="cache size limit, MB"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the cache")
+    args = parser.parse_args()
+
+    instruments = [
+        instrument
+        for instrument in InstrumentsConfig.parse_file(args.config).instruments
+        if instrument.strategy.name == StrategyName.INTERVAL
+    ]
+    figis = [instrument.figi for instrument in instruments]
+    parameters = [instrument.strategy.parameters for instrument in instruments]
+    end = datetime.fromisoformat(args.end) if args.end else datetime.now(timezone.utc)
+    end = end.replace(second=0, microsecond=0)
+    start = end - timedelta(days=args.days)
+
+    cache = None if args.no_cache else ResultCache(args.cache_dir, args.cache_size * 2**20)
+    if args.source == "synthetic":
+        market_config = {"seed": args.seed}
+        compute = partial(compute_synthetic_signals, market_config=market_config, cache=cache)
+        data = {"source": "synthetic", "market": SyntheticMarketConfig(**market_config).dict()}
+    else:
+        compute = partial(compute_cached_signals, cache=cache)
+        data = {"source": "cache"}
+    key = get_key(
+        data,
+        start.isoformat(),
+        end.isoformat(),
+        figis,
+        [normalize_parameters(p) for p in parameters],
+        {"cash": args.cash, "commission": args.commission, "lot": args.lot},
+    )
+    cached = cache.get("results", key) if cache is not None else None
+    if cached is not None:
+        summary, result = cached
+        print("Results are taken from the cache")
+    else:
+        summary, result = run(compute, figis, parameters, start, end, args)
+        if cache is not None:
+            # the account is not needed to report the results
+            cache.put("results", key, (summary, result._replace(account=None)))
+    if cache is not None:
+        removed = cache.evict()
+        if removed:
+            print(f"Evicted {len(removed)} least recently used cache entries")
+    summary.update(start=start.isoformat(), end=end.isoformat(), source=args.source)
+    print_report(summary)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        with open(os.path.join(args.output_dir, "equity.csv"), "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["time", "cash", "equity"])
+            for t, cash, equity in zip(result.time, result.cash, result.equity):
+                writer.writerow(
+                    [datetime.fromtimestamp(int(t), tz=timezone.utc).isoformat(), cash, equity]
+                )
+        with open(os.path.join(args.output_dir, "summary.json"), "w") as file:
+            json.dump(summary, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Replays recorded sessions (RECORD_SESSIONS_DIR) through the strategies and reports CPU time,
+decision latency and the orders posted during the replay compared with the recorded ones.
+
+    PYTHONPATH=./ python tools/replay.py --config instruments_config.json sessions/session-*.jsonl.gz
+
+By default, the replay runs at full speed: strategy sleeps are skipped and recorded responses
+are returned immediately. With --realtime responses are delayed by the recorded latencies
+and the sleeps are kept, both divided by --speed.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List
+from unittest.mock import patch
+
+import numpy as np
+
+from tools.sim.replay_client import ReplayClient, read_events
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "max": max(values), "count": len(values)}
+
+
+class MeasuredReplayClient(ReplayClient):
+    """
+    Measures the decision latency: the time from the last price response to the posted order.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_price_returned_at: Dict[str, float] = {}
+        self.decision_latencies: List[float] = []
+        self.posted_orders: List[tuple] = []
+
+    async def get_last_prices(self, **kwargs):
+        response = await super().get_last_prices(**kwargs)
+        returned_at = time.perf_counter()
+        for figi in kwargs.get("figi", ()):
+            self.last_price_returned_at[figi] = returned_at
+        return response
+
+    async def post_order(self, **kwargs):
+        figi = kwargs.get("figi")
+        if figi in self.last_price_returned_at:
+            self.decision_latencies.append(
+                time.perf_counter() - self.last_price_returned_at.pop(figi)
+            )
+        self.posted_orders.append(get_order_key(kwargs))
+        return await super().post_order(**kwargs)
+
+
+def get_order_key(kwargs: dict) -> tuple:
+    return (
+        kwargs.get("figi"),
+        kwargs.get("account_id"),
+        int(kwargs.get("direction", 0)),
+        kwargs.get("quantity"),
+    )
+
+
+async def run_replay(args: argparse.Namespace) -> dict:
+    paths = [os.path.abspath(path) for path in args.logs]
+    config_path = os.path.abspath(args.config)
+    recorded_orders = [
+        get_order_key(event["k"]) for event in read_events(paths) if event["m"] == "post_order"
+    ]
+
+    # Settings are read on the first use, so the environment has to be ready before running app
+    os.environ.setdefault("TOKEN", "replay")
+    os.environ.setdefault("LOG_LEVEL", "30")
+    os.environ.pop("RECORD_SESSIONS_DIR", None)
+    os.environ["DIAGNOSTICS_SIGNALS"] = "false"
+    # Stats database and candles cache are written to a temporary directory
+    os.chdir(tempfile.mkdtemp(prefix="replay_"))
+
+    replay_client = MeasuredReplayClient(paths, realtime=args.realtime, speed=args.speed)
+
+    from app.context import context
+
+    context.configure(client=replay_client)
+    from app.instruments_config.parser import get_instruments
+    from app.strategies.manager import StrategiesManager
+
+    original_sleep = asyncio.sleep
+
+    async def sleep(delay: float, result=None):
+        await original_sleep(delay / args.speed if args.realtime else 0)
+        return result
+
+    manager = StrategiesManager()
+    cpu_started_at = time.process_time()
+    started_at = time.perf_counter()
+    with patch("asyncio.sleep", sleep), patch(
+        "app.strategies.interval.IntervalStrategy.now", replay_client.now
+    ):
+        manager.apply(get_instruments(config_path))
+        await manager.wait()
+    cpu_time = time.process_time() - cpu_started_at
+
+    replayed_orders = replay_client.posted_orders
+    return {
+        "logs": paths,
+        "wall_time": time.perf_counter() - started_at,
+        "cpu_time": cpu_time,
+        "decision_latency": percentiles(replay_client.decision_latencies),
+        "calls": dict(replay_client.calls),
+        "missing_responses": dict(replay_client.missing),
+        "recorded_orders": len(recorded_orders),
+        "replayed_orders": len(replayed_orders),
+        "orders_match": recorded_orders == replayed_orders,
+    }
+
+
+def print_report(result: dict) -> None:
+    decision = result["decision_latency"]
+    print(f"Wall time: {result['wall_time']:.2f}s, CPU time: {result['cpu_time']:.2f}s")
+    print(
+        f"Decision latency: p50={decision.get('p50', float('nan')):.4f}s "
+        f"p99={decision.get('p99', float('nan')):.4f}s count={decision.get('count', 0)}"
+    )
+    print("Calls: " + ", ".join(f"{m}={count}" for m, count in sorted(result["calls"].items())))
+    print(
+        f"Orders: recorded={result['recorded_orders']} replayed={result['replayed_orders']} "
+        f"match={result['orders_match']}"
+    )
+    if result["missing_responses"]:
+        print(f"Requests without recorded responses: {result['missing_responses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sessions through the strategies")
+    parser.add_argument("logs", nargs="+", help="session log files in chronological order")
+    parser.add_argument("--config", required=True, help="instruments config of the session")
+    parser.add_argument("--realtime", action="store_true", help="keep the recorded timing")
+    parser.add_argument("--speed", type=float, default=1.0, help="speed up factor for --realtime")
+    parser.add_argument("--output", help="path to save the results as json")
+    args = parser.parse_args()
+    # The replay changes the working directory
+    output = os.path.abspath(args.output) if args.output else None
+
+    result = asyncio.run(run_replay(args))
+    print_report(result)
+    if output:
+        with open(output, "w") as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
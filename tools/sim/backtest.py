@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from tools.sim.candles import SyntheticMarketConfig
+from tools.sim.fake_client import FakeClientConfig, FakeTinkoffClient
+
+
+class BacktestFinished(Exception):
+    pass
+
+
+class SimulatedClock:
+    """
+    Clock for running strategies faster than real time.
+    Sleeping advances the time immediately. Once the end is reached, sleep raises BacktestFinished.
+    """
+
+    def __init__(self, start: datetime, end: datetime):
+        self.current = start
+        self.end = end
+        self._sleep = asyncio.sleep
+
+    def now(self) -> datetime:
+        return self.current
+
+    async def sleep(self, delay: float, result=None):
+        self.current += timedelta(seconds=delay)
+        if self.current >= self.end:
+            raise BacktestFinished()
+        await self._sleep(0)
+        return result
+
+
+async def run_strategy_backtest(
+    figi: str,
+    strategy_parameters: dict,
+    days: int,
+    market_config: Optional[SyntheticMarketConfig] = None,
+    end: Optional[datetime] = None,
+) -> FakeTinkoffClient:
+    """
+    Runs IntervalStrategy on synthetic data for the given number of days with a simulated clock.
+
+    :param figi: instrument figi
+    :param strategy_parameters: IntervalStrategyConfig parameters
+    :param days: number of days to simulate
+    :param market_config: SyntheticMarketConfig object
+    :param end: the end of the simulation. The generated data doesn't depend on it,
+        so passing the same value makes runs comparable
+    :return: fake client with the final positions, cash and orders
+    """
+    from app.strategies.interval.IntervalStrategy import IntervalStrategy
+
+    end = end or datetime.fromisoformat("2024-01-01T00:00:00+00:00")
+    history_days = strategy_parameters.get("days_back_to_consider", 30)
+    clock = SimulatedClock(start=end - timedelta(days=days), end=end)
+    client = FakeTinkoffClient(
+        market_config=market_config,
+        config=FakeClientConfig(
+            latency=0.0, latency_sigma=0.0, history_days=history_days + 1, horizon_days=days
+        ),
+        clock=clock.now,
+    )
+    stats_handler = MagicMock(return_value=MagicMock(handle_new_order=AsyncMock()))
+    with patch("app.strategies.interval.IntervalStrategy.client", client), patch(
+        "app.strategies.interval.IntervalStrategy.now", clock.now
+    ), patch("asyncio.sleep", clock.sleep), patch(
+        "app.strategies.interval.IntervalStrategy.StatsHandler", stats_handler
+    ):
+        strategy = IntervalStrategy(figi=figi, **strategy_parameters)
+        try:
+            await strategy.start()
+        except BacktestFinished:
+            pass
+    return client
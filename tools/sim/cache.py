@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Iterator, List, NamedTuple, Optional
+
+from app.strategies.interval.models import IntervalStrategyConfig
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Results depend on the code of these files, so their content is a part of every key
+CODE_FILES = (
+    "app/strategies/interval/decisions.py",
+    "app/strategies/interval/models.py",
+    "tools/sim/candles.py",
+    "tools/sim/portfolio.py",
+)
+
+DEFAULT_CACHE_DIR = ".backtest_cache"
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+
+_code_version: Optional[str] = None
+
+
+def get_code_version() -> str:
+    """
+    :return: hash of the strategy and simulation code. Changing it invalidates the cache
+    """
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        for name in CODE_FILES:
+            digest.update(name.encode())
+            digest.update((ROOT / name).read_bytes())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+
+def get_key(*parts: Any) -> str:
+    """
+    Content address of the parts. Parts must be json serializable, dicts are hashed
+    independently of the keys order.
+    """
+    payload = json.dumps([get_code_version(), *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def normalize_parameters(parameters: dict) -> dict:
+    """
+    Fills in the defaults, so equal configs have equal keys however they are written.
+    """
+    return IntervalStrategyConfig(**parameters).dict()
+
+
+class CacheEntry(NamedTuple):
+    namespace: str
+    key: str
+    path: Path
+    size: int
+    accessed_at: float
+
+
+class ResultCache:
+    """
+    Content-addressed cache of the backtest products on disk.
+    Every value is pickled to <directory>/<namespace>/<key>.pkl. The modification time of the file
+    is its last access time. Writes are atomic, so the cache can be shared by the worker processes.
+    Writes don't check the size limit, evict() removes the least recently used entries once the
+    total size exceeds max_size. It scans the whole cache, so it's called once per run
+    by the process which owns the cache.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def _get_path(self, namespace: str, key: str) -> Path:
+        return self.directory / namespace / f"{key}.pkl"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        path = self._get_path(namespace, key)
+        try:
+            with open(path, "rb") as file:
+                value = pickle.load(file)
+            os.utime(path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        path = self._get_path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    def entries(self, namespace: Optional[str] = None) -> Iterator[CacheEntry]:
+        if not self.directory.exists():
+            return
+        for directory in sorted(self.directory.iterdir()):
+            if not directory.is_dir() or (namespace and directory.name != namespace):
+                continue
+            for path in directory.glob("*.pkl"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                yield CacheEntry(
+                    namespace=directory.name,
+                    key=path.stem,
+                    path=path,
+                    size=stat.st_size,
+                    accessed_at=stat.st_mtime,
+                )
+
+    def evict(
+        self, max_size: Optional[int] = None, namespace: Optional[str] = None
+    ) -> List[CacheEntry]:
+        """
+        Removes the least recently used entries until the total size is within max_size.
+
+        :param max_size: max size in bytes. By default, the size limit of the cache
+        :param namespace: evict only the entries of the namespace until its size is within max_size
+        :return: removed entries
+        """
+        max_size = self.max_size if max_size is None else max_size
+        entries = sorted(self.entries(namespace), key=lambda entry: entry.accessed_at)
+        total_size = sum(entry.size for entry in entries)
+        removed = []
+        for entry in entries:
+            if total_size <= max_size:
+                break
+            entry.path.unlink(missing_ok=True)
+            total_size -= entry.size
+            removed.append(entry)
+        return removed
+
+    def prune(
+        self, older_than: Optional[float] = None, namespace: Optional[str] = None
+    ) -> List[CacheEntry]:
+        """
+        Removes the entries not accessed for older_than seconds, or all of them.
+
+        :return: removed entries
+        """
+        removed = []
+        for entry in list(self.entries(namespace)):
+            if older_than is None or time.time() - entry.accessed_at > older_than:
+                entry.path.unlink(missing_ok=True)
+                removed.append(entry)
+        return removed
@@ -0,0 +1,175 @@
+import zlib
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+
+class Regime(BaseModel):
+    """
+    Market regime. Per-minute log returns are drawn from N(drift, volatility).
+    """
+
+    name: str
+    drift: float
+    volatility: float
+
+
+DEFAULT_REGIMES = [
+    Regime(name="calm", drift=0.0, volatility=0.0004),
+    Regime(name="volatile", drift=0.0, volatility=0.0015),
+    Regime(name="uptrend", drift=0.00004, volatility=0.0007),
+    Regime(name="downtrend", drift=-0.00004, volatility=0.0007),
+]
+
+
+class SyntheticMarketConfig(BaseModel):
+    """
+    Synthetic market configuration
+
+    seed: base seed. Series of every figi are reproducible for the same seed
+    price_range: range of the initial prices
+    regimes: market regimes to switch between
+    regime_switch_probability: probability to switch the regime on every minute
+    session_start: trading session start, minutes from midnight UTC
+    session_end: trading session end, minutes from midnight UTC
+    weekdays_only: whether there are no trades on weekends
+    gap_volatility: volatility of the price jump between sessions
+    missing_minute_probability: probability of a minute without trades (no candle)
+    """
+
+    seed: int = 0
+    price_range: Tuple[float, float] = (10.0, 5000.0)
+    regimes: List[Regime] = DEFAULT_REGIMES
+    regime_switch_probability: float = Field(1 / 240, ge=0.0, le=1.0)
+    session_start: int = Field(7 * 60, ge=0, le=24 * 60)
+    session_end: int = Field(15 * 60 + 40, ge=0, le=24 * 60)
+    weekdays_only: bool = True
+    gap_volatility: float = Field(0.01, ge=0.0)
+    missing_minute_probability: float = Field(0.02, ge=0.0, le=1.0)
+
+
+class CandleSeries:
+    """
+    1-minute candles of one instrument stored as aligned numpy arrays.
+    Times are epoch seconds of the candle start, sorted ascending.
+    """
+
+    def __init__(
+        self,
+        figi: str,
+        time: np.ndarray,
+        open_: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+    ):
+        self.figi = figi
+        self.time = time
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def index_range(self, from_: datetime, to: datetime) -> Tuple[int, int]:
+        """
+        :return: [start, end) indexes of the candles with from_ <= time < to
+        """
+        return (
+            int(np.searchsorted(self.time, from_.timestamp(), side="left")),
+            int(np.searchsorted(self.time, to.timestamp(), side="left")),
+        )
+
+    def last_index(self, at: datetime) -> int:
+        """
+        :return: index of the last candle started at or before the given time. -1 if there is none
+        """
+        return int(np.searchsorted(self.time, at.timestamp(), side="right")) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            array.nbytes
+            for array in (self.time, self.open, self.high, self.low, self.close, self.volume)
+        )
+
+
+def figi_seed(figi: str, seed: int) -> int:
+    return zlib.crc32(figi.encode()) ^ seed
+
+
+def session_minutes(from_: datetime, to: datetime, config: SyntheticMarketConfig) -> np.ndarray:
+    """
+    Epoch seconds of all the minutes in [from_, to) which belong to trading sessions.
+    """
+    start = int(from_.timestamp()) // 60 * 60
+    end = int(to.timestamp())
+    minutes = np.arange(start, end, 60, dtype=np.int64)
+    minute_of_day = (minutes // 60) % (24 * 60)
+    in_session = (minute_of_day >= config.session_start) & (minute_of_day < config.session_end)
+    if config.weekdays_only:
+        # 1970-01-01 is Thursday, so Monday is 0 after the shift
+        weekday = (minutes // 86400 + 3) % 7
+        in_session &= weekday < 5
+    return minutes[in_session]
+
+
+def generate_candles(
+    figi: str, from_: datetime, to: datetime, config: SyntheticMarketConfig
+) -> CandleSeries:
+    """
+    Generate 1-minute candles for the instrument.
+
+    Prices follow a geometric random walk. Drift and volatility are switched between
+    the configured regimes at random moments. There is a price gap between sessions,
+    and some minutes have no candle at all.
+
+    :param figi: instrument figi. Used as a part of the seed
+    :param from_: first minute to generate
+    :param to: the end of the interval, not included
+    :param config: SyntheticMarketConfig object
+    :return: CandleSeries object
+    """
+    rng = np.random.default_rng(figi_seed(figi, config.seed))
+    times = session_minutes(from_.astimezone(timezone.utc), to.astimezone(timezone.utc), config)
+    size = len(times)
+
+    switches = rng.random(size) < config.regime_switch_probability
+    regime_ids = rng.integers(0, len(config.regimes), size=size)
+    # Every minute keeps the regime chosen at the last switch point
+    last_switch = np.maximum.accumulate(np.where(switches, np.arange(size), 0))
+    regime_ids = regime_ids[last_switch]
+    drifts = np.array([regime.drift for regime in config.regimes])[regime_ids]
+    volatilities = np.array([regime.volatility for regime in config.regimes])[regime_ids]
+    returns = rng.normal(drifts, volatilities)
+
+    # Gap between the last minute of a session and the first minute of the next one
+    is_session_open = np.diff(times, prepend=times[:1] - 60) > 60
+    returns += np.where(is_session_open, rng.normal(0.0, config.gap_volatility, size), 0.0)
+
+    base_price = rng.uniform(*config.price_range)
+    close = base_price * np.exp(np.cumsum(returns))
+    open_ = np.empty_like(close)
+    open_[1:] = close[:-1]
+    open_[:1] = base_price
+    wicks = np.abs(rng.normal(0.0, volatilities / 2, size=(2, size)))
+    high = np.maximum(open_, close) * np.exp(wicks[0])
+    low = np.minimum(open_, close) * np.exp(-wicks[1])
+    volume = rng.lognormal(5.0, 1.0, size).astype(np.int64) + 1
+
+    present = rng.random(size) >= config.missing_minute_probability
+    return CandleSeries(
+        figi=figi,
+        time=times[present],
+        open_=open_[present],
+        high=high[present],
+        low=low[present],
+        close=close[present],
+        volume=volume[present],
+    )
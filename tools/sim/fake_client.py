@@ -0,0 +1,319 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+from uuid import uuid4
+
+from grpc import StatusCode
+from pydantic import BaseModel, Field
+from tinkoff.invest import (
+    Account,
+    AioRequestError,
+    GetAccountsResponse,
+    GetLastPricesResponse,
+    GetOrdersResponse,
+    GetTradingStatusResponse,
+    HistoricCandle,
+    Instrument,
+    InstrumentResponse,
+    LastPrice,
+    MoneyValue,
+    OrderDirection,
+    OrderExecutionReportStatus,
+    OrderState,
+    PortfolioPosition,
+    PortfolioResponse,
+    PostOrderResponse,
+    Quotation,
+)
+from tinkoff.invest.utils import now
+
+from tools.sim.candles import CandleSeries, SyntheticMarketConfig, generate_candles
+
+
+def to_quotation(value: float) -> Quotation:
+    units = int(value)
+    return Quotation(units=units, nano=int(round((value - units) * 1_000_000_000)))
+
+
+def to_money_value(value: float, currency: str = "rub") -> MoneyValue:
+    quotation = to_quotation(value)
+    return MoneyValue(currency=currency, units=quotation.units, nano=quotation.nano)
+
+
+class FakeClientConfig(BaseModel):
+    """
+    Fake broker configuration
+
+    latency: median latency of a request in seconds
+    latency_sigma: sigma of the lognormal latency distribution
+    error_rate: probability of a request to fail with UNAVAILABLE error
+    rate_limits: requests per second allowed for the method. Exceeding requests
+        fail with RESOURCE_EXHAUSTED error like the real API does
+    history_days: days of history available before the client creation
+    horizon_days: days of data generated after the client creation
+    always_open: report the market as open regardless of the session schedule
+    order_fill_delay: seconds an order stays in progress before it's filled
+    lot: lot size of every instrument
+    """
+
+    latency: float = Field(0.02, ge=0.0)
+    latency_sigma: float = Field(0.5, ge=0.0)
+    error_rate: float = Field(0.0, ge=0.0, le=1.0)
+    rate_limits: Dict[str, float] = {}
+    history_days: int = Field(30, ge=0)
+    horizon_days: int = Field(1, ge=0)
+    always_open: bool = True
+    order_fill_delay: float = Field(0.0, ge=0.0)
+    lot: int = Field(1, ge=1)
+
+
+class CallStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latencies: List[float] = []
+
+
+class FakeTinkoffClient:
+    """
+    Local stand-in for app.client.TinkoffClient backed by synthetic candles.
+
+    Prices move with the clock (wall clock by default): the last price is the close of the last generated
+    candle started before now. Orders are filled at the last price, positions are kept
+    per account. Every method sleeps for a random latency and can fail with a configured
+    error rate or because of the rate limit.
+    """
+
+    def __init__(
+        self,
+        market_config: Optional[SyntheticMarketConfig] = None,
+        config: Optional[FakeClientConfig] = None,
+        account_ids: Optional[List[str]] = None,
+        clock: Callable[[], datetime] = now,
+    ):
+        self.market_config = market_config or SyntheticMarketConfig()
+        self.config = config or FakeClientConfig()
+        self.account_ids = account_ids or ["fake-account"]
+        self.clock = clock
+        self.created_at = clock()
+        self.series: Dict[str, CandleSeries] = {}
+        # account_id -> figi -> [quantity, average price]
+        self.positions: Dict[str, Dict[str, List[float]]] = defaultdict(dict)
+        self.cash: Dict[str, float] = defaultdict(float)
+        self.orders: Dict[str, OrderState] = {}
+        self._order_fill_times: Dict[str, float] = {}
+        self.stats: Dict[str, CallStats] = defaultdict(CallStats)
+        self._rate_limit_tokens: Dict[str, float] = {}
+        self._rate_limit_updated_at: Dict[str, float] = {}
+        self._random = random.Random(self.market_config.seed)
+
+    async def ainit(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+    def get_series(self, figi: str) -> CandleSeries:
+        if figi not in self.series:
+            self.series[figi] = generate_candles(
+                figi=figi,
+                from_=self.created_at - timedelta(days=self.config.history_days),
+                to=self.created_at + timedelta(days=self.config.horizon_days),
+                config=self.market_config,
+            )
+        return self.series[figi]
+
+    def get_price(self, figi: str, at: Optional[datetime] = None) -> float:
+        series = self.get_series(figi)
+        index = series.last_index(at or self.clock())
+        return float(series.close[max(index, 0)])
+
+    def _take_rate_limit_token(self, method: str) -> bool:
+        limit = self.config.rate_limits.get(method)
+        if limit is None:
+            return True
+        current_time = time.monotonic()
+        updated_at = self._rate_limit_updated_at.get(method, current_time)
+        tokens = min(
+            limit, self._rate_limit_tokens.get(method, limit) + (current_time - updated_at) * limit
+        )
+        self._rate_limit_updated_at[method] = current_time
+        if tokens < 1:
+            self._rate_limit_tokens[method] = tokens
+            return False
+        self._rate_limit_tokens[method] = tokens - 1
+        return True
+
+    async def _call(self, method: str) -> None:
+        stats = self.stats[method]
+        stats.calls += 1
+        started_at = time.perf_counter()
+        latency = self.config.latency * self._random.lognormvariate(0, self.config.latency_sigma)
+        await asyncio.sleep(latency)
+        stats.latencies.append(time.perf_counter() - started_at)
+        if not self._take_rate_limit_token(method):
+            stats.errors += 1
+            raise AioRequestError(StatusCode.RESOURCE_EXHAUSTED, "rate limit exceeded", None)
+        if self._random.random() < self.config.error_rate:
+            stats.errors += 1
+            raise AioRequestError(StatusCode.UNAVAILABLE, "synthetic error", None)
+
+    def _is_market_open(self) -> bool:
+        if self.config.always_open:
+            return True
+        minutes = int(self.clock().timestamp()) // 60
+        minute_of_day = minutes % (24 * 60)
+        weekday = (minutes // (24 * 60) + 3) % 7
+        if self.market_config.weekdays_only and weekday >= 5:
+            return False
+        return self.market_config.session_start <= minute_of_day < self.market_config.session_end
+
+    async def get_accounts(self) -> GetAccountsResponse:
+        await self._call("get_accounts")
+        return GetAccountsResponse(
+            accounts=[Account(id=account_id) for account_id in self.account_ids]
+        )
+
+    async def get_instrument(self, id: str, **kwargs) -> InstrumentResponse:
+        await self._call("get_instrument")
+        return InstrumentResponse(
+            instrument=Instrument(
+                figi=id, lot=self.config.lot, name=f"Synthetic {id}", currency="rub"
+            )
+        )
+
+    async def get_trading_status(self, figi: str, **kwargs) -> GetTradingStatusResponse:
+        await self._call("get_trading_status")
+        is_open = self._is_market_open()
+        return GetTradingStatusResponse(
+            figi=figi, market_order_available_flag=is_open, api_trade_available_flag=is_open
+        )
+
+    async def get_all_candles(self, figi: str, from_: datetime, to: datetime, **kwargs):
+        await self._call("get_all_candles")
+        series = self.get_series(figi)
+        start, end = series.index_range(from_, min(to, self.clock()))
+        for i in range(start, end):
+            yield HistoricCandle(
+                open=to_quotation(series.open[i]),
+                high=to_quotation(series.high[i]),
+                low=to_quotation(series.low[i]),
+                close=to_quotation(series.close[i]),
+                volume=int(series.volume[i]),
+                time=datetime.fromtimestamp(int(series.time[i]), tz=timezone.utc),
+                is_complete=True,
+            )
+
+    async def get_last_prices(self, figi: List[str], **kwargs) -> GetLastPricesResponse:
+        await self._call("get_last_prices")
+        current_time = self.clock()
+        return GetLastPricesResponse(
+            last_prices=[
+                LastPrice(
+                    figi=f, price=to_quotation(self.get_price(f, current_time)), time=current_time
+                )
+                for f in figi
+            ]
+        )
+
+    async def get_portfolio(self, account_id: str, **kwargs) -> PortfolioResponse:
+        await self._call("get_portfolio")
+        self._fill_due_orders()
+        return PortfolioResponse(
+            positions=[
+                PortfolioPosition(
+                    figi=figi,
+                    quantity=to_quotation(quantity),
+                    average_position_price=to_money_value(average_price),
+                )
+                for figi, (quantity, average_price) in self.positions[account_id].items()
+                if quantity
+            ]
+        )
+
+    async def get_orders(self, account_id: str, **kwargs) -> GetOrdersResponse:
+        await self._call("get_orders")
+        self._fill_due_orders()
+        return GetOrdersResponse(
+            orders=[
+                order
+                for order_id, order in self.orders.items()
+                if order_id in self._order_fill_times
+                and order.order_id.startswith(f"{account_id}:")
+            ]
+        )
+
+    async def get_order_state(self, account_id: str, order_id: str, **kwargs) -> OrderState:
+        await self._call("get_order_state")
+        self._fill_due_orders()
+        order = self.orders.get(order_id)
+        if order is None or not order_id.startswith(f"{account_id}:"):
+            raise AioRequestError(StatusCode.NOT_FOUND, f"order {order_id} not found", None)
+        return order
+
+    async def post_order(
+        self,
+        figi: str,
+        quantity: int,
+        direction: OrderDirection,
+        account_id: str,
+        order_id: Optional[str] = None,
+        **kwargs,
+    ) -> PostOrderResponse:
+        await self._call("post_order")
+        # Broker order id is prefixed with the account to filter orders by account cheaply
+        broker_order_id = f"{account_id}:{order_id or uuid4()}"
+        if broker_order_id not in self.orders:
+            self.orders[broker_order_id] = OrderState(
+                order_id=broker_order_id,
+                figi=figi,
+                direction=OrderDirection(direction),
+                lots_requested=quantity,
+                execution_report_status=OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_NEW,
+            )
+            self._order_fill_times[broker_order_id] = (
+                time.monotonic() + self.config.order_fill_delay
+            )
+            self._fill_due_orders()
+        order = self.orders[broker_order_id]
+        return PostOrderResponse(
+            order_id=broker_order_id,
+            figi=figi,
+            direction=order.direction,
+            lots_requested=quantity,
+            lots_executed=order.lots_executed,
+            execution_report_status=order.execution_report_status,
+            executed_order_price=order.executed_order_price,
+            executed_commission=order.executed_commission,
+        )
+
+    def _fill_due_orders(self) -> None:
+        current_time = time.monotonic()
+        for order_id, fill_time in list(self._order_fill_times.items()):
+            if fill_time <= current_time:
+                del self._order_fill_times[order_id]
+                self._fill_order(self.orders[order_id])
+
+    def _fill_order(self, order: OrderState) -> None:
+        account_id = order.order_id.split(":", 1)[0]
+        price = self.get_price(order.figi)
+        quantity = order.lots_requested * self.config.lot
+        position = self.positions[account_id].setdefault(order.figi, [0, 0.0])
+        if order.direction == OrderDirection.ORDER_DIRECTION_BUY:
+            self.cash[account_id] -= price * quantity
+            position[1] = (position[0] * position[1] + quantity * price) / (position[0] + quantity)
+            position[0] += quantity
+        else:
+            self.cash[account_id] += price * quantity
+            position[0] -= quantity
+            if position[0] <= 0:
+                position[:] = [0, 0.0]
+        order.lots_executed = order.lots_requested
+        order.executed_order_price = to_money_value(price * quantity)
+        order.average_position_price = to_money_value(price)
+        order.executed_commission = to_money_value(0.0)
+        order.total_order_amount = to_money_value(price * quantity)
+        order.execution_report_status = OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL
@@ -0,0 +1,381 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from app.strategies.interval.decisions import calculate_corridor, evaluate_actions
+from tools.sim.cache import ResultCache, get_key, normalize_parameters
+from tools.sim.candles import CandleSeries, SyntheticMarketConfig, generate_candles
+
+# The market is considered closed if there are no candles for this time
+MARKET_CLOSED_AFTER = 5 * 60
+
+
+class InstrumentSignals(NamedTuple):
+    """
+    Prices and corridors of one instrument at its decision times (every check_interval).
+    """
+
+    figi: str
+    time: np.ndarray
+    price: np.ndarray
+    bottom: np.ndarray
+    top: np.ndarray
+    is_open: np.ndarray
+
+
+def rolling_corridors(
+    series: CandleSeries, at: np.ndarray, days_back: int, interval_size: float
+) -> np.ndarray:
+    """
+    Corridors the strategy calculates at the given times: from the closes of the candles
+    started in [at - days_back, at).
+
+    :return: array of shape (len(at), 2) with bottom and top. NaN if there are no candles
+    """
+    starts = np.searchsorted(series.time, at - days_back * 86400, side="left")
+    ends = np.searchsorted(series.time, at, side="left")
+    corridors = np.full((len(at), 2), np.nan)
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        if end > start:
+            corridors[i] = calculate_corridor(series.close[start:end], interval_size)
+    return corridors
+
+
+def compute_signals(
+    series: CandleSeries, parameters: dict, start: datetime, end: datetime
+) -> InstrumentSignals:
+    """
+    Pure function of the candles and the strategy parameters, so instruments can be computed
+    in parallel processes.
+    """
+    check_interval = parameters.get("check_interval", 60)
+    at = np.arange(int(start.timestamp()), int(end.timestamp()), check_interval, dtype=np.int64)
+    last_index = np.searchsorted(series.time, at, side="right") - 1
+    has_candle = last_index >= 0
+    last_time = np.where(has_candle, series.time[np.maximum(last_index, 0)], 0)
+    price = np.where(has_candle, series.close[np.maximum(last_index, 0)], np.nan)
+    corridors = rolling_corridors(
+        series,
+        at,
+        days_back=parameters.get("days_back_to_consider", 30),
+        interval_size=parameters.get("interval_size", 0.8),
+    )
+    return InstrumentSignals(
+        figi=series.figi,
+        time=at,
+        price=price,
+        bottom=corridors[:, 0],
+        top=corridors[:, 1],
+        is_open=has_candle & (at - last_time <= MARKET_CLOSED_AFTER),
+    )
+
+
+def get_cached_signals(
+    cache: Optional[ResultCache],
+    data: dict,
+    parameters: dict,
+    start: datetime,
+    end: datetime,
+    load: Callable[[datetime], CandleSeries],
+) -> InstrumentSignals:
+    """
+    Computes signals or takes them from the cache. Signals depend only on the candles,
+    check_interval, days_back_to_consider and interval_size, so configs which differ
+    in the other parameters share the corridors.
+
+    :param data: description of the candles source, a part of the key
+    :param load: loads the candles from the given history start to the end
+    """
+    config = normalize_parameters(parameters)
+    key = None
+    if cache is not None:
+        key = get_key(
+            data,
+            start.isoformat(),
+            end.isoformat(),
+            config["check_interval"],
+            config["days_back_to_consider"],
+            config["interval_size"],
+        )
+        signals = cache.get("signals", key)
+        if signals is not None:
+            return signals
+    history_start = start - timedelta(days=config["days_back_to_consider"])
+    signals = compute_signals(load(history_start), config, start, end)
+    if cache is not None:
+        cache.put("signals", key, signals)
+    return signals
+
+
+def compute_synthetic_signals(
+    figi: str,
+    parameters: dict,
+    start: datetime,
+    end: datetime,
+    market_config: Optional[dict] = None,
+    cache: Optional[ResultCache] = None,
+) -> InstrumentSignals:
+    """
+    Generates synthetic candles with the history required by the strategy and computes signals.
+    Arguments are picklable to be run in a process pool.
+    """
+    config = SyntheticMarketConfig(**(market_config or {}))
+    return get_cached_signals(
+        cache,
+        {"source": "synthetic", "figi": figi, "market": config.dict()},
+        parameters,
+        start,
+        end,
+        lambda history_start: generate_candles(figi, history_start, end, config),
+    )
+
+
+def load_cached_candles(figi: str, from_: datetime, to: datetime) -> CandleSeries:
+    """
+    Loads 1-minute candles through the tinkoff library candles cache (market_data_cache directory).
+    Missing candles are downloaded, TOKEN environment variable is required.
+    """
+    from tinkoff.invest import CandleInterval, Client
+    from tinkoff.invest.caching.market_data_cache.cache_settings import MarketDataCacheSettings
+    from tinkoff.invest.services import MarketDataCache
+
+    from app.utils.quotation import quotation_to_float
+
+    with Client(os.environ["TOKEN"]) as client:
+        cache = MarketDataCache(
+            settings=MarketDataCacheSettings(base_cache_dir=Path("market_data_cache")),
+            services=client,
+        )
+        candles = list(
+            cache.get_all_candles(
+                figi=figi, from_=from_, to=to, interval=CandleInterval.CANDLE_INTERVAL_1_MIN
+            )
+        )
+    return CandleSeries(
+        figi=figi,
+        time=np.array([int(candle.time.timestamp()) for candle in candles], dtype=np.int64),
+        open_=np.array([quotation_to_float(candle.open) for candle in candles]),
+        high=np.array([quotation_to_float(candle.high) for candle in candles]),
+        low=np.array([quotation_to_float(candle.low) for candle in candles]),
+        close=np.array([quotation_to_float(candle.close) for candle in candles]),
+        volume=np.array([candle.volume for candle in candles], dtype=np.int64),
+    )
+
+
+def compute_cached_signals(
+    figi: str,
+    parameters: dict,
+    start: datetime,
+    end: datetime,
+    cache: Optional[ResultCache] = None,
+) -> InstrumentSignals:
+    """
+    Same as compute_synthetic_signals for the real candles from the candles cache.
+    """
+    return get_cached_signals(
+        cache,
+        {"source": "cache", "figi": figi},
+        parameters,
+        start,
+        end,
+        lambda history_start: load_cached_candles(figi, history_start, end),
+    )
+
+
+def compute_all_signals(
+    compute: Callable[..., InstrumentSignals],
+    figis: List[str],
+    parameters: List[dict],
+    start: datetime,
+    end: datetime,
+    workers: Optional[int] = None,
+) -> List[InstrumentSignals]:
+    """
+    Computes signals of the instruments in a process pool.
+
+    :param compute: picklable function like compute_synthetic_signals
+    :param workers: number of processes. By default, the number of CPUs
+    :return: signals aligned with figis
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map keeps the order of the instruments, so the merge doesn't depend on the workers
+        return list(
+            executor.map(compute, figis, parameters, [start] * len(figis), [end] * len(figis))
+        )
+
+
+class SimulatedAccount:
+    """
+    One account shared by all the instruments. Positions are kept in arrays aligned with figis.
+    Orders are filled at the given price with a commission.
+    """
+
+    def __init__(self, figis: Sequence[str], cash: float, commission: float, lot: int = 1):
+        self.figis = list(figis)
+        self.cash = cash
+        self.commission = commission
+        self.lot = lot
+        size = len(self.figis)
+        self.quantity = np.zeros(size, dtype=np.int64)
+        self.average_price = np.zeros(size)
+        self.last_price = np.full(size, np.nan)
+        self.realized = np.zeros(size)
+        self.commissions = np.zeros(size)
+        self.buys = np.zeros(size, dtype=np.int64)
+        self.sells = np.zeros(size, dtype=np.int64)
+        self.stop_losses = np.zeros(size, dtype=np.int64)
+
+    def buy(self, index: int, quantity: int, price: float) -> int:
+        """
+        Buys up to quantity shares which the cash is enough for. Whole lots only.
+
+        :return: bought quantity
+        """
+        affordable = int(self.cash / (price * (1 + self.commission)) // self.lot) * self.lot
+        quantity = min(quantity // self.lot * self.lot, affordable)
+        if quantity <= 0:
+            return 0
+        cost = quantity * price
+        commission = cost * self.commission
+        total_quantity = self.quantity[index] + quantity
+        self.average_price[index] = (
+            self.average_price[index] * self.quantity[index] + cost
+        ) / total_quantity
+        self.quantity[index] = total_quantity
+        self.cash -= cost + commission
+        self.commissions[index] += commission
+        self.buys[index] += 1
+        return quantity
+
+    def sell(self, index: int, price: float) -> int:
+        """
+        Sells the whole position.
+
+        :return: sold quantity
+        """
+        quantity = int(self.quantity[index])
+        if quantity <= 0:
+            return 0
+        revenue = quantity * price
+        commission = revenue * self.commission
+        self.realized[index] += (price - self.average_price[index]) * quantity
+        self.cash += revenue - commission
+        self.commissions[index] += commission
+        self.quantity[index] = 0
+        self.average_price[index] = 0.0
+        self.sells[index] += 1
+        return quantity
+
+    def equity(self) -> float:
+        return self.cash + float(np.nansum(self.quantity * self.last_price))
+
+
+class PortfolioResult(NamedTuple):
+    time: np.ndarray
+    cash: np.ndarray
+    equity: np.ndarray
+    account: SimulatedAccount
+
+
+def run_portfolio(
+    signals: List[InstrumentSignals],
+    parameters: List[dict],
+    account: SimulatedAccount,
+) -> PortfolioResult:
+    """
+    Merges the signals of all the instruments on one time axis and trades them on the shared
+    account. Instruments with decisions at the same time are evaluated in one vectorized pass,
+    then stop losses and sells are executed before buys, and buys compete for the cash in the order
+    of the instruments, so the result is deterministic.
+
+    :param signals: signals aligned with account.figis
+    :param parameters: strategy parameters aligned with account.figis
+    :param account: shared account
+    :return: PortfolioResult with the equity curve
+    """
+    quantity_limit = np.array([p.get("quantity_limit", 0) for p in parameters])
+    stop_loss_percent = np.array([p.get("stop_loss_percent", 0.01) for p in parameters])
+
+    indexes = np.concatenate(
+        [np.full(len(s.time), i, dtype=np.int64) for i, s in enumerate(signals)]
+    )
+    times = np.concatenate([s.time for s in signals])
+    prices = np.concatenate([s.price for s in signals])
+    bottoms = np.concatenate([s.bottom for s in signals])
+    tops = np.concatenate([s.top for s in signals])
+    is_open = np.concatenate([s.is_open for s in signals])
+    order = np.lexsort((indexes, times))
+    indexes, times, prices = indexes[order], times[order], prices[order]
+    bottoms, tops, is_open = bottoms[order], tops[order], is_open[order]
+
+    unique_times, group_starts = np.unique(times, return_index=True)
+    group_ends = np.append(group_starts[1:], len(times))
+    cash_curve = np.empty(len(unique_times))
+    equity_curve = np.empty(len(unique_times))
+    for step, (start, end) in enumerate(zip(group_starts, group_ends)):
+        group = indexes[start:end]
+        price = prices[start:end]
+        known = ~np.isnan(price)
+        account.last_price[group[known]] = price[known]
+        actions = evaluate_actions(
+            last_price=price,
+            top=tops[start:end],
+            bottom=bottoms[start:end],
+            quantity=account.quantity[group],
+            average_price=account.average_price[group],
+            quantity_limit=quantity_limit[group],
+            stop_loss_percent=stop_loss_percent[group],
+            is_available=is_open[start:end],
+        )
+        for position in np.flatnonzero(actions.stop_loss):
+            account.sell(group[position], price[position])
+            account.stop_losses[group[position]] += 1
+        for position in np.flatnonzero(actions.sell):
+            account.sell(group[position], price[position])
+        for position in np.flatnonzero(actions.buy):
+            index = group[position]
+            account.buy(
+                index, int(quantity_limit[index] - account.quantity[index]), price[position]
+            )
+        cash_curve[step] = account.cash
+        equity_curve[step] = account.equity()
+    return PortfolioResult(time=unique_times, cash=cash_curve, equity=equity_curve, account=account)
+
+
+def get_attribution(account: SimulatedAccount) -> List[Dict[str, float]]:
+    """
+    :return: PnL and trades by instrument
+    """
+    unrealized = np.where(
+        account.quantity > 0,
+        (account.last_price - account.average_price) * account.quantity,
+        0.0,
+    )
+    return [
+        {
+            "figi": figi,
+            "realized": float(account.realized[i]),
+            "unrealized": float(unrealized[i]),
+            "commission": float(account.commissions[i]),
+            "pnl": float(account.realized[i] + unrealized[i] - account.commissions[i]),
+            "buys": int(account.buys[i]),
+            "sells": int(account.sells[i]),
+            "stop_losses": int(account.stop_losses[i]),
+            "quantity": int(account.quantity[i]),
+        }
+        for i, figi in enumerate(account.figis)
+    ]
+
+
+def get_max_drawdown(equity: np.ndarray) -> float:
+    """
+    :return: max relative drop of the equity from its previous peak
+    """
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    return float(np.max((peaks - equity) / peaks))
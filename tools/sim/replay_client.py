@@ -0,0 +1,208 @@
+import asyncio
+import gzip
+import json
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from grpc import StatusCode
+from tinkoff.invest import (
+    AioRequestError,
+    GetAccountsResponse,
+    GetLastPricesResponse,
+    GetOrdersResponse,
+    GetTradingStatusResponse,
+    HistoricCandle,
+    InstrumentResponse,
+    MarketDataResponse,
+    OrderState,
+    PortfolioResponse,
+    PostOrderResponse,
+    Quotation,
+)
+
+from app.client.serialization import from_jsonable
+
+RESPONSE_TYPES = {
+    "get_orders": GetOrdersResponse,
+    "get_portfolio": PortfolioResponse,
+    "get_accounts": GetAccountsResponse,
+    "get_last_prices": GetLastPricesResponse,
+    "post_order": PostOrderResponse,
+    "get_order_state": OrderState,
+    "get_trading_status": GetTradingStatusResponse,
+    "get_instrument": InstrumentResponse,
+    "market_data_stream": MarketDataResponse,
+}
+
+
+class ReplayFinished(Exception):
+    """
+    Raised when a request has no recorded response left.
+    """
+
+
+def read_events(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for path in paths:
+        with gzip.open(path, "rt") as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def get_request_key(method: str, kwargs: Dict[str, Any]) -> Hashable:
+    """
+    Responses are replayed in the recorded order for every method and key.
+    """
+    if method == "get_last_prices":
+        return tuple(sorted(kwargs.get("figi", ())))
+    if method == "get_order_state":
+        return kwargs.get("order_id")
+    if method in ("get_orders", "get_portfolio"):
+        return kwargs.get("account_id")
+    if method == "post_order":
+        return kwargs.get("figi"), kwargs.get("account_id")
+    if method in ("get_trading_status", "get_all_candles"):
+        return kwargs.get("figi")
+    if method == "get_instrument":
+        return kwargs.get("id")
+    return None
+
+
+def values_to_candle(values: List[Any]) -> HistoricCandle:
+    return HistoricCandle(
+        time=datetime.fromtimestamp(values[0], tz=timezone.utc),
+        open=Quotation(units=values[1], nano=values[2]),
+        high=Quotation(units=values[3], nano=values[4]),
+        low=Quotation(units=values[5], nano=values[6]),
+        close=Quotation(units=values[7], nano=values[8]),
+        volume=values[9],
+        is_complete=values[10],
+    )
+
+
+class ReplayClient:
+    """
+    Client serving the responses from session logs written by app.client.recorder.
+
+    Responses are matched by method and request key (figi, account, order id) in the recorded
+    order. In real time mode every response is delayed by its recorded latency divided by speed,
+    otherwise responses are returned immediately.
+    """
+
+    def __init__(self, paths: Iterable[str], realtime: bool = False, speed: float = 1.0):
+        """
+        :param paths: session log files in chronological order
+        :param realtime: delay responses by the recorded latencies
+        :param speed: speed up factor for the real time mode
+        """
+        self.realtime = realtime
+        self.speed = speed
+        # asyncio.sleep can be patched by the replay driver to skip the strategy sleeps
+        self._sleep = asyncio.sleep
+        self.events: Dict[Tuple[str, Hashable], Deque[Dict[str, Any]]] = {}
+        self.stream_events: Deque[Dict[str, Any]] = deque()
+        self.calls = Counter()
+        self.missing = Counter()
+        self.started_at: Optional[float] = None
+        self.current_time: Optional[float] = None
+        # Candles restored from the log by figi and time
+        self._candles: Dict[str, Dict[int, List[Any]]] = {}
+        for event in read_events(paths):
+            if self.started_at is None:
+                self.started_at = event["t"]
+            if event["m"] == "market_data_stream":
+                self.stream_events.append(event)
+                continue
+            key = (event["m"], get_request_key(event["m"], event.get("k", {})))
+            self.events.setdefault(key, deque()).append(event)
+        self.current_time = self.started_at
+
+    def now(self) -> datetime:
+        """
+        Time of the last served event. Used instead of the current time by the strategies.
+        """
+        return datetime.fromtimestamp(self.current_time or 0, tz=timezone.utc)
+
+    def recorded_count(self, method: str) -> int:
+        return sum(len(events) for (name, _), events in self.events.items() if name == method)
+
+    async def _next_event(self, method: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        self.calls[method] += 1
+        events = self.events.get((method, get_request_key(method, kwargs)))
+        if not events:
+            self.missing[method] += 1
+            raise ReplayFinished(f"No recorded response for {method} {kwargs}")
+        event = events.popleft()
+        self.current_time = max(self.current_time or 0, event["t"])
+        if self.realtime:
+            await self._sleep(event.get("d", 0) / self.speed)
+        return event
+
+    async def _replay(self, method: str, kwargs: Dict[str, Any]) -> Any:
+        event = await self._next_event(method, kwargs)
+        if "e" in event:
+            raise AioRequestError(StatusCode[event["e"]["code"]], event["e"]["details"], None)
+        return from_jsonable(RESPONSE_TYPES[method], event["r"])
+
+    async def ainit(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+    async def get_orders(self, **kwargs):
+        return await self._replay("get_orders", kwargs)
+
+    async def get_portfolio(self, **kwargs):
+        return await self._replay("get_portfolio", kwargs)
+
+    async def get_accounts(self):
+        return await self._replay("get_accounts", {})
+
+    async def get_last_prices(self, **kwargs):
+        return await self._replay("get_last_prices", kwargs)
+
+    async def post_order(self, **kwargs):
+        return await self._replay("post_order", kwargs)
+
+    async def get_order_state(self, **kwargs):
+        return await self._replay("get_order_state", kwargs)
+
+    async def get_trading_status(self, **kwargs):
+        return await self._replay("get_trading_status", kwargs)
+
+    async def get_instrument(self, **kwargs):
+        return await self._replay("get_instrument", kwargs)
+
+    async def get_all_candles(
+        self,
+        figi: str,
+        from_: Optional[datetime] = None,
+        to: Optional[datetime] = None,
+        **kwargs,
+    ):
+        """
+        Candles known at the moment of the request within [from_, to). The recorded response
+        is the last n of them, so a wider window than the recorded one gets the recorded
+        candles only.
+        """
+        event = await self._next_event("get_all_candles", {"figi": figi})
+        candles = self._candles.setdefault(figi, {})
+        for values in event["c"]:
+            candles[values[0]] = values
+        times = [
+            time
+            for time in sorted(candles)
+            if (from_ is None or time >= from_.timestamp())
+            and (to is None or time < to.timestamp())
+        ]
+        for time in times[-event["n"] :] if event["n"] else ():
+            yield values_to_candle(candles[time])
+
+    async def market_data_stream(self, requests):
+        while self.stream_events:
+            event = self.stream_events.popleft()
+            self.current_time = max(self.current_time or 0, event["t"])
+            yield from_jsonable(MarketDataResponse, event["r"])
+        raise ReplayFinished("No recorded stream responses")